@@ -1,5 +1,12 @@
-from models.binance_api import BinanceAPI
+import argparse
 
-binance_api = BinanceAPI()
-binance_api.backtest()
+from models.backtester import Backtester
 
+parser = argparse.ArgumentParser(description="Backtest der Strategie auf der Binance Historie")
+parser.add_argument("--start", default="1 week ago UTC", help="Startzeitpunkt der Historie")
+parser.add_argument("--no-plot", action="store_true", help="Ergebnis nicht plotten")
+parser.add_argument("--verbose", action="store_true", help="Indikatoren jeder Kerze ausgeben")
+args = parser.parse_args()
+
+backtester = Backtester()
+backtester.backtest(start=args.start, plot=not args.no_plot, verbose=args.verbose)
@@ -0,0 +1,1140 @@
+import argparse
+import time
+
+import numpy
+
+
+def create_klines(count, start_ms=1600000000000, interval_ms=60000):
+    """
+    erzeugt klines im format der rest api
+
+    :param count: int
+    :return: list of list
+    """
+    closes = 100 + numpy.cumsum(numpy.random.default_rng(1).normal(0, 0.1, count))
+    return [[start_ms + i * interval_ms, "%.8f" % close, "%.8f" % (close + 0.5), "%.8f" % (close - 0.5),
+             "%.8f" % close, "10.00000000", start_ms + (i + 1) * interval_ms - 1, "1000.00000000", 42,
+             "5.00000000", "500.00000000", "0"] for i, close in enumerate(closes)]
+
+
+def benchmark_exchange_info(count):
+    """
+    exchange info cache: laden einer exchangeInfo mit 2000 symbolen, lokale normalisierung und prüfung
+    der orders gegen tickSize, stepSize und minNotional, dazu die ablehnungen die sonst erst die api meldet
+
+    :param count: int normalisierte orders
+    :return: None
+    """
+    from models.exchange_info import ExchangeInfo, OrderFilterError
+    from models.simulated_exchange import SimulatedExchange
+
+    symbols = [{"symbol": "SYM{0}EUR".format(i), "filters": SimulatedExchange.FILTERS} for i in range(1999)]
+    symbols.append({"symbol": "SHIBEUR", "filters": [
+        {"filterType": "PRICE_FILTER", "minPrice": "0.00000001", "maxPrice": "1.00000000", "tickSize": "0.00000001"},
+        {"filterType": "LOT_SIZE", "minQty": "1.00", "maxQty": "92141578.00", "stepSize": "1.00"},
+        {"filterType": "NOTIONAL", "minNotional": "5.00000000", "applyMinToMarket": True}]})
+
+    class InfoClient:
+        requests = 0
+
+        def get_exchange_info(self):
+            InfoClient.requests += 1
+            return {"symbols": symbols}
+
+    cache = ExchangeInfo(InfoClient())
+    start = time.perf_counter()
+    cache.refresh()
+    loaded = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(1999):
+        cache.filters("SYM{0}EUR".format(i))
+    print("exchange info: {0} symbols loaded in {1:.1f}ms, filters of all symbols {2:.1f}ms, requests {3}".format(
+        len(symbols), loaded * 1000, (time.perf_counter() - start) * 1000, InfoClient.requests))
+
+    filters = cache.filters("SYM0EUR")
+    prices = (2000 + numpy.random.default_rng(3).normal(0, 50, count)).tolist()
+    start = time.perf_counter()
+    for price in prices:
+        filters.normalize("BUY", price * 0.999, 0.04004)
+    print("normalize and check {0} orders: {1:.1f}us/order".format(
+        count, (time.perf_counter() - start) / count * 1e6))
+
+    shib = cache.filters("SHIBEUR")
+    for symbol, side, price, quantity in (("SYM0EUR", "BUY", 1998.0049999, 0.040049),
+                                          ("SYM0EUR", "SELL", 0.1 + 0.2, 30),
+                                          ("SYM0EUR", "SELL", 1998.0000001, 0.04),
+                                          ("SHIBEUR", "BUY", 0.0000218349, 250000.7),
+                                          ("SYM0EUR", "BUY", 100.0, 0.04),
+                                          ("SYM0EUR", "SELL", 2000.0, 0.000001),
+                                          ("SHIBEUR", "SELL", 0.00002, 100)):
+        try:
+            result = (filters if symbol == "SYM0EUR" else shib).normalize(side, price, quantity)
+        except OrderFilterError as error:
+            result = error.message
+        print("{0:<7} {1:<4} {2!r:>14} x {3!r:<10} -> {4}".format(symbol, side, price, quantity, result))
+
+
+def benchmark_intrabar(count):
+    """
+    intrabar modus: ein synthetischer trade stream (200 aggTrades je 1m kerze).
+    zuerst direkt ohne budget (kosten je trade, vorläufige gegen die festgeschriebenen indikatoren,
+    vorsprung der signale vor dem kerzenschluss), dann so schnell wie möglich durch den KlineIngestor
+    mit 20000 trades/s und einem budget von 25% einer cpu
+
+    :param count: int trades
+    :return: None
+    """
+    import logging
+    import tempfile
+    from models.binance_api import BinanceAPI
+    from models.cpu_budget import CpuBudget
+    from models.ingestion import KlineIngestor
+
+    logging.getLogger('debug.log').setLevel(logging.INFO)
+    interval_ms = 60000
+    per_candle = 200
+    candles = max(count // per_candle, 2)
+    rng = numpy.random.default_rng(11)
+    # die FakeClient historie endet mit der kerze vor first_open
+    first_open = 1600000000000 + 500 * interval_ms
+    # langsam schwingender kurs mit einem kurzen einbruch mitten in jeder fünften kerze: der einbruch bricht das
+    # untere band nur innerhalb der kerze, bis zum schluss hat sich der kurs wieder erholt
+    steps = numpy.arange(candles * per_candle) / per_candle
+    prices = 100 + 4 * numpy.sin(steps / 30.0) + numpy.cumsum(rng.normal(0, 0.01, candles * per_candle))
+    dip = numpy.concatenate((numpy.linspace(0, 0.5, 20), numpy.linspace(0.5, 0, 20)))
+    for candle in range(0, candles, 5):
+        prices[candle * per_candle + 80:candle * per_candle + 120] -= dip
+    times = numpy.sort(rng.integers(0, interval_ms, (candles, per_candle)), axis=1)
+    messages = []
+    for candle in range(candles):
+        open_ms = first_open + candle * interval_ms
+        for index in range(per_candle):
+            trade_ms = open_ms + int(times[candle, index])
+            messages.append({"e": "aggTrade", "E": trade_ms, "s": "ETHEUR", "a": len(messages),
+                             "p": "{0:.2f}".format(prices[candle * per_candle + index]), "q": "0.5",
+                             "f": 0, "l": 0, "T": trade_ms, "m": False})
+        messages.append(create_kline_message("ETHEUR", open_ms, float(messages[-1]["p"])))
+    trades = candles * per_candle
+
+    def create_trader(state_directory, budget):
+        trader = BinanceAPI(symbol="ETHEUR", client=create_fake_client(), mail=FakeMail(),
+                            state_directory=state_directory)
+        trader.interval_seconds = interval_ms // 1000
+        trader.intrabar = True
+        trader.cpu_budget = budget
+        trader.warm_up(snapshot=False)
+        # erzwungene signale, damit auch orders aus dem intrabar modus entstehen
+        trader.strategy.stoch_buy = -1
+        trader.strategy.stoch_sell = 101
+        trader.strategy.sell_margin = 0
+        return trader
+
+    with tempfile.TemporaryDirectory() as state_directory:
+        trader = create_trader(state_directory, CpuBudget(share=1e9))
+        leads = []
+        act = trader.act
+
+        def record_act(side, close):
+            if side is not None and current["e"] == "aggTrade":
+                candle_end = (trader.candles.last("open_time") + 2 * trader.interval_seconds) * 1000
+                leads.append(candle_end - current["T"])
+            act(side, close)
+
+        trader.act = record_act
+        matches = 0
+        intrabar_time = 0.0
+        for msg in messages:
+            current = msg
+            if msg["e"] == "aggTrade":
+                started = time.perf_counter()
+                trader.process_message(msg)
+                intrabar_time += time.perf_counter() - started
+                provisional = trader.indicators.preview(float(msg["p"]))
+            else:
+                trader.process_message(msg)
+                matches += all(provisional[key] == trader.indicators.last[key] or provisional[key] !=
+                               provisional[key] for key in provisional)
+        print("{0} trades over {1} candles: {2:.1f}us/trade (preview + decision), provisional indicators at the "
+              "close {3}/{1} identical".format(trades, candles, intrabar_time / trades * 1e6, matches, candles))
+        print("intrabar orders {0}, on average {1:.1f}s before the candle closed".format(
+            len(leads), numpy.mean(leads) / 1000 if leads else 0.0))
+
+    with tempfile.TemporaryDirectory() as state_directory:
+        budget = CpuBudget(share=0.25)
+        trader = create_trader(state_directory, budget)
+        ingestor = KlineIngestor(trader.process_message, 1000)
+        ingestor.start()
+        rate = 20000
+        start = time.perf_counter()
+        for index, msg in enumerate(messages):
+            ingestor.on_message(msg)
+            if index % 10 == 9:
+                wait = start + index / rate - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+        while ingestor.queue.qsize() or ingestor.trades:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        print("through the ingestor at {0:.0f} trades/s: evaluated {1}, coalesced {2}, skipped by the budget {3}, "
+              "evaluations used {4:.0%} of {5:.2f}s (budget 25%)".format(
+                  trades / elapsed, budget.allowed, ingestor.coalesced, budget.skipped, budget.spent / elapsed,
+                  elapsed))
+
+
+def benchmark_journal(count):
+    """
+    journal: die replay kerzen durch den live code ohne und mit SQLite journal, danach abgleich der orders
+    aus dem journal mit der simulierten börse und abfragen über einen zeitraum
+
+    :param count: int kerzen
+    :return: None
+    """
+    import logging
+    import os
+    import tempfile
+    from models.journal import Journal, JournalReader
+    from models.logger import setup_logging
+
+    setup_logging('debug.log').setLevel(logging.INFO)
+    count = min(count, 20000)
+    with tempfile.TemporaryDirectory() as state_directory:
+        plain = create_replay(count, os.path.join(state_directory, "plain")).run()
+        replay = create_replay(count, os.path.join(state_directory, "journal"))
+        path = os.path.join(state_directory, "journal.sqlite")
+        journal = Journal(path)
+        journal.start()
+        replay.bot.journal = journal
+        replay.run()
+        start = time.perf_counter()
+        journal.stop(timeout=600)
+        drain = time.perf_counter() - start
+        print("{0} candles: {1:.1f} us/candle without journal, {2:.1f} us/candle with journal, {3} rows in {4} "
+              "transactions, {5} dropped, {6:.0f}ms to write the rest on stop".format(
+                  count, plain.elapsed / count * 1e6, replay.elapsed / count * 1e6, journal.written,
+                  journal.transactions, journal.dropped, drain * 1000))
+
+        reader = JournalReader(path)
+        filled = {str(order["orderId"]) for order in replay.exchange.orders.values()
+                  if order["status"] == replay.exchange.ORDER_STATUS_FILLED}
+        journaled = {order["order_id"] for order in reader.orders() if order["status"] == "FILLED"}
+        sent = [order for order in reader.orders() if order["status"] not in ("FILLED", "ERROR")]
+        print("orders sent {0}, filled on the exchange {1}, filled in the journal {2}, {3}".format(
+            len(sent), len(filled), len(journaled), "match" if filled == journaled else "DIFFER"))
+
+        first_open = reader.candles("ETHEUR")[0]["open_time"]
+        middle = first_open + count // 2 * 60000
+        start = time.perf_counter()
+        end = middle + 3600000
+        rows = [reader.candles("ETHEUR", middle, end), reader.indicators("ETHEUR", middle, end),
+                reader.decisions("ETHEUR", 0, int(time.time() * 1000))]
+        query = time.perf_counter() - start
+        plan = reader.connection.execute("EXPLAIN QUERY PLAN SELECT * FROM decisions WHERE symbol = ? AND time >= ?",
+                                         ("ETHEUR", 0)).fetchall()
+        print("one hour of candles and indicators plus all decisions ({0}, {1}, {2} rows) in {3:.1f}ms, "
+              "decisions by {4}".format(len(rows[0]), len(rows[1]), len(rows[2]), query * 1000, plan[0][-1]))
+        reader.close()
+
+
+def benchmark_kline_parser(count):
+    """
+    klines pro sekunde bis zum dataframe für den backtest: zeilenweise umwandlung (bisher) gegen parse_klines
+    und den blockweisen stream, alle drei mit dem gleichen ergebnis
+
+    :param count: int
+    :return: None
+    """
+    from datetime import datetime
+    import pandas as pd
+    from models.kline_parser import FIELDS, iter_kline_chunks, parse_klines, to_dataframe
+
+    klines = create_klines(count)
+
+    start = time.perf_counter()
+    rows = []
+    for item in klines:
+        rows.append([int(item[0] / 1000), float(item[1]), float(item[2]), float(item[3]), float(item[4]),
+                     float(item[5]), int(item[6] / 1000), float(item[7]), int(item[8]), float(item[9]),
+                     float(item[10]), datetime.fromtimestamp(int(item[0] / 1000))])
+    row_frame = pd.DataFrame(rows, columns=FIELDS + ['datetime'])
+    elapsed = time.perf_counter() - start
+    print("row by row:     {0:>12.0f} rows/s".format(count / elapsed))
+
+    start = time.perf_counter()
+    parsed_frame = to_dataframe(parse_klines(klines))
+    elapsed = time.perf_counter() - start
+    print("parse_klines:   {0:>12.0f} rows/s".format(count / elapsed))
+
+    # gemessen wird nur das durchlaufen des streams, die blöcke werden erst danach für den vergleich verbunden
+    chunks = []
+    rows_seen = 0
+    start = time.perf_counter()
+    for chunk in iter_kline_chunks(iter(klines)):
+        rows_seen += len(chunk["open_time"])
+        chunks.append(chunk)
+    elapsed = time.perf_counter() - start
+    print("chunked stream: {0:>12.0f} rows/s ({1} blocks)".format(rows_seen / elapsed, len(chunks)))
+    chunked_frame = to_dataframe({field: numpy.concatenate([chunk[field] for chunk in chunks]) for field in FIELDS})
+
+    same = all(numpy.array_equal(row_frame[field].to_numpy(), frame[field].to_numpy())
+               for frame in (parsed_frame, chunked_frame) for field in FIELDS)
+    print("same dataframe columns: {0}".format("yes" if same else "NO"))
+
+
+def create_kline_message(symbol, open_ms, close, interval_ms=60000, closed=True):
+    """
+    kline nachricht wie vom websocket
+
+    :return: dict
+    """
+    return {"e": "kline", "E": open_ms + interval_ms, "s": symbol, "k": {
+        "t": open_ms, "T": open_ms + interval_ms - 1, "s": symbol, "i": "1m", "o": str(close), "c": str(close),
+        "h": str(close + 0.5), "l": str(close - 0.5), "v": "10", "n": 42, "x": closed, "q": "1000", "V": "5",
+        "Q": "500"}}
+
+
+def create_fake_client():
+    """
+    client ohne netzwerk: liefert synthetische klines, orders werden sofort ausgeführt
+
+    :return: binance.client.Client
+    """
+    from binance.client import Client
+
+    class FakeClient(Client):
+
+        def __init__(self):
+            self.order_id = 0
+            self.orders = {}
+
+        def get_klines(self, **params):
+            return create_klines(500, interval_ms=60000)
+
+        def create_order(self, **params):
+            self.order_id += 1
+            self.orders[self.order_id] = dict(params, orderId=self.order_id, status="FILLED",
+                                              origQty=params["quantity"])
+            return self.orders[self.order_id]
+
+        def get_order(self, **params):
+            return self.orders[int(params["orderId"])]
+
+    return FakeClient()
+
+
+class FakeMail:
+
+    def send_mail(self, subject, message):
+        pass
+
+
+def benchmark_multi_stream(count, symbols=100):
+    """
+    lasttest für den multi symbol betrieb: ein lokaler websocket server schickt kline nachrichten für
+    `symbols` symbole abwechselnd über einen kombinierten stream, empfangen vom BinanceSocketManager und
+    über den KlineIngestor an MultiStreamBot.process_message. geprüft wird dass jedes symbol alle seine
+    kerzen in der richtigen reihenfolge bekommt
+
+    :param count: int anzahl nachrichten
+    :param symbols: int
+    :return: None
+    """
+    import logging
+    import tempfile
+    from binance.websockets import BinanceSocketManager
+    from twisted.internet import reactor
+    from models.multi_stream import MultiStreamBot
+    from tests.stream_server import LocalStreamServer
+
+    # logging hat einen eigenen benchmark
+    logging.getLogger('debug.log').setLevel(logging.INFO)
+
+    client = create_fake_client()
+    names = ["SYM{0}EUR".format(i) for i in range(symbols)]
+    rows = count // symbols + 1
+    rng = numpy.random.default_rng(2)
+    closes = 100 + numpy.cumsum(rng.normal(0, 0.5, (rows, symbols)), axis=0)
+    first_open = 1700000000000
+
+    def frames(streams, connection):
+        for i in range(count):
+            row, column = divmod(i, symbols)
+            yield {"stream": streams[column],
+                   "data": create_kline_message(names[column], first_open + row * 60000, closes[row, column])}
+
+    with tempfile.TemporaryDirectory() as state_directory:
+        socket_manager = BinanceSocketManager(client)
+        bot = MultiStreamBot(names, client=client, socket_manager=socket_manager, mail=FakeMail(),
+                             state_directory=state_directory)
+        received = {trader.symbol: [] for trader in bot.traders.values()}
+        for trader in bot.traders.values():
+            trader.warm_up()
+            process = trader.process_message
+
+            def record(msg, process=process, opens=received[trader.symbol]):
+                opens.append(msg["k"]["t"])
+                process(msg)
+
+            trader.process_message = record
+
+        server = LocalStreamServer(frames)
+        server.start()
+        socket_manager.STREAM_URL = server.url
+        start = time.perf_counter()
+        bot.connection_key = socket_manager.start_multiplex_socket(bot.streams(), bot.ingestor.on_message)
+        bot.ingestor.start()
+        socket_manager.start()
+        while bot.ingestor.processed + bot.ingestor.dropped < count and time.perf_counter() - start < 600:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        socket_manager.close()
+        # der twisted reactor läuft bis er gestoppt wird, sonst wartet der prozess am ende auf den thread
+        reactor.callFromThread(reactor.stop)
+        socket_manager.join(5)
+        server.stop()
+
+    expected = [count // symbols + (1 if column < count % symbols else 0) for column in range(symbols)]
+    in_order = all(opens == [first_open + row * 60000 for row in range(expected[column])]
+                   for column, opens in enumerate(received[name] for name in names))
+    print("{0} symbols, {1} closed candles over one websocket: {2:.3f}s, {3:.0f} msg/s, {4:.1f} us/msg, "
+          "dropped {5}, every symbol got its candles in order: {6}".format(
+              symbols, count, elapsed, count / elapsed, elapsed / count * 1e6, bot.ingestor.dropped,
+              "yes" if in_order else "NO"))
+    assert in_order, "candles lost or reordered"
+
+
+def benchmark_logging(count):
+    """
+    kosten des loggings je geschlossener kerze im aufrufenden thread: bisher zehn direkt geschriebene
+    zeilen mit str.format, jetzt eine zeile über die queue (text und json)
+
+    :param count: int anzahl kerzen
+    :return: None
+    """
+    import logging
+    import logging.handlers
+    import os
+    import queue
+    import tempfile
+    from models.logger import DATE_FORMAT, TEXT_FORMAT, JsonFormatter, LazyQueueHandler, create_file_handler
+
+    values = {"close": 1234.5, "macd": 0.12345, "signal": 0.2345, "fastk": 55.5, "fastd": 44.4,
+              "upperband_crossed": 0, "lowerband_crossed": 1, "buy": 2, "sell": 1}
+
+    def before(logger):
+        logger.debug("---------------------------")
+        logger.debug("last_upperband_crossed {}".format(values["upperband_crossed"]))
+        logger.debug("last_lowerband_crossed {}".format(values["lowerband_crossed"]))
+        logger.debug("last_macd {}".format(values["macd"]))
+        logger.debug("last_signal {}".format(values["signal"]))
+        logger.debug("fastk {}".format(values["fastk"]))
+        logger.debug("fastd {}".format(values["fastd"]))
+        logger.debug("unterer preisbereich {}".format(False))
+        logger.debug("oberer preisbereich {}".format(True))
+        logger.debug("buy {}".format(values["buy"]))
+        logger.debug("sell {}".format(values["sell"]))
+
+    def after(logger):
+        logger.debug("---------------------------")
+        logger.debug("%s close %s last_upperband_crossed %s last_lowerband_crossed %s last_macd %s last_signal %s "
+                     "fastk %s fastd %s unterer preisbereich %s oberer preisbereich %s buy %s sell %s", "ETHEUR",
+                     values["close"], values["upperband_crossed"], values["lowerband_crossed"], values["macd"],
+                     values["signal"], values["fastk"], values["fastd"], False, True, values["buy"], values["sell"],
+                     extra={"decision": values})
+
+    cases = [
+        ("before (sync, 10 lines)", logging.Formatter(TEXT_FORMAT, DATE_FORMAT), False, before),
+        ("after (queue, text)", logging.Formatter(TEXT_FORMAT, DATE_FORMAT), True, after),
+        ("after (queue, json)", JsonFormatter(), True, after),
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        for index, (name, formatter, queued, log) in enumerate(cases):
+            filename = os.path.join(directory, "{0}.log".format(index))
+            handler = create_file_handler(filename, max_bytes=10 * 1024 * 1024, backup_count=2)
+            handler.setFormatter(formatter)
+            logger = logging.getLogger("benchmark." + name)
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+            listener = None
+            if queued:
+                records = queue.Queue()
+                listener = logging.handlers.QueueListener(records, handler)
+                listener.start()
+                logger.addHandler(LazyQueueHandler(records))
+            else:
+                logger.addHandler(handler)
+
+            start = time.perf_counter()
+            for _ in range(count):
+                log(logger)
+            elapsed = time.perf_counter() - start
+            if listener is not None:
+                listener.stop()
+            total = time.perf_counter() - start
+            handler.close()
+            print("{0}: {1:.1f} us/candle on the calling thread, {2:.1f} us/candle until written".format(
+                name, elapsed / count * 1e6, total / count * 1e6))
+
+
+def create_rest_stand_in(latency=0.02, weight_limit=1200, window=60.0):
+    """
+    lokaler ersatz der binance rest api für ping und klines. zählt das gewicht je fenster wie binance,
+    meldet es im X-MBX-USED-WEIGHT-1M header und antwortet über dem limit mit 429 und Retry-After
+
+    :param latency: float sekunden je antwort
+    :param weight_limit: int
+    :param window: float sekunden je gewichtsfenster
+    :return: ThreadingHTTPServer, server.api_url ist die url für GatewayClient
+    """
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+    from models.rest_gateway import request_weight
+
+    lock = threading.Lock()
+    state = {"window": 0, "weight": 0, "requests": 0, "rejected": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            path = url.path.rsplit("/", 1)[-1]
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            with lock:
+                current = int(time.monotonic() // window)
+                if current != state["window"]:
+                    state["window"], state["weight"] = current, 0
+                state["requests"] += 1
+                state["weight"] += request_weight(path, params)
+                used = state["weight"]
+                retry_after = (current + 1) * window - time.monotonic()
+            time.sleep(latency)
+
+            if used > weight_limit:
+                state["rejected"] += 1
+                status, body = 429, {"code": -1003, "msg": "Too many requests"}
+            elif path == "klines":
+                status = 200
+                interval_ms = 60000
+                start = int(params.get("startTime", 0)) // interval_ms * interval_ms or 1500000000000
+                end = int(params.get("endTime") or time.time() * 1000)
+                count = max(min(int(params.get("limit", 500)), (end - start) // interval_ms + 1), 0)
+                body = create_klines(count, start, interval_ms)
+            else:
+                status, body = 200, {}
+
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("X-MBX-USED-WEIGHT-1M", str(used))
+            if status == 429:
+                self.send_header("Retry-After", "{0:.2f}".format(retry_after))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.state = state
+    server.api_url = "http://127.0.0.1:{0}/api".format(server.server_address[1])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def benchmark_rest_gateway(count):
+    """
+    lädt `count` 1m klines über den lokalen rest ersatz: Client der binance bibliothek (seitenweise,
+    pausiert nach jeder dritten seite) gegen GatewayClient (parallel, über das gewichtslimit gesteuert).
+    Das gewichtslimit ist klein gewählt damit der limiter auch zum zug kommt
+
+    :param count: int
+    :return: None
+    """
+    from binance.client import Client
+    from models.rest_gateway import GatewayClient, WeightLimiter
+
+    start_ms = 1600000000000
+    end_ms = start_ms + count * 60000 - 1
+    server = create_rest_stand_in(latency=0.05, weight_limit=300, window=10.0)
+
+    class StandInClient(Client):
+        API_URL = server.api_url
+
+    for name, client in (("Client", StandInClient()),
+                         ("GatewayClient", GatewayClient(api_url=server.api_url, workers=8,
+                                                         limiter=WeightLimiter(250, interval=10.0)))):
+        server.state.update(requests=0, rejected=0)
+        start = time.perf_counter()
+        klines = sum(1 for _ in client.get_historical_klines_generator("ETHEUR", "1m", start_ms, end_ms))
+        elapsed = time.perf_counter() - start
+        print("{0}: {1} klines in {2:.2f}s, {3:.0f} klines/s, {4} requests, {5} rejected (429)".format(
+            name, klines, elapsed, klines / elapsed, server.state["requests"], server.state["rejected"]))
+    server.shutdown()
+
+
+def benchmark_async_runtime(count, symbols=100):
+    """
+    AsyncRuntime gegen einen lokalen ersatz von websocket und rest api (aiohttp): der websocket schickt
+    `count` geschlossene kerzen für `symbols` symbole so schnell wie möglich, orders werden sofort ausgeführt
+
+    :param count: int anzahl nachrichten
+    :param symbols: int
+    :return: None
+    """
+    import asyncio
+    import json
+    import logging
+    import tempfile
+    from aiohttp import web
+    from models.async_runtime import AsyncRestClient, AsyncRuntime
+    from models.metrics import metrics
+
+    logging.getLogger('debug.log').setLevel(logging.INFO)
+    names = ["SYM{0}EUR".format(i) for i in range(symbols)]
+    orders = {}
+
+    frames = []
+
+    async def klines(request):
+        return web.json_response(create_klines(500))
+
+    async def order(request):
+        if request.method == "POST":
+            order_id = len(orders) + 1
+            orders[order_id] = dict(request.query, orderId=order_id, status="FILLED",
+                                    origQty=request.query["quantity"])
+        else:
+            order_id = int(request.query["orderId"])
+        return web.json_response(orders[order_id])
+
+    async def listen_key(request):
+        return web.json_response({"listenKey": "benchmark"})
+
+    async def stream(request):
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        for frame in frames:
+            await socket.send_str(frame)
+        # offen halten bis der client schließt
+        async for _ in socket:
+            pass
+        return socket
+
+    class FakeNotifier:
+
+        def send_mail(self, subject, message):
+            pass
+
+        async def run(self):
+            await asyncio.Event().wait()
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/api/v3/klines", klines)
+        app.router.add_route("*", "/api/v3/order", order)
+        app.router.add_route("*", "/api/v3/userDataStream", listen_key)
+        app.router.add_get("/stream", stream)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        with tempfile.TemporaryDirectory() as state_directory:
+            client = AsyncRestClient("key", "secret", api_url="http://127.0.0.1:{0}/api".format(port))
+            runtime = AsyncRuntime(names, client=client, stream_url="ws://127.0.0.1:{0}".format(port),
+                                   mail=FakeNotifier(), state_directory=state_directory)
+            runtime.lag_interval = 0.01
+            streams = list(runtime.traders)
+            rng = numpy.random.default_rng(2)
+            closes = 100 + numpy.cumsum(rng.normal(0, 0.5, (count // symbols + 1, symbols)), axis=0)
+            for i in range(count):
+                row, column = divmod(i, symbols)
+                message = create_kline_message(names[column], 1700000000000 + row * 60000, closes[row, column])
+                frames.append(json.dumps({"stream": streams[column], "data": message}))
+            for trader in runtime.traders.values():
+                # ohne sofortiges kaufen und verkaufen werden keine orders ausgelöst
+                trader.strategy.stoch_buy, trader.strategy.stoch_sell, trader.strategy.sell_margin = -1, 101, 0
+            task = asyncio.ensure_future(runtime.run())
+            while not runtime.running:
+                await asyncio.sleep(0.001)
+            start = time.perf_counter()
+            while sum(trader.processed for trader in runtime.traders.values()) < count:
+                await asyncio.sleep(0.001)
+            elapsed = time.perf_counter() - start
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await runner.cleanup()
+
+        lag = metrics.histogram("event_loop_lag_seconds")
+        print("{0} symbols, {1} closed candles: {2:.3f}s, {3:.0f} msg/s, {4} orders, "
+              "event loop lag p99 {5:.1f}ms max {6:.1f}ms".format(
+                  symbols, count, elapsed, count / elapsed, len(orders), lag.quantile(0.99) * 1000,
+                  runtime.max_loop_lag * 1000))
+
+    asyncio.run(run())
+
+
+def benchmark_reconnect(count, gap=120):
+    """
+    fehlerinjektion mit einem lokalen websocket: die verbindung wird nach der hälfte der kerzen getrennt,
+    während der trennung schließen `gap` kerzen die nur über rest nachgeladen werden können, nach dem
+    reconnect schickt der websocket zwei schon verarbeitete kerzen doppelt. geprüft wird dass die kerzen
+    lückenlos und ohne doppelte sind und die indikatoren denen eines ungestörten laufs entsprechen
+
+    :param count: int kerzen über den websocket
+    :param gap: int kerzen während der trennung
+    :return: None
+    """
+    import asyncio
+    import json
+    import logging
+    import tempfile
+    from aiohttp import web
+    from models.async_runtime import AsyncRestClient, AsyncRuntime
+    from models.candle_buffer import KLINE_KEYS
+
+    logging.getLogger('debug.log').setLevel(logging.INFO)
+    warm = 500
+    count = min(count, 20000)
+    series = create_klines(warm + count + gap, 1600000000000)
+    # kerzen [0, available) sind geschlossen und über rest abrufbar
+    state = {"available": warm, "connections": 0, "disconnected": 0.0}
+
+    async def klines(request):
+        limit = int(request.query.get("limit", 500))
+        if "startTime" in request.query:
+            first = -(-(int(request.query["startTime"]) - series[0][0]) // 60000)
+        else:
+            first = max(state["available"] - limit, 0)
+        return web.json_response(series[first:min(first + limit, state["available"])])
+
+    async def listen_key(request):
+        return web.json_response({"listenKey": "benchmark"})
+
+    async def stream(request):
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        state["connections"] += 1
+        if state["connections"] == 1:
+            first, last = warm, warm + count // 2
+        else:
+            # zwei kerzen doppelt, danach weiter hinter der lücke
+            first, last = state["available"] - 2, len(series)
+        for index in range(first, last):
+            candle = dict(zip(KLINE_KEYS, series[index]), x=True)
+            data = {"e": "kline", "E": series[index][6], "s": "ETHEUR", "k": candle}
+            await socket.send_str(json.dumps({"stream": names[0], "data": data}))
+            state["available"] = max(state["available"], index + 1)
+        if state["connections"] == 1:
+            # fehler: verbindung weg, in der zwischenzeit schließen weitere kerzen
+            state["available"] += gap
+            state["disconnected"] = time.perf_counter()
+            await socket.close()
+            return socket
+        # offen halten bis der client schließt
+        async for _ in socket:
+            pass
+        return socket
+
+    class FakeNotifier:
+
+        def send_mail(self, subject, message):
+            pass
+
+        async def run(self):
+            await asyncio.Event().wait()
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/api/v3/klines", klines)
+        app.router.add_route("*", "/api/v3/userDataStream", listen_key)
+        app.router.add_get("/stream", stream)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        with tempfile.TemporaryDirectory() as state_directory:
+            client = AsyncRestClient("key", "secret", api_url="http://127.0.0.1:{0}/api".format(port))
+            runtime = AsyncRuntime(["ETHEUR"], client=client, stream_url="ws://127.0.0.1:{0}".format(port),
+                                   mail=FakeNotifier(), state_directory=state_directory)
+            names.extend(runtime.traders)
+            trader = runtime.traders[names[0]]
+            task = asyncio.ensure_future(runtime.run())
+            recovered = None
+            # letzte kerze der lücke, ab da ist der stand wieder aktuell
+            gap_end = series[warm + count // 2 + gap - 1][0] // 1000
+            while True:
+                last_open = trader.candles.last("open_time") if len(trader.candles) else 0
+                if recovered is None and state["disconnected"] and last_open >= gap_end:
+                    recovered = time.perf_counter() - state["disconnected"]
+                if last_open == series[-1][0] // 1000:
+                    break
+                await asyncio.sleep(0.0001)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await runner.cleanup()
+
+        open_times = trader.candles.view("open_time")
+        expected = trader.strategy.indicator_engine()
+        for kline in series:
+            expected.update(float(kline[4]))
+        gaps_and_duplicates = int(numpy.sum(numpy.diff(open_times) != 60))
+        same = all(numpy.isclose(trader.indicators.last[key], expected.last[key], equal_nan=True)
+                   for key in ("macd", "signal", "fastk", "fastd", "upperband", "lowerband"))
+        print("reconnects {0}, missed {1} candles: backfill {2:.1f}ms, caught up {3:.1f}ms after disconnect, "
+              "gaps/duplicates {4}, indicators {5}".format(
+                  state["connections"] - 1, gap, trader.timings["backfill"].max * 1000, recovered * 1000,
+                  gaps_and_duplicates, "match" if same else "DIFFER"))
+
+    names = []
+    asyncio.run(run())
+
+
+def benchmark_startup(count):
+    """
+    kaltstart: importzeit je betriebsart (eigener prozess, bester von 3 läufen) und warm up über rest
+    gegen den snapshot vom letzten beenden
+
+    :param count: int kerzen die seit dem snapshot geschlossen wurden
+    :return: None
+    """
+    import logging
+    import subprocess
+    import sys
+    import tempfile
+    from models.binance_api import BinanceAPI
+
+    code = ("import sys, time; start = time.perf_counter(); import {0}; "
+            "print(time.perf_counter() - start, *(name in sys.modules for name in ('pandas', 'matplotlib', 'twisted')))")
+    for name, module in (("live threads", "models.binance_api"), ("live asyncio", "models.async_runtime"),
+                         ("backtest", "models.backtester")):
+        runs = [subprocess.run([sys.executable, "-c", code.format(module)], capture_output=True, text=True,
+                               check=True).stdout.split() for _ in range(3)]
+        best = min(runs, key=lambda run: float(run[0]))
+        print("import {0:<13} {1:>6.0f}ms  pandas {2:<5} matplotlib {3:<5} twisted {4}".format(
+            name, float(best[0]) * 1000, *best[1:]))
+
+    logging.getLogger('debug.log').setLevel(logging.INFO)
+    interval_ms = 1800 * 1000
+    count = min(count, BinanceAPI.BACKFILL_LIMIT - 1)
+    now_ms = int(time.time() * 1000) // interval_ms * interval_ms
+    history = create_klines(500 + count, now_ms - (500 + count) * interval_ms, interval_ms)
+    available = [500]
+
+    class HistoryClient:
+
+        def get_klines(self, **params):
+            klines = history[:available[0]]
+            if "startTime" in params:
+                klines = [kline for kline in klines if kline[0] >= params["startTime"]]
+            else:
+                klines = klines[-params.get("limit", 500):]
+            return klines[:params.get("limit", 500)]
+
+    with tempfile.TemporaryDirectory() as state_directory:
+        before = BinanceAPI(client=HistoryClient(), mail=FakeMail(), state_directory=state_directory)
+        start = time.perf_counter()
+        before.warm_up(snapshot=False)
+        cold = time.perf_counter() - start
+        before.save_snapshot()
+
+        # neustart nachdem `count` weitere kerzen geschlossen wurden
+        available[0] += count
+        after = BinanceAPI(client=HistoryClient(), mail=FakeMail(), state_directory=state_directory)
+        start = time.perf_counter()
+        after.warm_up()
+        warm = time.perf_counter() - start
+
+        before.apply_backfill(history[500:], evaluate=False)
+        same = all(numpy.isclose(after.indicators.last[key], before.indicators.last[key], equal_nan=True)
+                   for key in before.indicators.last)
+        print("warm up rest {0:>7.2f}ms, from snapshot + {1} candles {2:>7.2f}ms, indicators {3}".format(
+            cold * 1000, count, warm * 1000, "match" if same else "DIFFER"))
+
+
+def benchmark_replay(count):
+    """
+    paper trading: synthetische 1m kerzen durch den live code gegen die SimulatedExchange,
+    mit erzwungenen signalen damit auch orders, ausführungen und der user data stream laufen
+
+    :param count: int kerzen
+    :return: None
+    """
+    import logging
+    import tempfile
+    from models.logger import setup_logging
+
+    setup_logging('debug.log').setLevel(logging.INFO)
+    with tempfile.TemporaryDirectory() as state_directory:
+        print(create_replay(count, state_directory).run().summary())
+
+
+def create_replay(count, state_directory):
+    """
+    wiedergabe von `count` synthetischen 1m kerzen nach 500 kerzen zum aufwärmen, mit erzwungenen signalen
+
+    :param count: int kerzen
+    :param state_directory: string
+    :return: Replay
+    """
+    from models.kline_parser import parse_klines
+    from models.simulated_exchange import Replay
+
+    columns = parse_klines(create_klines(count + 500))
+    # schwingender kurs in der größenordnung von ETHEUR (MIN_NOTIONAL der simulierten filter), damit die
+    # strategie regelmäßig kauft und verkauft
+    columns["close"] = 20 * columns["close"] + 100 * numpy.sin(numpy.arange(count + 500) / 40.0)
+    columns["open"] = numpy.concatenate(([columns["close"][0]], columns["close"][:-1]))
+    columns["high"] = numpy.maximum(columns["open"], columns["close"]) + 6
+    columns["low"] = numpy.minimum(columns["open"], columns["close"]) - 6
+    replay = Replay.create("ETHEUR", columns, state_directory, warmup=500, fill_ratio=0.002)
+    replay.bot.strategy.stoch_buy = -1
+    replay.bot.strategy.stoch_sell = 101
+    replay.bot.strategy.sell_margin = 0
+    return replay
+
+
+def benchmark_recorder(count):
+    """
+    recorder: kosten von record() auf dem websocket thread, schreibdurchsatz und kompression,
+    suche nach zeitstempel über den index und wiedergabe mit 1000facher geschwindigkeit
+
+    :param count: int frames
+    :return: None
+    """
+    import json
+    import os
+    import tempfile
+    from models.recorder import CODECS, FrameReader, FrameRecorder, FrameReplayer
+
+    symbols = ["SYM{0}EUR".format(i) for i in range(10)]
+    rng = numpy.random.default_rng(3)
+    closes = 100 + numpy.cumsum(rng.normal(0, 0.5, count))
+    # 100 frames je sekunde, wie offene kerzen von 10 symbolen
+    frames = [{"stream": "{0}@kline_1m".format(symbols[i % 10].lower()),
+               "data": create_kline_message(symbols[i % 10], 1700000000000 + i // 600 * 60000, round(closes[i], 2),
+                                            closed=i % 600 >= 590)} for i in range(count)]
+    timestamps = [1700000000000 + i * 10 for i in range(count)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "frames.bin")
+        recorder = FrameRecorder(path, max_pending=count)
+        start = time.perf_counter()
+        for timestamp, frame in zip(timestamps, frames):
+            recorder.record(frame, timestamp)
+        record = time.perf_counter() - start
+        recorder.start()
+        start = time.perf_counter()
+        recorder.stop(timeout=600)
+        write = time.perf_counter() - start
+        raw_size = sum(len(json.dumps(frame, separators=(",", ":"))) for frame in frames)
+        size = os.path.getsize(path)
+        print("record() {0:.2f} us/frame, written {1:.0f} frames/s, {2:.1f} bytes/frame ({3}, ratio {4:.1f})".format(
+            record / count * 1000000, count / write, size / count,
+            {codec: name for name, codec in CODECS.items()}[recorder.codec], raw_size / size))
+
+        # unvollständiger block am ende wie nach einem absturz
+        with open(path, "ab") as file:
+            file.write(b"TBRF\x01partial")
+        FrameRecorder(path).stop()
+        reader = FrameReader(path)
+        start = time.perf_counter()
+        middle = timestamps[count // 2]
+        first = next(reader.frames(start=middle))
+        seek = time.perf_counter() - start
+        start = time.perf_counter()
+        scanned = sum(1 for _ in reader.frames())
+        scan = time.perf_counter() - start
+        print("seek to the middle {0:.2f}ms (full read {1:.0f}ms), {2} chunks, after repair {3} of {4} frames, "
+              "frame {5}".format(seek * 1000, scan * 1000, len(reader.chunks), scanned, count,
+                                 "ok" if first[0] == middle and json.loads(first[1]) == frames[count // 2] else "DIFFERS"))
+
+        received = []
+        replayer = FrameReplayer(reader, received.append, speed=1000)
+        end = timestamps[min(count, 1000) - 1]
+        start = time.perf_counter()
+        replayer.run(end=end)
+        paced = time.perf_counter() - start
+        print("replay at 1000x: {0} frames spanning {1:.1f}s in {2:.3f}s".format(
+            len(received), (end - timestamps[0]) / 1000, paced))
+        received = []
+        start = time.perf_counter()
+        FrameReplayer(reader, received.append, speed=0).run()
+        print("replay without pacing: {0:.0f} frames/s".format(len(received) / (time.perf_counter() - start)))
+
+
+def benchmark_order_book(count):
+    """
+    lokales order buch: synthetischer diff depth stream um einen preis von 100 gegen ein dict als referenz,
+    events vor dem snapshot werden gepuffert, eine verlorene nachricht erzwingt einen resync.
+    gemessen werden updates, abfragen und der limit preis im order pfad
+
+    :param count: int depth events
+    :return: None
+    """
+    import tempfile
+    from models.binance_api import BinanceAPI
+    from models.order_book import OrderBook
+
+    rng = numpy.random.default_rng(7)
+    reference = {"b": {}, "a": {}}
+    for level in range(1000):
+        reference["b"]["{0:.2f}".format(99.99 - level * 0.01)] = "{0:.3f}".format(rng.uniform(0.1, 10))
+        reference["a"]["{0:.2f}".format(100.01 + level * 0.01)] = "{0:.3f}".format(rng.uniform(0.1, 10))
+    state = {"update_id": 1000}
+
+    def snapshot():
+        return {"lastUpdateId": state["update_id"], "bids": [list(level) for level in reference["b"].items()],
+                "asks": [list(level) for level in reference["a"].items()]}
+
+    def event():
+        changes = {"b": [], "a": []}
+        for _ in range(int(rng.integers(1, 20))):
+            side = "b" if rng.random() < 0.5 else "a"
+            offset = int(rng.integers(0, 50))
+            price = "{0:.2f}".format(99.99 - offset * 0.01 if side == "b" else 100.01 + offset * 0.01)
+            quantity = "0.000" if rng.random() < 0.3 else "{0:.3f}".format(rng.uniform(0.1, 10))
+            changes[side].append([price, quantity])
+            if quantity == "0.000":
+                reference[side].pop(price, None)
+            else:
+                reference[side][price] = quantity
+        first = state["update_id"] + 1
+        state["update_id"] += int(rng.integers(1, 5))
+        return {"e": "depthUpdate", "E": 0, "s": "ETHEUR", "U": first, "u": state["update_id"],
+                "b": changes["b"], "a": changes["a"]}
+
+    book = OrderBook("ETHEUR")
+    # die ersten events kommen vor dem snapshot, der snapshot liegt mitten in den gepufferten events
+    early = [event() for _ in range(10)]
+    initial = snapshot()
+    early += [event() for _ in range(10)]
+    for item in early[:15]:
+        book.update(item)
+    book.apply_snapshot(initial)
+    for item in early[15:]:
+        book.update(item)
+
+    # eine nachricht geht verloren, der snapshot danach zeigt den stand nach dem folgenden event
+    lost = count // 2
+    events = []
+    for index in range(count):
+        events.append(event())
+        if index == lost + 1:
+            resync = snapshot()
+    start = time.perf_counter()
+    for index, item in enumerate(events):
+        if index == lost:
+            continue
+        book.update(item)
+        if book.needs_snapshot():
+            book.request_snapshot()
+            book.apply_snapshot(resync)
+    elapsed = time.perf_counter() - start
+
+    bids = sorted(((float(price), float(quantity)) for price, quantity in reference["b"].items()), reverse=True)
+    asks = sorted((float(price), float(quantity)) for price, quantity in reference["a"].items())
+    same = book.bids.levels(len(bids)) == bids and book.asks.levels(len(asks)) == asks
+    print("{0} events ({1} levels): {2:.1f}us/event, resyncs {3}, book {4}".format(
+        count, len(book.bids) + len(book.asks), elapsed / count * 1e6, book.resyncs.value,
+        "matches" if same else "DIFFERS"))
+
+    for name, query in (("best bid/ask", lambda: (book.best_bid(), book.best_ask())), ("spread", book.spread),
+                        ("quantity at price", lambda: book.quantity_at("BUY", 99.5)),
+                        ("depth to price", lambda: book.depth("SELL", 100.2))):
+        start = time.perf_counter()
+        for _ in range(100000):
+            query()
+        print("{0:<17} {1:.2f}us".format(name, (time.perf_counter() - start) / 100000 * 1e6))
+
+    with tempfile.TemporaryDirectory() as state_directory:
+        trader = BinanceAPI(symbol="ETHEUR", client=create_fake_client(), mail=FakeMail(),
+                            state_directory=state_directory)
+        trader.order_book = book
+        start = time.perf_counter()
+        for _ in range(10000):
+            buy = trader.get_buy_value(100.0)
+            sell = trader.get_sell_value(100.0)
+        print("limit prices from the book (no REST): buy {0} sell {1}, {2:.2f}us".format(
+            buy[0], sell[0], (time.perf_counter() - start) / 20000 * 1e6))
+
+
+def benchmark_pipeline(count):
+    """
+    indikator pipeline: fusionierte update funktion je kerze gegen die neuberechnung aller indikatoren über das
+    fenster je kerze, dazu der batch modus über die ganze historie und eine parameter suche mit geteiltem cache
+
+    :param count: int kerzen
+    :return: None
+    """
+    import itertools
+    from models.strategy import Strategy
+
+    closes = 100 + numpy.cumsum(numpy.random.default_rng(5).normal(0, 0.5, count))
+    strategy = Strategy()
+    window = strategy.window
+
+    engine = strategy.indicator_engine()
+    start = time.perf_counter()
+    for close in closes.tolist():
+        engine.update(close)
+    fused = (time.perf_counter() - start) / count
+
+    candles = min(count - window, 2000)
+    start = time.perf_counter()
+    for i in range(count - candles, count):
+        recomputed = strategy.indicators(closes[i - window + 1:i + 1])
+    recompute = (time.perf_counter() - start) / candles
+    same = all(numpy.isclose(engine.last[key], recomputed[key][-1], equal_nan=True)
+               for key in ("macd", "upperband", "lowerband", "max_price", "average_price"))
+    print("per candle: fused pipeline {0:.1f}us, recompute over {1} candles {2:.1f}us ({3:.0f}x), "
+          "indicators {4}".format(fused * 1e6, window, recompute * 1e6, recompute / fused,
+                                  "match" if same else "DIFFER"))
+
+    start = time.perf_counter()
+    batch = strategy.indicators(closes)
+    print("batch {0} candles {1:.1f}ms, last candle {2}".format(
+        count, (time.perf_counter() - start) * 1000,
+        "match" if all(numpy.isclose(engine.last[key], batch[key][-1], equal_nan=True) for key in batch)
+        else "DIFFER"))
+
+    grid = [Strategy(short_ema=short_ema, long_ema=long_ema, bbands_period=bbands_period)
+            for short_ema, long_ema, bbands_period in itertools.product((6, 9, 12), (18, 26), (18, 20))]
+    for name, shared in (("separate", False), ("shared cache", True)):
+        cache = {}
+        start = time.perf_counter()
+        for candidate in grid:
+            candidate.indicators(closes, cache if shared else None)
+        print("{0} strategies, {1:<12} {2:.1f}ms".format(len(grid), name, (time.perf_counter() - start) * 1000))
+
+
+BENCHMARKS = {
+    "async_runtime": benchmark_async_runtime,
+    "exchange_info": benchmark_exchange_info,
+    "intrabar": benchmark_intrabar,
+    "journal": benchmark_journal,
+    "kline_parser": benchmark_kline_parser,
+    "logging": benchmark_logging,
+    "multi_stream": benchmark_multi_stream,
+    "order_book": benchmark_order_book,
+    "pipeline": benchmark_pipeline,
+    "recorder": benchmark_recorder,
+    "reconnect": benchmark_reconnect,
+    "replay": benchmark_replay,
+    "startup": benchmark_startup,
+    "rest_gateway": benchmark_rest_gateway,
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks des Tradingbots")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--count", type=int, default=1000000)
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args.count)
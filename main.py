@@ -1,7 +1,17 @@
 #!/usr/bin/env python3
-from models.binance_api import BinanceAPI
-
-binance_api = BinanceAPI()
+from models.config import Config
 
 if __name__ == '__main__':
-    binance_api.start_socket()
+    config = Config()
+    if config.get("Runtime") == "asyncio":
+        # alle symbole, rest und mails in einem event loop
+        from models.async_runtime import AsyncRuntime
+        bot = AsyncRuntime()
+    elif config.get("Symbols").strip():
+        # mehrere symbole über einen kombinierten websocket
+        from models.multi_stream import MultiStreamBot
+        bot = MultiStreamBot()
+    else:
+        from models.binance_api import BinanceAPI
+        bot = BinanceAPI()
+    bot.start_socket()
@@ -0,0 +1,638 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import os
+import time
+from urllib.parse import urlencode
+
+import aiohttp
+from binance.client import Client
+
+from models.binance_api import BinanceAPI
+from models.config import Config
+from models.exchange_info import ExchangeInfo
+from models.mail import MailDispatcher
+from models.metrics import metrics, start_metrics
+from models.recorder import create_recorder
+from models.rest_gateway import WEIGHT_HEADERS, WeightLimiter, request_weight
+from models.state_store import AsyncStateStore
+
+debug_logger = logging.getLogger('debug.log')
+
+
+class AsyncRestError(Exception):
+    """
+    fehlerantwort der binance rest api
+    """
+
+    def __init__(self, status, message):
+        Exception.__init__(self, "HTTP {0}: {1}".format(status, message))
+        self.status = status
+
+
+class AsyncRestClient:
+    """
+    REST Zugriff über aiohttp mit einem Pool dauerhafter Verbindungen und dem gleichen
+    Gewichtslimit wie GatewayClient. Hat die Konstanten von binance.client.Client (SIDE_BUY, ...),
+    damit BinanceAPI damit arbeiten kann.
+    """
+
+    def __init__(self, api_key=None, api_secret=None, api_url="https://api.binance.com/api", pool_size=10,
+                 limiter=None, max_retries=5):
+        """
+
+        :param api_url: string
+        :param pool_size: int
+        :param limiter: WeightLimiter
+        :param max_retries: int wiederholungen nach 429/418
+        """
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.api_url = api_url
+        self.pool_size = pool_size
+        self.limiter = limiter if limiter is not None else WeightLimiter()
+        self.max_retries = max_retries
+        self.session = None
+        self.throttled = metrics.counter("rest_throttled_total")
+
+    async def start(self):
+        connector = aiohttp.TCPConnector(limit=self.pool_size, keepalive_timeout=60)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=10),
+                                             headers={"Accept": "application/json",
+                                                      "X-MBX-APIKEY": self.api_key or ""})
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+    def sign(self, params):
+        """
+
+        :param params: dict
+        :return: dict mit timestamp und signature
+        """
+        params = dict(params, timestamp=int(time.time() * 1000))
+        query = urlencode(params)
+        params["signature"] = hmac.new(self.api_secret.encode("utf-8"), query.encode("utf-8"),
+                                       hashlib.sha256).hexdigest()
+        return params
+
+    async def request(self, method, path, signed=False, **params):
+        """
+
+        :param method: string GET, POST, PUT, DELETE
+        :param path: string z.b. v3/klines
+        :param signed: bool
+        :return: dict oder list
+        """
+        params = {key: value for key, value in params.items() if value is not None}
+        weight = request_weight(path.rsplit("/", 1)[-1], params)
+        for attempt in range(self.max_retries + 1):
+            wait = self.limiter.reserve(weight)
+            while wait:
+                await asyncio.sleep(wait)
+                wait = self.limiter.reserve(weight)
+
+            query = self.sign(params) if signed else params
+            async with self.session.request(method, "{0}/{1}".format(self.api_url, path), params=query) as response:
+                for header in WEIGHT_HEADERS:
+                    if header in response.headers:
+                        self.limiter.update(int(response.headers[header]))
+                        break
+                body = await response.json(content_type=None)
+                if response.status < 400:
+                    return body
+                if response.status not in (429, 418) or attempt == self.max_retries:
+                    raise AsyncRestError(response.status, body.get("msg") if isinstance(body, dict) else body)
+                retry_after = float(response.headers.get("Retry-After") or 2 ** attempt)
+            self.throttled.increment()
+            debug_logger.debug("rate limited (%s) on %s, retry in %ss", response.status, path, retry_after)
+            self.limiter.block(retry_after)
+
+    async def get_klines(self, **params):
+        return await self.request("GET", "v3/klines", **params)
+
+    async def get_exchange_info(self):
+        return await self.request("GET", "v3/exchangeInfo")
+
+    async def get_order_book(self, **params):
+        return await self.request("GET", "v3/depth", **params)
+
+    async def create_order(self, **params):
+        return await self.request("POST", "v3/order", signed=True, **params)
+
+    async def get_order(self, **params):
+        return await self.request("GET", "v3/order", signed=True, **params)
+
+    async def create_listen_key(self):
+        return (await self.request("POST", "v3/userDataStream"))["listenKey"]
+
+    async def keepalive_listen_key(self, listen_key):
+        return await self.request("PUT", "v3/userDataStream", listenKey=listen_key)
+
+
+# konstanten wie beim synchronen client (KLINE_INTERVAL_*, SIDE_*, ORDER_TYPE_*, TIME_IN_FORCE_*)
+for _name in dir(Client):
+    if _name.startswith(("KLINE_INTERVAL_", "SIDE_", "ORDER_TYPE_", "TIME_IN_FORCE_", "ORDER_STATUS_")):
+        setattr(AsyncRestClient, _name, getattr(Client, _name))
+
+
+class AsyncNotifier:
+    """
+    Mails aus dem Event Loop: send_mail legt nur in eine asyncio Queue, der SMTP Versand (blockierend)
+    läuft im Executor. Sammelmails und Wiederholungen wie beim MailDispatcher.
+    """
+
+    def __init__(self, dispatcher=None):
+        """
+
+        :param dispatcher: MailDispatcher wird nicht gestartet, nur create_digest und send_with_retry werden benutzt
+        """
+        self.dispatcher = dispatcher if dispatcher is not None else MailDispatcher()
+        # die queue entsteht erst im laufenden event loop
+        self.queue = None
+
+    def send_mail(self, subject, message):
+        """
+
+        :param subject: string
+        :param message: string
+        :return: None
+        """
+        if self.dispatcher.mail.is_enabled():
+            if self.queue is None:
+                self.queue = asyncio.Queue()
+            self.queue.put_nowait((subject, str(message)))
+
+    async def run(self):
+        loop = asyncio.get_event_loop()
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        while True:
+            mails = [await self.queue.get()]
+            # weitere mails die kurz danach kommen gehen in dieselbe sammelmail
+            await asyncio.sleep(self.dispatcher.digest_delay)
+            while not self.queue.empty():
+                mails.append(self.queue.get_nowait())
+            await loop.run_in_executor(None, self.dispatcher.send_with_retry, *self.dispatcher.create_digest(mails))
+
+
+class AsyncTrader(BinanceAPI):
+    """
+    Ein Symbol im asyncio Betrieb. Strategie und Zustand kommen von BinanceAPI, Orders und
+    Abgleich laufen als eigene Tasks, damit die Kerzen anderer Symbole nicht warten müssen.
+    """
+
+    # höchstens so viele sekunden zwischen zwei versuchen nachzuladen
+    BACKFILL_MAX_DELAY = 60
+
+    def __init__(self, symbol, client, runtime, mail, state_directory):
+        """
+
+        :param symbol: string
+        :param client: AsyncRestClient
+        :param runtime: AsyncRuntime verwaltet den websocket
+        :param mail: AsyncNotifier
+        :param state_directory: string
+        """
+        BinanceAPI.__init__(self, symbol=symbol, client=client, socket_manager=runtime, mail=mail,
+                            state_directory=state_directory, exchange_info=runtime.exchange_info)
+        # im event loop schreibt ein eigener thread die zustandsdateien (fsync)
+        self.state = AsyncStateStore(state_directory)
+        # die queue entsteht erst im laufenden event loop (run_strategy)
+        self.candle_queue = None
+        self.processed = 0
+        # während des nachladens nach einem reconnect werden neue kerzen hier zurückgehalten
+        self.backfilling = None
+        # laufende order oder abfrage, solange gibt es keine neue order
+        self.order_task = None
+        # execution reports die kommen während create_order noch auf die antwort wartet, None wenn nicht gesendet wird
+        self.early_reports = None
+
+    async def warm_up_async(self, snapshot=True):
+        """
+        wie BinanceAPI.warm_up, nach einem snapshot werden nur die kerzen seitdem geladen
+
+        :param snapshot: bool snapshot benutzen
+        :return: None
+        """
+        if snapshot and self.load_snapshot():
+            klines = await self.client.get_klines(symbol=self.symbol, interval=self.get_interval(),
+                                                  startTime=self.backfill_start(), limit=self.BACKFILL_LIMIT)
+            if self.resume_from(klines):
+                return
+        pages = []
+        params = self.history_request(pages)
+        while params is not None:
+            pages.append(await self.client.get_klines(**params))
+            params = self.history_request(pages)
+        self.warm_up_from(self.history_from(pages))
+
+    def put_candle(self, candle):
+        """
+        legt eine geschlossene kerze in die queue. die queue ist unbegrenzt, geschlossene kerzen werden nie
+        verworfen (auch nicht die bis zu BACKFILL_LIMIT nachgeladenen auf einmal)
+
+        :param candle: dict
+        :return: None
+        """
+        if self.candle_queue is None:
+            return
+        if self.backfilling is not None:
+            self.backfilling.append(candle)
+            return
+        self.candle_queue.put_nowait(candle)
+
+    def can_order(self):
+        return BinanceAPI.can_order(self) and (self.order_task is None or self.order_task.done())
+
+    async def run_strategy(self):
+        """
+        die strategie als coroutine, wertet die geschlossenen kerzen der reihe nach aus
+
+        :return: None
+        """
+        self.candle_queue = asyncio.Queue()
+        while True:
+            candle = await self.candle_queue.get()
+            self.processed += 1
+            try:
+                if candle is None:
+                    # lücke zu groß zum nachladen, neu aufsetzen
+                    self.reset_candles()
+                    await self.warm_up_async(snapshot=False)
+                    continue
+                if not self.is_new_candle(candle):
+                    continue
+                indicators, close = self.update_candle(candle)
+                if candle.get('backfill'):
+                    # nachgeladene kerzen gehen nur in die indikatoren, ausgewertet wird die letzte
+                    continue
+                # der abgleich läuft gerade dann, wenn noch eine order offen ist. nur keine zwei tasks zugleich
+                if self.reconcile_due() and (self.order_task is None or self.order_task.done()):
+                    self.order_task = asyncio.ensure_future(self.check_last_order_status_async())
+                self.act(self.decide(indicators, close), close)
+            except Exception as error:
+                debug_logger.exception(error)
+            # liegen viele kerzen in der queue, kommt get() ohne warten zurück. damit der event loop
+            # dazwischen auch andere symbole und den websocket bedienen kann, wird hier abgegeben
+            await asyncio.sleep(0)
+
+    def start_backfill(self):
+        """
+        lädt nach einem reconnect die verpassten kerzen nach. bis sie da sind, werden neue kerzen aus dem
+        websocket zurückgehalten, damit die reihenfolge stimmt
+
+        :return: asyncio.Future
+        """
+        self.backfilling = []
+        return asyncio.ensure_future(self.backfill_async())
+
+    async def backfill_async(self):
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                klines = await self.client.get_klines(symbol=self.symbol, interval=self.get_interval(),
+                                                      startTime=self.backfill_start(), limit=self.BACKFILL_LIMIT)
+                break
+            except Exception as error:
+                # die lücke bleibt offen und neue kerzen werden weiter zurückgehalten, bis das nachladen klappt
+                attempt += 1
+                delay = min(2 ** attempt, self.BACKFILL_MAX_DELAY)
+                debug_logger.debug("backfill failed: %s, retry in %ss", error, delay)
+                await asyncio.sleep(delay)
+        pending, self.backfilling = self.backfilling, None
+
+        if len(klines) >= self.BACKFILL_LIMIT:
+            candles = [None]
+        else:
+            candles = self.closed_candles(klines)
+            for candle in candles[:-1]:
+                candle['backfill'] = True
+        for candle in candles + pending:
+            self.put_candle(candle)
+        self.timings["backfill"].observe(time.perf_counter() - started)
+        debug_logger.debug("backfilled %s candles in %.1fms", len(candles), (time.perf_counter() - started) * 1000)
+
+    def act(self, side, close):
+        # die order läuft als eigener task, bis dahin lässt can_order keine weitere zu
+        if side is not None:
+            self.order_task = asyncio.ensure_future(self.submit_order(side, close))
+
+    def process_order_update(self, msg):
+        """
+        wie BinanceAPI.process_order_update. der report einer sofort ausgeführten order kommt oft vor der antwort
+        auf create_order, solange die order id noch fehlt wird er zurückgehalten
+
+        :param msg: dict
+        :return: None
+        """
+        if self.early_reports is not None and str(msg["i"]) != str(self.get_last_order_id()):
+            self.early_reports.append(msg)
+            return
+        BinanceAPI.process_order_update(self, msg)
+
+    def order_filters(self):
+        # geladen wird von AsyncRuntime.refresh_exchange_info, im order pfad gibt es keine anfrage
+        return self.exchange_info.filters(self.symbol)
+
+    def resync_order_book(self):
+        # der snapshot kommt als eigener task, bis dahin puffert das order buch die events
+        asyncio.ensure_future(self.resync_order_book_async())
+
+    async def resync_order_book_async(self):
+        try:
+            snapshot = await self.client.get_order_book(symbol=self.symbol, limit=self.order_book_limit)
+        except Exception as error:
+            debug_logger.debug("order book snapshot failed: %s", error)
+            self.order_book.snapshot_failed()
+            return
+        self.order_book.apply_snapshot(snapshot)
+
+    async def check_last_order_status_async(self):
+        try:
+            with self.timings["order_status"].time():
+                order = await self.client.get_order(symbol=self.symbol, orderId=self.get_last_order_id())
+            self.candles_since_reconcile = 0
+            self.apply_order(order)
+        except Exception as error:
+            self.order_errors.increment()
+            debug_logger.debug(error)
+
+    async def submit_order(self, side, close):
+        """
+        wie buy/sell, aber ohne den event loop zu blockieren
+
+        :param side: string BUY oder SELL
+        :param close: float
+        :return: None
+        """
+        self.early_reports = []
+        try:
+            price, quantity = self.get_buy_value(close) if side == "BUY" else self.get_sell_value(close)
+            with self.timings["order_submit"].time():
+                order = await self.client.create_order(symbol=self.symbol, side=side, type=self.get_order_type(),
+                                                       timeInForce=self.client.TIME_IN_FORCE_GTC,
+                                                       quantity=quantity, price=price)
+            self.set_last_order_id(order["orderId"])
+            status = order.get("status", "NEW")
+            if status != "FILLED" and status not in self.CANCELLED_STATUSES:
+                # beendete orders schreibt apply_order ins journal
+                self.journal_order(side, order["orderId"], status, price, quantity)
+            if side == "BUY":
+                self.send_buy_mail(price, quantity)
+            else:
+                self.send_sell_mail(price, quantity)
+            debug_logger.debug(" **************************** %s: %s **************************** ", side, close)
+            debug_logger.debug(json.dumps(order))
+            # eine sofort ausgeführte order ist schon in der antwort FILLED, danach die reports von vorher
+            reports, self.early_reports = self.early_reports, None
+            if status != "NEW":
+                self.apply_order({"orderId": order["orderId"], "status": status, "side": side,
+                                  "price": self.fill_price(order, price), "origQty": quantity})
+            for report in reports:
+                self.process_order_update(report)
+        except Exception as error:
+            self.order_errors.increment()
+            self.journal_order(side, "", "ERROR", message=str(error))
+            debug_logger.debug(error)
+            self.mail.send_mail("Fehler", error)
+        finally:
+            self.early_reports = None
+
+    @staticmethod
+    def fill_price(order, price):
+        """
+
+        :param order: dict antwort auf create_order
+        :param price: string limit preis
+        :return: string durchschnittlicher ausführungspreis, bei market orders gibt es keinen limit preis
+        """
+        executed = float(order.get("executedQty") or 0)
+        if executed and not float(order.get("price") or 0):
+            return str(float(order["cummulativeQuoteQty"]) / executed)
+        return price
+
+
+class AsyncRuntime:
+    """
+    asyncio Laufzeit für ein oder mehrere Symbole: ein kombinierter Websocket (aiohttp) für Kerzen und
+    Order Updates, REST über AsyncRestClient, Mails über AsyncNotifier. Jedes Symbol hat eine eigene
+    Strategie Coroutine, geschlossene Kerzen warten in einer unbegrenzten Queue. Die Verzögerung des Event
+    Loops wird laufend gemessen.
+    """
+
+    def __init__(self, symbols=None, client=None, stream_url=None, mail=None, state_directory=None):
+        """
+
+        :param symbols: list of string standard ist Symbols bzw. Symbol aus der settings.ini
+        :param client: AsyncRestClient
+        :param stream_url: string z.b. wss://stream.binance.com:9443
+        :param mail: AsyncNotifier
+        :param state_directory: string
+        """
+        self.config = Config()
+        if symbols is None:
+            symbols = [symbol.strip() for symbol in self.config.get("Symbols").split(",") if symbol.strip()]
+            symbols = symbols or [self.config.get("Symbol")]
+        if state_directory is None:
+            state_directory = self.config.get("StateDirectory")
+        if client is None:
+            client = AsyncRestClient(self.config.get("Binance_api_key"), self.config.get("Binance_api_secret"),
+                                     api_url=self.config.get("RestApiUrl"),
+                                     pool_size=int(self.config.get("RestPoolSize")),
+                                     limiter=WeightLimiter(int(self.config.get("RestWeightLimit"))),
+                                     max_retries=int(self.config.get("RestMaxRetries")))
+        self.client = client
+        self.stream_url = stream_url if stream_url is not None else self.config.get("StreamUrl")
+        self.mail = mail if mail is not None else AsyncNotifier()
+        # zeichnet die rohen frames auf, bevor sie geparst werden
+        self.recorder = create_recorder()
+        self.listen_key = None
+        self.running = False
+        self.socket_restarts = metrics.counter("socket_restarts_total")
+        self.messages = metrics.counter("messages_total")
+        self.errors = metrics.counter("errors_total", source="async_runtime")
+        self.loop_lag = metrics.histogram("event_loop_lag_seconds")
+        self.max_loop_lag = 0.0
+        # sekunden zwischen zwei messungen der event loop verzögerung
+        self.lag_interval = 0.5
+
+        # filter aller symbole, geladen und erneuert von refresh_exchange_info
+        self.exchange_info = ExchangeInfo(client, int(self.config.get("ExchangeInfoTTL")))
+
+        # stream name -> AsyncTrader
+        self.traders = {}
+        for symbol in symbols:
+            trader = AsyncTrader(symbol, client, self, self.mail, os.path.join(state_directory, symbol.upper()))
+            self.traders[trader.stream_name()] = trader
+        self.symbols = {trader.symbol: trader for trader in self.traders.values()}
+
+    def stream_path(self):
+        streams = list(self.traders) + [trader.depth_stream_name() for trader in self.traders.values()
+                                        if trader.order_book is not None]
+        streams += [trader.trade_stream_name() for trader in self.traders.values() if trader.intrabar]
+        if self.listen_key is not None:
+            # der user data stream lässt sich über den listen key mit in den kombinierten stream nehmen
+            streams.append(self.listen_key)
+        return "{0}/stream?streams={1}".format(self.stream_url, "/".join(streams))
+
+    def on_message(self, msg):
+        """
+        verteilt eine nachricht des kombinierten streams, läuft im event loop und darf nicht blockieren
+
+        :param msg: dict {"stream": ..., "data": {...}}
+        :return: None
+        """
+        self.messages.increment()
+        data = msg.get('data', msg)
+        event = data.get('e')
+        if event == 'kline':
+            if data['k']['x']:
+                trader = self.traders.get(msg.get('stream'))
+                if trader is not None:
+                    trader.put_candle(data['k'])
+        elif event == 'aggTrade':
+            trader = self.symbols.get(data['s'])
+            if trader is not None:
+                trader.process_trade(data)
+        elif event == 'depthUpdate':
+            trader = self.symbols.get(data['s'])
+            if trader is not None:
+                trader.update_order_book(data)
+        elif event == 'executionReport':
+            trader = self.symbols.get(data['s'])
+            if trader is not None:
+                trader.process_order_update(data)
+        elif event == 'listenKeyExpired':
+            asyncio.ensure_future(self.renew_listen_key())
+
+    async def renew_listen_key(self):
+        self.listen_key = await self.client.create_listen_key()
+        # neuer stream mit dem neuen listen key
+        self.running = False
+
+    async def read_socket(self, session):
+        """
+        liest den websocket, baut die verbindung bei fehlern mit wachsender wartezeit neu auf
+
+        :param session: aiohttp.ClientSession
+        :return: None
+        """
+        backoff = 0.0
+        connected = False
+        while True:
+            try:
+                async with session.ws_connect(self.stream_path(), heartbeat=60) as socket:
+                    debug_logger.debug("async socket connected for %s streams", len(self.traders))
+                    if connected:
+                        # nach einem reconnect nur die verpassten kerzen nachladen
+                        for trader in self.traders.values():
+                            trader.start_backfill()
+                    connected = True
+                    self.running = True
+                    backoff = 0.0
+                    count = 0
+                    async for message in socket:
+                        # gepufferte nachrichten kommen ohne warten, ab und zu an die strategien abgeben
+                        count += 1
+                        if count % 100 == 0:
+                            await asyncio.sleep(0)
+                        if message.type == aiohttp.WSMsgType.TEXT:
+                            if self.recorder is not None:
+                                self.recorder.record(message.data)
+                            try:
+                                self.on_message(json.loads(message.data))
+                            except Exception as error:
+                                self.errors.increment()
+                                debug_logger.exception(error)
+                        elif message.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSED):
+                            break
+                        if not self.running:
+                            break
+            except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+                debug_logger.debug("async socket error: %s", error)
+            self.socket_restarts.increment()
+            # der erste versuch sofort, danach mit wachsender wartezeit
+            debug_logger.debug("reconnecting async socket in %ss", backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(max(backoff * 2, 1.0), 60.0)
+
+    async def keep_listen_key_alive(self, interval=1800):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.client.keepalive_listen_key(self.listen_key)
+            except Exception as error:
+                debug_logger.debug("listen key keepalive failed: %s", error)
+
+    async def load_exchange_info(self):
+        try:
+            self.exchange_info.load(await self.client.get_exchange_info())
+        except Exception as error:
+            self.exchange_info.failed(error)
+
+    async def refresh_exchange_info(self):
+        """
+        lädt die exchangeInfo neu sobald sie fällig ist (ttl, nach einem fehler RETRY_DELAY)
+
+        :return: None
+        """
+        while True:
+            await asyncio.sleep(self.exchange_info.RETRY_DELAY)
+            if self.exchange_info.due():
+                await self.load_exchange_info()
+
+    async def monitor_loop_lag(self):
+        """
+        misst wie viel später als geplant der event loop wieder zum zug kommt
+
+        :return: None
+        """
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(time.perf_counter() - start - self.lag_interval, 0.0)
+            self.loop_lag.observe(lag)
+            self.max_loop_lag = max(self.max_loop_lag, lag)
+
+    async def run(self, user_stream=True):
+        """
+        warm up aller symbole, dann websocket, strategien, mails und lag messung parallel
+
+        :param user_stream: bool order updates über den user data stream
+        :return: None
+        """
+        await self.client.start()
+        try:
+            await asyncio.gather(self.load_exchange_info(),
+                                 *(trader.warm_up_async() for trader in self.traders.values()))
+            if user_stream:
+                self.listen_key = await self.client.create_listen_key()
+                for trader in self.traders.values():
+                    trader.user_connection_key = self.listen_key
+            tasks = [trader.run_strategy() for trader in self.traders.values()]
+            tasks += [self.mail.run(), self.monitor_loop_lag(), self.refresh_exchange_info()]
+            if user_stream:
+                tasks.append(self.keep_listen_key_alive())
+            self.mail.send_mail("Tradingbot started", "Tradingbot started: {0}".format(
+                ", ".join(trader.symbol for trader in self.traders.values())))
+            async with aiohttp.ClientSession() as session:
+                await asyncio.gather(self.read_socket(session), *tasks)
+        finally:
+            for trader in self.traders.values():
+                trader.save_snapshot()
+                trader.state.close()
+            await self.client.close()
+
+    def start_socket(self):
+        """
+        startet die laufzeit, kehrt erst beim beenden zurück
+
+        :return: None
+        """
+        start_metrics()
+        asyncio.run(self.run())
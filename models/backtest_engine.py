@@ -0,0 +1,197 @@
+import time
+
+import numpy
+
+
+class BacktestResult:
+    """
+    Ergebnis eines Backtests
+    """
+
+    def __init__(self, indicators, buy_index, sell_index, buy_price, sell_price, trade_returns, position, equity,
+                 quantity, elapsed):
+        """
+
+        :param indicators: dict of numpy.ndarray
+        :param buy_index: numpy.ndarray indizes der käufe
+        :param sell_index: numpy.ndarray indizes der verkäufe
+        :param buy_price: numpy.ndarray
+        :param sell_price: numpy.ndarray
+        :param trade_returns: numpy.ndarray rendite je abgeschlossenem trade
+        :param position: numpy.ndarray 1 wenn nach der kerze in position
+        :param equity: numpy.ndarray gewinn/verlust je kerze (realisiert + offene position)
+        :param quantity: float
+        :param elapsed: float sekunden
+        """
+        self.indicators = indicators
+        self.buy_index = buy_index
+        self.sell_index = sell_index
+        self.buy_price = buy_price
+        self.sell_price = sell_price
+        self.trade_returns = trade_returns
+        self.position = position
+        self.equity = equity
+        self.quantity = quantity
+        self.elapsed = elapsed
+
+    @property
+    def bars(self):
+        return len(self.equity)
+
+    @property
+    def trades(self):
+        """
+        abgeschlossene trades (kauf und verkauf)
+
+        :return: int
+        """
+        return len(self.sell_index)
+
+    @property
+    def pnl(self):
+        """
+        gewinn/verlust am ende inklusive offener position
+
+        :return: float
+        """
+        return float(self.equity[-1]) if len(self.equity) else 0.0
+
+    @property
+    def win_rate(self):
+        if not self.trades:
+            return 0.0
+        return float(numpy.mean(self.trade_returns > 0))
+
+    @property
+    def max_drawdown(self):
+        """
+        größter rückgang vom bisherigen höchststand der equity
+
+        :return: float
+        """
+        if not len(self.equity):
+            return 0.0
+        peak = numpy.maximum.accumulate(numpy.maximum(self.equity, 0.0))
+        return float(numpy.max(peak - self.equity))
+
+    @property
+    def sharpe(self):
+        """
+        sharpe ratio der trade renditen (ohne annualisierung)
+
+        :return: float
+        """
+        returns = self.trade_returns
+        if len(returns) < 2 or numpy.std(returns) == 0:
+            return 0.0
+        return float(numpy.mean(returns) / numpy.std(returns) * numpy.sqrt(len(returns)))
+
+    def markers(self):
+        """
+        kauf- und verkaufspreise je kerze für den plot, sonst nan
+
+        :return: tuple numpy.ndarray bought, sold
+        """
+        bought = numpy.full(self.bars, numpy.nan)
+        sold = numpy.full(self.bars, numpy.nan)
+        bought[self.buy_index] = self.buy_price
+        sold[self.sell_index] = self.sell_price
+        return bought, sold
+
+    def summary(self):
+        """
+
+        :return: string
+        """
+        return "bars: {0} trades: {1} pnl: {2:.2f} win rate: {3:.1%} max drawdown: {4:.2f} sharpe: {5:.2f} " \
+               "time: {6:.3f}s ({7:.0f} bars/s)".format(self.bars, self.trades, self.pnl, self.win_rate,
+                                                         self.max_drawdown, self.sharpe, self.elapsed,
+                                                         self.bars / self.elapsed if self.elapsed else 0.0)
+
+
+class BacktestEngine:
+    """
+    Backtest über ganze Arrays. Indikatoren und Signale werden mit numpy für alle Kerzen auf einmal
+    berechnet, die Positionslogik läuft danach nur noch über die Kerzen mit einem Signal.
+    Es wird angenommen dass jede Order zum Close der Kerze sofort ausgeführt wird.
+    """
+
+    def __init__(self, strategy, quantity=1.0, fee=0.0):
+        """
+
+        :param strategy: Strategy
+        :param quantity: float menge je trade
+        :param fee: float gebühr je order als anteil (0.001 = 0.1%)
+        """
+        self.strategy = strategy
+        self.quantity = quantity
+        self.fee = fee
+
+    def run(self, closes, indicators=None, last_bought=0.0, in_position=False):
+        """
+
+        :param closes: numpy.ndarray
+        :param indicators: dict optional bereits berechnete indikatoren
+        :param last_bought: float
+        :param in_position: bool
+        :return: BacktestResult
+        """
+        start = time.perf_counter()
+        closes = numpy.asarray(closes, dtype=numpy.float64)
+        if indicators is None:
+            indicators = self.strategy.indicators(closes)
+
+        should_buy, should_sell = self.strategy.scores(indicators)
+        buy_signal = self.strategy.buy_signal(indicators, should_buy)
+        sell_signal = self.strategy.sell_signal(indicators, should_sell)
+
+        buy_index, sell_index, trade_returns = self.scan(closes, buy_signal, sell_signal, last_bought, in_position)
+        position, equity = self.equity(closes, buy_index, sell_index, in_position, last_bought)
+
+        return BacktestResult(indicators, buy_index, sell_index, closes[buy_index], closes[sell_index], trade_returns,
+                              position, equity, self.quantity, time.perf_counter() - start)
+
+    def scan(self, closes, buy_signal, sell_signal, last_bought, in_position):
+        """
+        positionslogik wie in process_message, nur über die kerzen mit kauf- oder verkaufssignal
+
+        :return: tuple numpy.ndarray buy_index, sell_index, trade_returns
+        """
+        buys = []
+        sells = []
+        returns = []
+        candidates = numpy.flatnonzero(buy_signal | sell_signal)
+        is_sell = sell_signal[candidates]
+        for index, sell in zip(candidates.tolist(), is_sell.tolist()):
+            close = closes[index]
+            if sell:
+                if in_position and self.strategy.sell_allowed(last_bought, close):
+                    sells.append(index)
+                    entry = last_bought * (1 + self.fee)
+                    returns.append(close * (1 - self.fee) / entry - 1 if entry else 0.0)
+                    in_position = False
+                    last_bought = 0.0
+            elif not in_position:
+                buys.append(index)
+                in_position = True
+                last_bought = close
+        return numpy.array(buys, dtype=numpy.intp), numpy.array(sells, dtype=numpy.intp), numpy.array(returns)
+
+    def equity(self, closes, buy_index, sell_index, in_position, last_bought):
+        """
+        gewinn/verlust je kerze aus den trades
+
+        :return: tuple numpy.ndarray position, equity
+        """
+        changes = numpy.zeros(len(closes))
+        cash = numpy.zeros(len(closes))
+        changes[buy_index] += 1
+        changes[sell_index] -= 1
+        cash[buy_index] -= closes[buy_index] * (1 + self.fee)
+        cash[sell_index] += closes[sell_index] * (1 - self.fee)
+
+        position = numpy.cumsum(changes) + (1 if in_position else 0)
+        if in_position:
+            cash[0] -= last_bought
+        equity = (numpy.cumsum(cash) + position * closes) * self.quantity
+        return position, equity
@@ -0,0 +1,131 @@
+from binance.helpers import date_to_milliseconds
+
+from models.backtest_engine import BacktestEngine
+from models.config import Config
+from models.kline_store import KlineStore, RestKlineFetcher
+from models.kline_parser import to_dataframe
+from models.rest_gateway import KLINE_INTERVALS, GatewayClient
+from models.state_store import StateStore
+from models.strategy import Strategy
+
+
+class Backtester:
+    """
+    Backtest Teil des Bots: Historie aus dem lokalen Kline Speicher, Auswertung mit der gleichen Strategie
+    wie der Live Bot und Plot. Öffnet keinen Websocket, der REST Client entsteht erst wenn Klines
+    nachgeladen werden müssen, pandas und matplotlib erst beim Plotten.
+    """
+
+    def __init__(self, symbol=None, client=None, state_directory="."):
+        """
+
+        :param symbol: string standard ist Symbol aus der settings.ini
+        :param client: binance.client.Client
+        :param state_directory: string position und letzter kaufpreis als startzustand
+        """
+        self.config = Config()
+        self.symbol = symbol if symbol is not None else self.config.get("Symbol")
+        self.client = client
+        self.state = StateStore(state_directory)
+        self.history_size = int(self.config.get("HistorySize", self.symbol))
+        self.strategy = Strategy(window=self.history_size)
+        self.kline_store = KlineStore(self.config.get("KlineStoreDirectory"), self.fetch_klines)
+
+    def fetch_klines(self, symbol, interval, start_ms, end_ms=None):
+        """
+        fetcher für den KlineStore, der REST Client wird erst beim ersten download erstellt
+
+        :param symbol: string
+        :param interval: string
+        :param start_ms: int
+        :param end_ms: int
+        :return: iterable of klines
+        """
+        if self.client is None:
+            self.client = GatewayClient.from_config(self.config)
+        return RestKlineFetcher(self.client)(symbol, interval, start_ms, end_ms)
+
+    def get_interval(self):
+        """
+
+        :return: string kline interval der api
+        """
+        return KLINE_INTERVALS.get(int(self.config.get("Interval", self.symbol)))
+
+    def load_history(self, start="1 week ago UTC"):
+        """
+        aktualisiert den lokalen kline speicher und gibt die kerzen ab start zurück (memory map, ohne kopie)
+
+        :param start: string oder timestamp in millisekunden
+        :return: dict of numpy.ndarray
+        """
+        start_ms = start if type(start) == int else date_to_milliseconds(start)
+        self.kline_store.update(self.symbol, self.get_interval(), start_ms)
+        return self.kline_store.read(self.symbol, self.get_interval(), start=start_ms // 1000)
+
+    def get_historical_candles(self, start="1 week ago UTC"):
+        return to_dataframe(self.load_history(start))
+
+    def backtest(self, start="1 week ago UTC", plot=True, verbose=False):
+        """
+        testet die strategie auf der historie, mit der gleichen strategie wie process_message
+
+        :param start: string startzeitpunkt der historie
+        :param plot: bool ergebnis plotten
+        :param verbose: bool indikatoren jeder kerze ausgeben
+        :return: BacktestResult
+        """
+        import pandas as pd
+
+        history = self.load_history(start)
+        engine = BacktestEngine(self.strategy, quantity=float(self.config.get("Quantity", self.symbol)))
+        result = engine.run(history["close"], last_bought=self.state.get("last_bought"),
+                            in_position=self.state.get("in_position"))
+        indicators = result.indicators
+        dates = pd.to_datetime(history["open_time"], unit='s')
+
+        if verbose:
+            should_buy, should_sell = self.strategy.scores(indicators)
+            for i in range(result.bars):
+                print("-------------------------------------------------------")
+                print("{0} close {1}".format(dates[i], indicators["close"][i]))
+                print("last_upperband_crossed {}".format(indicators["upperband_crossed"][i]))
+                print("last_lowerband_crossed {}".format(indicators["lowerband_crossed"][i]))
+                print("last_macd {}".format(indicators["macd"][i]))
+                print("last_signal {}".format(indicators["signal"][i]))
+                print("fastk {}".format(indicators["fastk"][i]))
+                print("fastd {}".format(indicators["fastd"][i]))
+                print("buy {}".format(should_buy[i]))
+                print("sell {}".format(should_sell[i]))
+                print("position {}".format(result.position[i]))
+
+        print(result.summary())
+
+        if plot:
+            self.plot(dates, result)
+
+        return result
+
+    def plot(self, dates, result):
+        """
+
+        :param dates: pandas.DatetimeIndex
+        :param result: BacktestResult
+        :return: None
+        """
+        import matplotlib.pyplot as plt
+
+        indicators = result.indicators
+        bought, sold = result.markers()
+        plt.figure(1)
+        plt.subplot(311)
+        plt.plot(dates, indicators["upperband"], color='yellow')
+        plt.plot(dates, indicators["middleband"], color='black')
+        plt.plot(dates, indicators["lowerband"], color='green')
+        plt.plot(dates, sold, color='red', marker='o')
+        plt.plot(dates, bought, color='green', marker='o')
+        plt.plot(dates, indicators["close"], color='blue')
+        plt.subplot(313)
+        plt.plot(dates, indicators["fastk"], label="fastk", color='red')
+        plt.plot(dates, indicators["fastd"], label="fastd", color='green')
+        plt.show()
@@ -1,24 +1,27 @@
+import atexit
 import json
+import logging
 import os
-import pandas as pd
-import numpy
-import talib
-from binance.helpers import *
-from binance.client import Client
+import pickle
+import threading
+import time
 from models.config import Config
-from binance.websockets import BinanceSocketManager
-import logging.handlers
-from models.mail import Mail
-import matplotlib.pyplot as plt
-
-debug_logger = logging.getLogger('debug.log')
-debug_logger.setLevel(logging.DEBUG)
-formatter = logging.Formatter(
-    '%(asctime)s || [%(filename)s:%(lineno)s - %(funcName)20s() ] - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S')
-rotating_file_handler = logging.handlers.RotatingFileHandler(filename='debug.log')
-rotating_file_handler.setFormatter(formatter)
-debug_logger.addHandler(rotating_file_handler)
+from models.candle_buffer import CandleBuffer, kline_to_candle
+from models.state_store import StateStore
+from models.strategy import Strategy
+from models.kline_parser import parse_klines, to_dataframe
+from models.rest_gateway import KLINE_INTERVALS, GatewayClient
+from models.logger import setup_logging
+from models.mail import MailDispatcher
+from models.ingestion import KlineIngestor
+from models.metrics import metrics, start_metrics
+from models.order_book import OrderBook
+from models.exchange_info import ExchangeInfo
+from models.cpu_budget import shared_budget
+from models.recorder import create_recorder
+from models.journal import create_journal
+
+debug_logger = setup_logging('debug.log')
 
 
 class BinanceAPI:
@@ -26,46 +29,115 @@ class BinanceAPI:
     Verwaltet Methoden für die Zugriffe auf die Binance API
     """
 
+    # maximale anzahl kerzen die nach einem reconnect nachgeladen werden, bei längeren lücken wird neu aufgesetzt
+    BACKFILL_LIMIT = 1000
+
+    # höchstens so viele kerzen liefert binance je anfrage, die historie wird in seiten geladen
+    KLINES_LIMIT = 1000
+
+    # indikatoren und kerzen beim beenden, im verzeichnis des zustands
+    SNAPSHOT_FILE = "snapshot.pickle"
+
+    # status einer order die ohne ausführung beendet wurde
+    CANCELLED_STATUSES = ("CANCELED", "CANCELLED", "REJECTED", "EXPIRED")
+
     # noinspection PyTypeChecker
-    def __init__(self):
-        self.closes = []
+    def __init__(self, symbol=None, client=None, socket_manager=None, mail=None, state_directory=".",
+                 exchange_info=None):
+        """
+        ohne socket_manager wird ein eigener kline socket für das symbol geöffnet,
+        im multi symbol betrieb werden client, socket manager und mail geteilt
+
+        :param symbol: string standard ist Symbol aus der settings.ini
+        :param client: binance.client.Client
+        :param socket_manager: BinanceSocketManager
+        :param mail: MailDispatcher
+        :param state_directory: string verzeichnis für position, last_bought und last_order_id
+        :param exchange_info: ExchangeInfo filter aller symbole, im multi symbol betrieb geteilt
+        """
         self.rsi_overbought = 70
         self.rsi_oversold = 15
         self.rsi_period = 21
         self.config = Config()
-        self.client = Client(self.config.get("Binance_api_key"), self.config.get("Binance_api_secret"))
-        self.socket_manager = BinanceSocketManager(self.client)
-        self.connection_key = self.socket_manager.start_kline_socket(self.config.get("Symbol"), self.process_message,
-                                                                     interval=self.get_interval())
+        self.symbol = symbol if symbol is not None else self.config.get("Symbol")
+        self.state = StateStore(state_directory)
+        if mail is None:
+            mail = MailDispatcher()
+            mail.start()
+        self.mail = mail
+        self.history_size = int(self.config.get("HistorySize", self.symbol))
+        self.candles = CandleBuffer(self.history_size)
+        self.strategy = Strategy(window=self.history_size)
+        self.indicators = self.strategy.indicator_engine()
+        if client is None:
+            client = GatewayClient.from_config(self.config)
+        self.client = client
+        if exchange_info is None:
+            exchange_info = ExchangeInfo(client, int(self.config.get("ExchangeInfoTTL")))
+        self.exchange_info = exchange_info
+        self.connection_key = None
+        self.user_connection_key = None
+        self.reconcile_candles = int(self.config.get("ReconcileCandles"))
+        self.candles_since_reconcile = 0
+        self.reconnect_attempts = 0
+        self.ingestor = None
+        # laufzeiten der einzelnen schritte, die histogramme werden einmal geholt und im hot path nur benutzt
+        self.timings = {stage: metrics.histogram("stage_seconds", stage=stage, symbol=self.symbol)
+                        for stage in ("parse", "indicators", "decision", "order_submit", "order_status",
+                                      "backfill", "intrabar")}
+        self.socket_restarts = metrics.counter("socket_restarts_total", symbol=self.symbol)
+        self.order_errors = metrics.counter("errors_total", source="order", symbol=self.symbol)
+        # änderungen an kerzen und indikatoren, damit der snapshot beim beenden einen festen stand sieht
+        self.candle_lock = threading.Lock()
+        if socket_manager is None:
+            # der websocket legt die kerzen nur in die queue, ausgewertet wird im worker thread.
+            # geöffnet wird er erst in start_socket
+            self.ingestor = KlineIngestor(self.process_message, int(self.config.get("IngestionQueueSize")),
+                                          recorder=create_recorder())
+        self.socket_manager = socket_manager
+        self.depth_connection_key = None
+        # lokales order buch für die limit preise, nur wenn der depth stream abonniert wird
+        self.order_book = OrderBook(self.symbol) if int(self.config.get("OrderBook", self.symbol)) else None
+        self.order_book_limit = int(self.config.get("OrderBookLimit", self.symbol))
+        # intrabar modus: jeder trade der offenen kerze wird mit vorläufigen indikatoren ausgewertet
+        self.intrabar = bool(int(self.config.get("Intrabar", self.symbol)))
+        self.cpu_budget = shared_budget() if self.intrabar else None
+        self.trade_connection_key = None
+        self.interval_seconds = int(self.config.get("Interval", self.symbol))
+        # protokoll der kerzen, entscheidungen und orders (JournalFile), None wenn nicht protokolliert wird
+        self.journal = create_journal()
+
+    def stream_name(self):
+        """
+        name des kline streams für den kombinierten websocket
 
-    def write_file(self, path, content):
+        :return: string
         """
+        return "{0}@kline_{1}".format(self.symbol.lower(), self.get_interval())
 
-        :param path:
-        :param content:
-        :return:
+    def depth_stream_name(self):
         """
-        with open(path, "w") as file:
-            file.write(content)
+        name des diff depth streams für den kombinierten websocket
 
-    def read_file(self, path):
+        :return: string
         """
+        return "{0}@depth@100ms".format(self.symbol.lower())
 
-        :param path:
-        :return:
+    def trade_stream_name(self):
+        """
+        name des aggTrade streams für den intrabar modus
+
+        :return: string
         """
-        if os.path.isfile(path):
-            with open(path, "r") as file:
-                return str(file.read())
-        return ""
+        return "{0}@aggTrade".format(self.symbol.lower())
 
     def set_last_bought(self, close):
         """
-        writes the last bought value into a text file
+        setzt den preis der letzten kauforder
         :param close:
         :return:
         """
-        self.write_file(os.path.join("last_bought.txt"), str(float(close)))
+        self.state.set("last_bought", close)
 
     def get_last_order_id(self):
         """
@@ -73,7 +145,7 @@ class BinanceAPI:
 
         :return:
         """
-        return self.read_file(os.path.join("last_order_id.txt"))
+        return self.state.get("last_order_id")
 
     def set_last_order_id(self, order_id):
         """
@@ -82,16 +154,14 @@ class BinanceAPI:
         :param order_id: string
         :return: None
         """
-        self.write_file(os.path.join("last_order_id.txt"), str(order_id))
+        self.state.set("last_order_id", order_id)
 
     def get_last_bought(self):
         """
         gibt den preis der letzten kauforder zurück
         :return:
         """
-        if (self.read_file(os.path.join("last_bought.txt"))) != "":
-            return float(self.read_file(os.path.join("last_bought.txt")))
-        return 0.0
+        return self.state.get("last_bought")
 
     def set_in_position(self, position):
         """
@@ -100,7 +170,7 @@ class BinanceAPI:
         :param position:
         :return:
         """
-        self.write_file(os.path.join("position.txt"), str(int(position)))
+        self.state.set("in_position", position)
 
     def get_in_position(self):
         """
@@ -108,9 +178,7 @@ class BinanceAPI:
 
         :return:
         """
-        if self.read_file(os.path.join("position.txt")) != "":
-            return bool(int(self.read_file(os.path.join("position.txt"))))
-        return 0
+        return self.state.get("in_position")
 
     def start_socket(self):
         """
@@ -118,28 +186,244 @@ class BinanceAPI:
 
         :return: None
         """
-        dataframe = self.get_candles()
-        for close in dataframe['close']:
-            self.closes.append(close)
+        # twisted/autobahn nur für den live betrieb mit eigenem socket laden
+        from binance.websockets import BinanceSocketManager
+
+        self.warm_up()
+        # filter vor der ersten order laden, nicht erst im order pfad
+        self.exchange_info.refresh()
+        self.exchange_info.start_refresher()
+        atexit.register(self.save_snapshot)
+        start_metrics()
+        self.socket_manager = BinanceSocketManager(self.client)
+        self.connection_key = self.socket_manager.start_kline_socket(self.symbol, self.ingestor.on_message,
+                                                                     interval=self.get_interval())
+        self.user_connection_key = self.socket_manager.start_user_socket(self.ingestor.on_message)
+        if self.order_book is not None:
+            self.depth_connection_key = self.socket_manager.start_depth_socket(self.symbol, self.ingestor.on_message)
+        if self.intrabar:
+            self.trade_connection_key = self.socket_manager.start_aggtrade_socket(self.symbol,
+                                                                                  self.ingestor.on_message)
+        self.ingestor.start()
         self.socket_manager.start()
         debug_logger.debug("socket started")
-        mail = Mail()
         debug_logger.debug(
             "**************************************** TRADING BOT STARTED ****************************************")
-        mail.send_mail("Tradingbot started", "Tradingbot started")
+        self.mail.send_mail("Tradingbot started", "Tradingbot started")
+
+    def warm_up(self, snapshot=True):
+        """
+        lädt die letzten kerzen für die indikatoren. gibt es einen snapshot vom letzten beenden,
+        werden nur die kerzen seitdem nachgeladen
+
+        :param snapshot: bool snapshot benutzen
+        :return: None
+        """
+        if snapshot and self.load_snapshot():
+            klines = self.client.get_klines(symbol=self.symbol, interval=self.get_interval(),
+                                            startTime=self.backfill_start(), limit=self.BACKFILL_LIMIT)
+            if self.resume_from(klines):
+                return
+        self.warm_up_from(self.fetch_candles())
+
+    def warm_up_from(self, columns):
+        """
+
+        :param columns: dict of numpy.ndarray oder pandas.DataFrame
+        :return: None
+        """
+        with self.candle_lock:
+            self.candles.extend(columns)
+            # python floats, mit numpy skalaren wäre jede weitere aktualisierung der indikatoren langsamer
+            for close in columns['close'].tolist():
+                self.indicators.update(close)
+
+    def resume_from(self, klines):
+        """
+        übernimmt die seit dem snapshot geschlossenen kerzen ohne zu handeln, wie beim warm up
+
+        :param klines: list of klines der rest api ab backfill_start
+        :return: bool False wenn die lücke zu groß ist, kerzen und indikatoren sind dann zurückgesetzt
+        """
+        count = self.apply_backfill(klines, evaluate=False)
+        if count is None:
+            self.reset_candles()
+            return False
+        debug_logger.debug("resumed from snapshot, %s candles since shutdown", count)
+        return True
+
+    def snapshot_path(self):
+        return os.path.join(self.state.directory, self.SNAPSHOT_FILE)
+
+    def snapshot_key(self):
+        """
+        ein snapshot passt nur zu gleichem symbol, interval und gleichen strategie parametern
+
+        :return: dict
+        """
+        return {"symbol": self.symbol, "interval": self.get_interval(), "history_size": self.history_size,
+                "strategy": dict(vars(self.strategy))}
+
+    def save_snapshot(self):
+        """
+        schreibt kerzen und indikatorzustand atomar, ein neustart spart sich damit das warm up über rest
+
+        :return: None
+        """
+        if not int(self.config.get("WarmSnapshot")) or not len(self.candles):
+            return
+        try:
+            with self.candle_lock:
+                content = pickle.dumps({"key": self.snapshot_key(), "candles": self.candles,
+                                        "indicators": self.indicators}, protocol=pickle.HIGHEST_PROTOCOL)
+            self.state.write(self.snapshot_path(), content)
+        except Exception as error:
+            # ohne snapshot startet der bot beim nächsten mal nur langsamer
+            debug_logger.debug("snapshot not saved: %s", error)
+            return
+        debug_logger.debug("saved snapshot with %s candles", len(self.candles))
+
+    def load_snapshot(self):
+        """
+        übernimmt den snapshot wenn er zu den einstellungen passt und die lücke seitdem
+        mit einer anfrage nachgeladen werden kann
+
+        :return: bool
+        """
+        path = self.snapshot_path()
+        if not int(self.config.get("WarmSnapshot")) or not os.path.isfile(path):
+            return False
+        try:
+            with open(path, "rb") as file:
+                snapshot = pickle.load(file)
+        except Exception as error:
+            debug_logger.debug("invalid snapshot %s: %s", path, error)
+            return False
+        if snapshot["key"] != self.snapshot_key():
+            debug_logger.debug("snapshot %s does not match the settings", path)
+            return False
+        candles = snapshot["candles"]
+        age = time.time() - candles.last("open_time")
+        if age >= self.BACKFILL_LIMIT * int(self.config.get("Interval", self.symbol)):
+            debug_logger.debug("snapshot %s is too old", path)
+            return False
+        with self.candle_lock:
+            self.candles = candles
+            self.indicators = snapshot["indicators"]
+        return True
 
     def restart_socket(self):
         """
-        startet den socket neu
+        öffnet den socket neu, der erste versuch sofort, danach mit wachsender wartezeit (bis 60s)
+
+        :return: None
+        """
+        delay = min(2 ** (self.reconnect_attempts - 1), 60) if self.reconnect_attempts else 0
+        self.reconnect_attempts += 1
+        debug_logger.debug("restarting socket in %ss", delay)
+        self.socket_restarts.increment()
+        threading.Timer(delay, self.reconnect).start()
+
+    def reconnect(self):
+        """
+        öffnet den kline socket neu, das nachladen der verpassten kerzen übernimmt der ingestion worker
+        ('reconnected' nachricht), damit die indikatoren nur von einem thread verändert werden
 
         :return: None
         """
-        debug_logger.debug("restarting socket")
         self.socket_manager.stop_socket(self.connection_key)
-        self.start_socket()
+        self.connection_key = self.socket_manager.start_kline_socket(self.symbol, self.ingestor.on_message,
+                                                                     interval=self.get_interval())
+        if self.order_book is not None:
+            # die lücke im depth stream erkennt das order buch selbst und holt einen neuen snapshot
+            self.socket_manager.stop_socket(self.depth_connection_key)
+            self.depth_connection_key = self.socket_manager.start_depth_socket(self.symbol, self.ingestor.on_message)
+        if self.intrabar:
+            self.socket_manager.stop_socket(self.trade_connection_key)
+            self.trade_connection_key = self.socket_manager.start_aggtrade_socket(self.symbol,
+                                                                                  self.ingestor.on_message)
+        self.ingestor.on_message({'e': 'reconnected'})
         debug_logger.debug("socket restarted")
-        mail = Mail()
-        mail.send_mail("Tradingbot socket restarted", "Tradingbot socket restarted")
+        self.mail.send_mail("Tradingbot socket restarted", "Tradingbot socket restarted")
+
+    def backfill(self):
+        """
+        lädt die kerzen nach die seit der letzten verarbeiteten kerze geschlossen wurden und übernimmt sie
+        in die indikatoren. ist die lücke größer als BACKFILL_LIMIT wird komplett neu aufgesetzt
+
+        :return: int anzahl nachgeladener kerzen
+        """
+        started = time.perf_counter()
+        klines = self.client.get_klines(symbol=self.symbol, interval=self.get_interval(),
+                                        startTime=self.backfill_start(), limit=self.BACKFILL_LIMIT)
+        count = self.apply_backfill(klines)
+        if count is None:
+            self.reset_candles()
+            self.warm_up(snapshot=False)
+            count = len(self.candles)
+        self.timings["backfill"].observe(time.perf_counter() - started)
+        debug_logger.debug("backfilled %s candles in %.1fms", count, (time.perf_counter() - started) * 1000)
+        return count
+
+    def backfill_start(self):
+        """
+
+        :return: int open time in millisekunden ab der nachgeladen wird
+        """
+        return int(self.candles.last("open_time")) * 1000 + 1 if len(self.candles) else 0
+
+    def apply_backfill(self, klines, evaluate=True):
+        """
+        übernimmt die geschlossenen und noch nicht verarbeiteten kerzen, ausgewertet wird nur die letzte
+
+        :param klines: list of klines der rest api
+        :param evaluate: bool die letzte kerze auswerten und gegebenenfalls handeln
+        :return: int anzahl übernommener kerzen, None wenn die lücke zu groß ist
+        """
+        if len(klines) >= self.BACKFILL_LIMIT:
+            return None
+        count = 0
+        indicators = close = None
+        for candle in self.closed_candles(klines):
+            if self.is_new_candle(candle):
+                indicators, close = self.update_candle(candle)
+                count += 1
+        if count and evaluate:
+            self.act(self.decide(indicators, close), close)
+        return count
+
+    def closed_candles(self, klines):
+        """
+
+        :param klines: list of klines der rest api
+        :return: list of dict im format des websockets, ohne die noch offene kerze
+        """
+        now = time.time() * 1000
+        return [kline_to_candle(kline) for kline in klines if kline[6] < now]
+
+    def is_new_candle(self, candle):
+        """
+        kerzen die schon verarbeitet wurden (z.b. nach einem reconnect doppelt geliefert) werden übersprungen
+
+        :param candle: dict
+        :return: bool
+        """
+        return not len(self.candles) or candle['t'] // 1000 > self.candles.last("open_time")
+
+    def reset_candles(self):
+        with self.candle_lock:
+            self.candles = CandleBuffer(self.history_size)
+            self.indicators = self.strategy.indicator_engine()
+
+    def restart_user_socket(self):
+        """
+        öffnet den user data stream mit einem neuen listen key
+
+        :return: None
+        """
+        debug_logger.debug("restarting user socket")
+        self.socket_manager.stop_socket(self.user_connection_key)
+        self.user_connection_key = self.socket_manager.start_user_socket(self.ingestor.on_message)
 
     def check_last_order_status(self):
         """
@@ -149,8 +433,36 @@ class BinanceAPI:
         """
 
         order_id = self.get_last_order_id()
-        order = self.client.get_order(symbol=self.config.get("Symbol"), orderId=order_id)
+        with self.timings["order_status"].time():
+            order = self.client.get_order(symbol=self.symbol, orderId=order_id)
+        self.candles_since_reconcile = 0
+        self.apply_order(order)
+
+    def process_order_update(self, msg):
+        """
+        wertet einen executionReport aus dem user data stream aus, nur die letzte eigene order zählt
 
+        :param msg: dict
+        :return: None
+        """
+        if str(msg["i"]) != str(self.get_last_order_id()):
+            return
+        price = msg["p"]
+        # market orders haben keinen limit preis, dann den durchschnittlichen ausführungspreis nehmen
+        if float(price) == 0 and float(msg["z"]) > 0:
+            price = str(float(msg["Z"]) / float(msg["z"]))
+        self.apply_order({"orderId": msg["i"], "status": msg["X"], "side": msg["S"], "price": price,
+                          "origQty": msg["q"]})
+
+    def apply_order(self, order):
+        """
+        übernimmt den status einer order (rest oder user data stream) in den zustand
+
+        :param order: dict mit status, side, price und origQty
+        :return: None
+        """
+        if order["status"] == "FILLED" or order["status"] in self.CANCELLED_STATUSES:
+            self.journal_order(order["side"], order["orderId"], order["status"], order["price"], order["origQty"])
         """
         order wurde durchgeführt
         """
@@ -161,31 +473,31 @@ class BinanceAPI:
                 self.set_last_bought(0.0)
                 self.send_sell_filled_mail(order["price"], order["origQty"])
                 debug_logger.debug(
-                    "************************************ Verkauforder ausgeführt: {0} Menge: {1} ************************************".format(
-                        order["price"], order["origQty"]))
+                    "************************************ Verkauforder ausgeführt: %s Menge: %s ************************************",
+                    order["price"], order["origQty"])
             if order["side"] == "BUY":
                 self.set_last_bought(order["price"])
                 self.set_in_position(True)
                 self.send_buy_filled_mail(order["price"], order["origQty"])
                 debug_logger.debug(
-                    "************************************ Kauforder ausgeführt: {0} Menge: {1} ************************************".format(
-                        order["price"], order["origQty"]))
+                    "************************************ Kauforder ausgeführt: %s Menge: %s ************************************",
+                    order["price"], order["origQty"])
 
         """
         order wurde abgebrochen
         """
-        if order["status"] == "CANCELLED":
+        if order["status"] in self.CANCELLED_STATUSES:
             self.set_last_order_id("")
             if order["side"] == "SELL":
                 self.send_sell_cancelled_mail(order["price"], order["origQty"])
                 debug_logger.debug(
-                    "************************************ Verkauforder abgebrochen: {0} Menge: {1} ************************************".format(
-                        order["price"], order["origQty"]))
+                    "************************************ Verkauforder abgebrochen: %s Menge: %s ************************************",
+                    order["price"], order["origQty"])
             if order["side"] == "BUY":
                 self.send_buy_cancelled_mail(order["price"], order["origQty"])
                 debug_logger.debug(
-                    "************************************ Kauforder abgebrochen: {0} Menge: {1} ************************************".format(
-                        order["price"], order["origQty"]))
+                    "************************************ Kauforder abgebrochen: %s Menge: %s ************************************",
+                    order["price"], order["origQty"])
 
     def process_message(self, msg):
         """
@@ -203,6 +515,19 @@ class BinanceAPI:
             """
             debug_logger.debug(json.dumps(msg))
             self.restart_socket()
+        elif msg['e'] == 'executionReport':
+            self.process_order_update(msg)
+        elif msg['e'] == 'listenKeyExpired':
+            self.restart_user_socket()
+        elif msg['e'] == 'reconnected':
+            self.backfill()
+        elif msg['e'] == 'depthUpdate':
+            self.update_order_book(msg)
+        elif msg['e'] == 'aggTrade':
+            self.process_trade(msg)
+        elif msg['e'] != 'kline':
+            # sonstige events des user data streams (kontostand usw.) werden nicht gebraucht
+            return
         else:
             """
             Response vom Websocket auswerten
@@ -210,223 +535,214 @@ class BinanceAPI:
             json_message = msg
             candle = json_message["k"]
             is_candle_closed = candle["x"]
-            close = float(candle["c"])
+            self.reconnect_attempts = 0
 
             """
             nur in die berechnung gehen wenn die kerze geschlossen ist und der liste hinzugefügt werden kann
             """
-            if is_candle_closed:
-                should_sell = 0
-                should_buy = 0
-                debug_logger.debug("---------------------------")
-                self.closes.append(close)
-
-                # die liste auf 800 kerzen beschränken
-                while len(self.closes) > 500:
-                    self.closes.pop(0)
-
-                # aus der liste einen numpy array zaubern
-                np_closes = numpy.array(self.closes)
-
-                fastk, fastd = talib.STOCHRSI(np_closes, timeperiod=14, fastk_period=5, fastd_period=3, fastd_matype=0)
-
-                # macd berechnen
-                ShortEMA = talib.EMA(np_closes, 9)
-                LongEMA = talib.EMA(np_closes, 18)
-                MACD = ShortEMA - LongEMA
-                signal = talib.EMA(MACD, 5)
-
-                # bollinger bänder berechnen
-                upperband, middleband, lowerband = talib.BBANDS(np_closes, timeperiod=18, nbdevup=2, nbdevdn=2,
-                                                                matype=0)
-                upperband_crossed = numpy.where((np_closes > upperband), 1, 0)
-                lowerband_crossed = numpy.where((np_closes < lowerband), 1, 0)
-
-                # preis durchschnitt und max/min berechnen in dem getraded werden soll
-                max_price = numpy.amax(np_closes)
-                lowest_price = numpy.amin(np_closes)
-                average_price = numpy.average(np_closes)
-
-                last_upperband_crossed = upperband_crossed[-1]
-                last_lowerband_crossed = lowerband_crossed[-1]
-                last_macd = MACD[-1]
-                last_signal = signal[-1]
-                last_fastk = fastk[-1]
-                last_fastd = fastd[-1]
-
-                if self.get_last_order_id() != "":
+            if is_candle_closed and self.is_new_candle(candle):
+                indicators, close = self.update_candle(candle)
+
+                # order updates kommen über den user data stream, per rest wird nur zur sicherheit abgeglichen
+                if self.reconcile_due():
                     self.check_last_order_status()
 
-                if last_macd > last_signal:
-                    should_buy += 1
+                self.act(self.decide(indicators, close), close)
 
-                if last_lowerband_crossed:
-                    should_buy += 1
+    def process_trade(self, trade):
+        """
+        intrabar modus: der trade preis gilt als close der offenen kerze, die strategie wird mit den
+        vorläufigen indikatoren ausgewertet. der zustand der indikatoren ändert sich erst mit der geschlossenen
+        kerze. ausgewertet wird nur solange das cpu budget (IntrabarBudget) reicht
 
-                if last_macd < last_signal:
-                    should_sell += 1
+        :param trade: dict aggTrade
+        :return: None
+        """
+        if not self.intrabar or not len(self.candles):
+            return
+        # nur trades der offenen kerze, nach deren ende fehlt erst noch die geschlossene kerze
+        candle_start = (self.candles.last("open_time") + self.interval_seconds) * 1000
+        if not candle_start <= trade['T'] < candle_start + self.interval_seconds * 1000:
+            return
+        if not self.cpu_budget.allow():
+            return
+        started = time.perf_counter()
+        price = float(trade['p'])
+        indicators = self.indicators.preview(price)
+        side = self.decide(indicators, price, log=False)
+        elapsed = time.perf_counter() - started
+        self.cpu_budget.spend(elapsed)
+        self.timings["intrabar"].observe(elapsed)
+        if side is not None:
+            debug_logger.debug("intrabar %s at %s", side, price)
+            self.act(side, price)
+
+    def update_order_book(self, event):
+        """
+        übernimmt ein depth event, fehlt der anschluss wird ein neuer snapshot geholt
 
-                if last_upperband_crossed:
-                    should_sell += 1
+        :param event: dict depthUpdate
+        :return: None
+        """
+        if self.order_book is None:
+            return
+        self.order_book.update(event)
+        if self.order_book.needs_snapshot():
+            self.order_book.request_snapshot()
+            self.resync_order_book()
+
+    def resync_order_book(self):
+        """
+        holt den snapshot für das order buch per rest
 
-                if last_fastd > 90 and last_fastk > 90:
-                    should_buy += 1
+        :return: None
+        """
+        try:
+            snapshot = self.client.get_order_book(symbol=self.symbol, limit=self.order_book_limit)
+        except Exception as error:
+            debug_logger.debug("order book snapshot failed: %s", error)
+            self.order_book.snapshot_failed()
+            return
+        self.order_book.apply_snapshot(snapshot)
+
+    def act(self, side, close):
+        """
+
+        :param side: string "SELL", "BUY" oder None aus decide
+        :param close: float
+        :return: None
+        """
+        if side == "SELL":
+            self.sell(close)
+        elif side == "BUY":
+            self.buy(close)
+
+    def update_candle(self, candle):
+        """
+        übernimmt eine geschlossene kerze und aktualisiert die indikatoren
+
+        :param candle: dict kline aus dem websocket
+        :return: tuple indikatoren, close
+        """
+        debug_logger.debug("---------------------------")
+        with self.candle_lock:
+            with self.timings["parse"].time():
+                close = float(candle["c"])
+                self.candles.append_kline(candle)
+
+            # die indikatoren werden fortlaufend mit der neuen kerze aktualisiert
+            with self.timings["indicators"].time():
+                indicators = self.indicators.update(close)
+        self.candles_since_reconcile += 1
+        if self.journal is not None:
+            self.journal.candle(self.symbol, candle, indicators)
+        return indicators, close
+
+    def reconcile_due(self):
+        """
+        die offene order soll per rest abgefragt werden: ohne user data stream bei jeder kerze,
+        sonst alle ReconcileCandles kerzen
 
-                if last_fastd <= 20 and last_fastk <= 20:
-                    should_sell += 1
+        :return: bool
+        """
+        return self.get_last_order_id() != "" and (self.user_connection_key is None or
+                                                   self.candles_since_reconcile >= self.reconcile_candles)
 
-                debug_logger.debug("last_upperband_crossed {}".format(last_upperband_crossed))
-                debug_logger.debug("last_lowerband_crossed {}".format(last_lowerband_crossed))
-                debug_logger.debug("last_macd {}".format(last_macd))
-                debug_logger.debug("last_signal {}".format(last_signal))
-                debug_logger.debug("fastk {}".format(last_fastk))
-                debug_logger.debug("fastd {}".format(last_fastd))
-                debug_logger.debug("unterer preisbereich {}".format(lowest_price < close < average_price))
-                debug_logger.debug("oberer preisbereich {}".format(max_price > close > average_price))
-                debug_logger.debug("buy {}".format(should_buy))
-                debug_logger.debug("sell {}".format(should_sell))
+    def can_order(self):
+        """
+        neue orders erst wenn keine order mehr offen ist
+
+        :return: bool
+        """
+        return self.get_last_order_id() == ""
 
-                if should_sell == 3 and max_price > close > average_price and self.get_last_bought() + 5 < close and self.get_last_order_id() == "":
-                    if self.get_in_position():
-                        self.sell(close)
-                    else:
-                        debug_logger.debug("it is overbought but we dont own anything so nothing to do")
+    def decide(self, indicators, close, log=True):
+        """
+        wertet die strategie für die letzte kerze aus
 
-                if should_buy == 3 and lowest_price < close < average_price and self.get_last_order_id() == "":
-                    if self.get_in_position():
-                        debug_logger.debug("it is oversold, but you already own it, nothing to do")
-                    else:
-                        self.buy(close)
+        :param indicators: dict
+        :param close: float
+        :param log: bool logzeile der entscheidung, False im intrabar modus (nicht je trade)
+        :return: string "SELL", "BUY" oder None
+        """
+        with self.timings["decision"].time():
+            should_buy, should_sell = self.strategy.scores(indicators)
+            sell_signal = self.strategy.sell_signal(indicators, should_sell) \
+                and self.strategy.sell_allowed(self.get_last_bought(), close)
+            buy_signal = self.strategy.buy_signal(indicators, should_buy)
+
+        if log and debug_logger.isEnabledFor(logging.DEBUG):
+            self.log_decision(indicators, should_buy, should_sell)
+
+        side = None
+        if sell_signal and self.can_order():
+            if self.get_in_position():
+                side = "SELL"
+            else:
+                debug_logger.debug("it is overbought but we dont own anything so nothing to do")
+
+        if side is None and buy_signal and self.can_order():
+            if self.get_in_position():
+                debug_logger.debug("it is oversold, but you already own it, nothing to do")
+            else:
+                side = "BUY"
+
+        # je geschlossener kerze immer, im intrabar modus nur die trades die zu einer order führen
+        if self.journal is not None and (log or side is not None):
+            open_time = self.candles.last("open_time") + (0 if log else self.interval_seconds)
+            self.journal.decision(self.symbol, int(open_time) * 1000, close, should_buy, should_sell, side,
+                                  intrabar=not log)
+        return side
+
+    def log_decision(self, indicators, should_buy, should_sell):
+        """
+        eine logzeile je geschlossener kerze, formatiert wird erst im log thread.
+        im json format stehen alle werte zusätzlich als felder unter "decision"
+
+        :param indicators: dict
+        :param should_buy: int
+        :param should_sell: int
+        :return: None
+        """
+        close = indicators["close"]
+        # preis durchschnitt und max/min der letzten kerzen (HistorySize) in dem getraded werden soll
+        lower_range = indicators["lowest_price"] < close < indicators["average_price"]
+        upper_range = indicators["max_price"] > close > indicators["average_price"]
+        debug_logger.debug(
+            "%s close %s last_upperband_crossed %s last_lowerband_crossed %s last_macd %s last_signal %s "
+            "fastk %s fastd %s unterer preisbereich %s oberer preisbereich %s buy %s sell %s", self.symbol, close,
+            indicators["upperband_crossed"], indicators["lowerband_crossed"], indicators["macd"],
+            indicators["signal"], indicators["fastk"], indicators["fastd"], lower_range, upper_range, should_buy,
+            should_sell,
+            extra={"decision": {"symbol": self.symbol, "close": close, "macd": indicators["macd"],
+                                "signal": indicators["signal"], "fastk": indicators["fastk"],
+                                "fastd": indicators["fastd"], "upperband_crossed": indicators["upperband_crossed"],
+                                "lowerband_crossed": indicators["lowerband_crossed"], "lower_range": lower_range,
+                                "upper_range": upper_range, "buy": should_buy, "sell": should_sell}})
+
+    def journal_order(self, side, order_id, status, price=None, quantity=None, message=None):
+        """
+        gesendete order oder fehler beim senden ins journal
+
+        :param side: string BUY oder SELL
+        :param order_id: string oder int
+        :param status: string status der antwort oder ERROR
+        :param price: string
+        :param quantity: string
+        :param message: string
+        :return: None
+        """
+        if self.journal is not None:
+            self.journal.order(self.symbol, order_id, side, status, price, quantity, message)
 
     def get_order_type(self):
-        order_type = self.config.get("OrderType")
+        order_type = self.config.get("OrderType", self.symbol)
         if order_type == "0":
             order_type = self.client.ORDER_TYPE_MARKET
         if order_type == "1":
             order_type = self.client.ORDER_TYPE_LIMIT
         return order_type
 
-    def backtest(self):
-        """
-
-        :return: None
-        """
-        dataframe = self.get_historical_candles()
-        dates = list()
-
-        for close in dataframe["close"]:
-            self.closes.append(close)
-
-        while len(self.closes) > 500:
-            self.closes.pop(0)
-
-        for date in dataframe['datetime']:
-            dates.append(date)
-
-        while len(dates) > 500:
-            dates.pop(0)
-
-        np_closes = numpy.array(self.closes)
-        ShortEMA = talib.EMA(np_closes, 9)
-        LongEMA = talib.EMA(np_closes, 18)
-        fastk, fastd = talib.STOCHRSI(np_closes, timeperiod=14, fastk_period=5, fastd_period=3, fastd_matype=0)
-        MACD = ShortEMA - LongEMA
-        signal = talib.EMA(MACD, 5)
-        upperband, middleband, lowerband = talib.BBANDS(np_closes, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
-        upperband_crossed = numpy.where((np_closes > upperband), 1, 0)
-        lowerband_crossed = numpy.where((np_closes < lowerband), 1, 0)
-        max_price = numpy.amax(np_closes)
-        lowest_price = numpy.amin(np_closes)
-        average_price = numpy.average(np_closes)
-
-        last_bought = self.get_last_bought()
-        in_position = self.get_in_position()
-
-        bought = list()
-        sold = list()
-
-        last_upperband_crossed = False
-        last_lowerband_crossed = False
-
-        for i in range(0, len(np_closes)):
-            should_sell = 0
-            should_buy = 0
-            buy = False
-            sell = False
-
-            last_macd = MACD[i]
-            last_signal = signal[i]
-            last_fastk = fastk[i]
-            last_fastd = fastd[i]
-
-            if upperband_crossed[i] and not last_upperband_crossed:
-                last_upperband_crossed = True
-                last_lowerband_crossed = False
-
-            if lowerband_crossed[i] and not last_lowerband_crossed:
-                last_upperband_crossed = False
-                last_lowerband_crossed = True
-
-            close = np_closes[i]
-
-            if last_macd > last_signal:
-                should_buy += 1
-
-            if last_lowerband_crossed:
-                should_buy += 1
-
-            if last_macd < last_signal:
-                should_sell += 1
-
-            if last_upperband_crossed:
-                should_sell += 1
-
-            print("-------------------------------------------------------")
-            print("last_upperband_crossed {}".format(last_upperband_crossed))
-            print("last_lowerband_crossed {}".format(last_lowerband_crossed))
-            print("last_macd {}".format(last_macd))
-            print("last_signal {}".format(last_signal))
-            print("fastk {}".format(last_fastk))
-            print("fastd {}".format(last_fastd))
-            print("unterer preisbereich {}".format(close > lowest_price and close < average_price))
-            print("oberer preisbereich {}".format(close < max_price and close > average_price))
-            print("buy {}".format(should_buy))
-            print("sell {}".format(should_sell))
-
-            if should_sell == 3 and max_price > close > average_price and last_bought + 10 < close:
-                if in_position:
-                    print("****************** sell *********************")
-                    sold.append(close)
-                    in_position = False
-                    last_bought = 0.0
-                    sell = True
-
-            if should_buy == 3 and lowest_price < close < average_price:
-                if not in_position:
-                    print("****************** buy *********************")
-                    bought.append(close)
-                    in_position = True
-                    last_bought = close
-                    buy = True
-
-            if not sell:
-                sold.append(numpy.nan)
-            if not buy:
-                bought.append(numpy.nan)
-
-        plt.figure(1)
-        plt.subplot(311)
-        plt.plot(dates, upperband, color='yellow')
-        plt.plot(dates, middleband, color='black')
-        plt.plot(dates, lowerband, color='green')
-        plt.plot(dates, sold, color='red', marker='o')
-        plt.plot(dates, bought, color='green', marker='o')
-        plt.plot(dates, np_closes, color='blue')
-        plt.subplot(313)
-        plt.plot(dates, fastk, label="macd", color='red')
-        plt.plot(dates, fastd, label="signal", color='green')
-        plt.show()
-
     def sell(self, close):
         """
 
@@ -435,22 +751,25 @@ class BinanceAPI:
         """
         try:
             price, quantity = self.get_sell_value(close)
-            order = self.client.create_order(
-                symbol=self.config.get("Symbol"),
-                side=self.client.SIDE_SELL,
-                type=self.get_order_type(),
-                timeInForce=self.client.TIME_IN_FORCE_GTC,
-                quantity=quantity,
-                price=price)
+            with self.timings["order_submit"].time():
+                order = self.client.create_order(
+                    symbol=self.symbol,
+                    side=self.client.SIDE_SELL,
+                    type=self.get_order_type(),
+                    timeInForce=self.client.TIME_IN_FORCE_GTC,
+                    quantity=quantity,
+                    price=price)
             self.set_last_order_id(order["orderId"])
-            self.send_sell_mail(close)
+            self.journal_order("SELL", order["orderId"], order.get("status", "NEW"), price, quantity)
+            self.send_sell_mail(price, quantity)
             debug_logger.debug(
-                " **************************** SELL: {} **************************** ".format(close))
+                " **************************** SELL: %s **************************** ", close)
             debug_logger.debug(json.dumps(order))
         except Exception as error:
+            self.order_errors.increment()
+            self.journal_order("SELL", "", "ERROR", message=str(error))
             debug_logger.debug(error)
-            mail = Mail()
-            mail.send_mail("Fehler", error)
+            self.mail.send_mail("Fehler", error)
             return False
 
     def get_sell_value(self, close):
@@ -459,10 +778,10 @@ class BinanceAPI:
         :param close:
         :return:
         """
-        new_close = close + ((close / 100) / 10)
-        quantity = float(self.config.get("Quantity"))
+        new_close = self.limit_price("SELL", close)
+        quantity = float(self.config.get("Quantity", self.symbol))
         new_quantity = quantity - ((quantity / 100) / 10)
-        return round(new_close, 2), round(new_quantity, 8)
+        return self.quantize("SELL", new_close, new_quantity)
 
     def buy(self, close):
         """
@@ -472,22 +791,25 @@ class BinanceAPI:
         """
         try:
             price, quantity = self.get_buy_value(close)
-            order = self.client.create_order(
-                symbol=self.config.get("Symbol"),
-                side=self.client.SIDE_BUY,
-                type=self.get_order_type(),
-                timeInForce=self.client.TIME_IN_FORCE_GTC,
-                quantity=quantity,
-                price=price)
+            with self.timings["order_submit"].time():
+                order = self.client.create_order(
+                    symbol=self.symbol,
+                    side=self.client.SIDE_BUY,
+                    type=self.get_order_type(),
+                    timeInForce=self.client.TIME_IN_FORCE_GTC,
+                    quantity=quantity,
+                    price=price)
             self.set_last_order_id(order["orderId"])
-            self.send_buy_mail(close)
+            self.journal_order("BUY", order["orderId"], order.get("status", "NEW"), price, quantity)
+            self.send_buy_mail(price, quantity)
             debug_logger.debug(
-                " **************************** BUY: {} **************************** ".format(close))
+                " **************************** BUY: %s **************************** ", close)
             debug_logger.debug(json.dumps(order))
         except Exception as error:
+            self.order_errors.increment()
+            self.journal_order("BUY", "", "ERROR", message=str(error))
             debug_logger.debug(error)
-            mail = Mail()
-            mail.send_mail("Fehler", error)
+            self.mail.send_mail("Fehler", error)
             return False
 
     def get_buy_value(self, close):
@@ -496,55 +818,83 @@ class BinanceAPI:
         :param close:
         :return:
         """
-        new_close = close - ((close / 100) / 10)
-        quantity = float(self.config.get("Quantity"))
+        new_close = self.limit_price("BUY", close)
+        quantity = float(self.config.get("Quantity", self.symbol))
         new_quantity = quantity + ((quantity / 100) / 10)
-        return round(new_close, 2), round(new_quantity, 8)
+        return self.quantize("BUY", new_close, new_quantity)
+
+    def order_filters(self):
+        """
+        filter des symbols aus dem exchange info cache, ohne rest anfrage im order pfad. nach ablauf der ttl lädt
+        der ExchangeInfoRefresher im hintergrund neu, nur ohne start_socket (replay) wird beim ersten zugriff geladen
+
+        :return: SymbolFilters oder None
+        """
+        if self.exchange_info.loaded_at is None:
+            self.exchange_info.refresh()
+        return self.exchange_info.filters(self.symbol)
+
+    def quantize(self, side, price, quantity):
+        """
+        bringt preis und menge auf tickSize und stepSize und prüft die filter lokal, eine ungültige order
+        geht damit gar nicht erst an die api. ohne filter (exchangeInfo nicht erreichbar) wird wie bisher
+        auf 2 bzw. 8 stellen gerundet
+
+        :param side: string BUY oder SELL
+        :param price: float
+        :param quantity: float
+        :return: tuple preis, menge
+        :raises OrderFilterError: wenn die order einen filter verletzt
+        """
+        filters = self.order_filters()
+        if filters is None:
+            return round(price, 2), round(quantity, 8)
+        return filters.normalize(side, price, quantity, market=self.get_order_type() == self.client.ORDER_TYPE_MARKET)
+
+    def limit_price(self, side, close):
+        """
+        preis für eine limit order aus dem lokalen order buch ohne rest anfrage: kauf auf dem besten bid,
+        verkauf auf dem besten ask. ohne synchrones buch 0.1% unter bzw. über dem close
+
+        :param side: string BUY oder SELL
+        :param close: float
+        :return: float
+        """
+        if self.order_book is not None:
+            price = self.order_book.best_bid() if side == "BUY" else self.order_book.best_ask()
+            if price is not None:
+                return price
+        if side == "BUY":
+            return close - ((close / 100) / 10)
+        return close + ((close / 100) / 10)
 
     def get_interval(self):
         """
 
         :return:
         """
-        interval_seconds = int(self.config.get("Interval"))
-
-        if interval_seconds == 60:
-            return self.client.KLINE_INTERVAL_1MINUTE
-        if interval_seconds == 180:
-            return self.client.KLINE_INTERVAL_3MINUTE
-        if interval_seconds == 300:
-            return self.client.KLINE_INTERVAL_5MINUTE
-        if interval_seconds == 900:
-            return self.client.KLINE_INTERVAL_15MINUTE
-        if interval_seconds == 1800:
-            return self.client.KLINE_INTERVAL_30MINUTE
-        if interval_seconds == 3600:
-            return self.client.KLINE_INTERVAL_1HOUR
-        if interval_seconds == 4 * 3600:
-            return self.client.KLINE_INTERVAL_4HOUR
-        if interval_seconds == 24 * 3600:
-            return self.client.KLINE_INTERVAL_1DAY
+        return KLINE_INTERVALS.get(int(self.config.get("Interval", self.symbol)))
 
     def get_price_for_symbol(self):
         """
 
         :return:
         """
-        return self.client.get_avg_price(symbol=self.config.get("Symbol"))
+        return self.client.get_avg_price(symbol=self.symbol)
 
-    def send_buy_mail(self, close):
+    def send_buy_mail(self, price, quantity):
         """
 
-        :param close:
+        :param price: preis der gesendeten order
+        :param quantity: menge der gesendeten order
         :return:
         """
-        price, quantity = self.get_buy_value(close)
         subject = "Tradingbot: Kaufe"
         message = "Ich setze eine Kauforder:"
+        message += "Symbol: {0}</br>".format(self.symbol)
         message += "Preis: {0}</br>".format(price)
         message += "Menge: {0}</br>".format(quantity)
-        mail = Mail()
-        mail.send_mail(subject, message)
+        self.mail.send_mail(subject, message)
 
     def send_buy_filled_mail(self, price, quantity):
         """
@@ -555,10 +905,10 @@ class BinanceAPI:
         """
         subject = "Tradingbot: Gekauft"
         message = "Kauforder erfolgreich:"
+        message += "Symbol: {0}</br>".format(self.symbol)
         message += "Preis: {0}</br>".format(price)
         message += "Menge: {0}</br>".format(quantity)
-        mail = Mail()
-        mail.send_mail(subject, message)
+        self.mail.send_mail(subject, message)
 
     def send_buy_cancelled_mail(self, price, quantity):
         """
@@ -569,24 +919,24 @@ class BinanceAPI:
         """
         subject = "Tradingbot: Kauf abgebrochen"
         message = "Die letzte Kauforder wurde abgebrochen:"
+        message += "Symbol: {0}</br>".format(self.symbol)
         message += "Preis: {0}</br>".format(price)
         message += "Menge: {0}</br>".format(quantity)
-        mail = Mail()
-        mail.send_mail(subject, message)
+        self.mail.send_mail(subject, message)
 
-    def send_sell_mail(self, close):
+    def send_sell_mail(self, price, quantity):
         """
 
-        :param close:
+        :param price: preis der gesendeten order
+        :param quantity: menge der gesendeten order
         :return:
         """
-        price, quantity = self.get_sell_value(close)
         subject = "Tradingbot: Verkaufe"
         message = "Ich setze eine Verkauforder:"
+        message += "Symbol: {0}</br>".format(self.symbol)
         message += "Preis: {0}</br>".format(price)
         message += "Menge: {0}</br>".format(quantity)
-        mail = Mail()
-        mail.send_mail(subject, message)
+        self.mail.send_mail(subject, message)
 
     def send_sell_filled_mail(self, price, quantity):
         """
@@ -597,10 +947,10 @@ class BinanceAPI:
         """
         subject = "Tradingbot: Verkauft"
         message = "Die letzte Verkauforder war erfolgreich:"
+        message += "Symbol: {0}</br>".format(self.symbol)
         message += "Preis: {0}</br>".format(price)
         message += "Menge: {0}</br>".format(quantity)
-        mail = Mail()
-        mail.send_mail(subject, message)
+        self.mail.send_mail(subject, message)
 
     def send_sell_cancelled_mail(self, price, quantity):
         """
@@ -611,73 +961,67 @@ class BinanceAPI:
         """
         subject = "Tradingbot: Verkauf abgebrochen"
         message = "Die letzte Verkauforder wurde abgebrochen:"
+        message += "Symbol: {0}</br>".format(self.symbol)
         message += "Preis: {0}</br>".format(price)
         message += "Menge: {0}</br>".format(quantity)
-        mail = Mail()
-        mail.send_mail(subject, message)
+        self.mail.send_mail(subject, message)
 
     def get_candles(self):
-        record = self.client.get_klines(symbol=self.config.get("Symbol"), interval=self.get_interval())
-        myList = []
+        """
 
-        try:
-            for item in record:
-                n_item = []
-                int_ts = int(item[0] / 1000)
-                # nur neue timestamps anhängen
-
-                n_item.append(int_ts)  # open time
-                n_item.append(float(item[1]))  # open
-                n_item.append(float(item[2]))  # high
-                n_item.append(float(item[3]))  # low
-                n_item.append(float(item[4]))  # close
-                n_item.append(float(item[5]))  # volume
-                n_item.append(int(item[6] / 1000))  # close_time
-                n_item.append(float(item[7]))  # quote_assetv
-                n_item.append(int(item[8]))  # trades
-                n_item.append(float(item[9]))  # taker_b_asset_v
-                n_item.append(float(item[10]))  # taker_b_quote_v
-                n_item.append(datetime.fromtimestamp(n_item[0]))
-                myList.append(n_item)
-        except Exception as error:
-            debug_logger.debug(error)
+        :return: pandas.DataFrame nur geschlossene kerzen
+        """
+        return to_dataframe(self.fetch_candles())
+
+    def fetch_candles(self):
+        """
+        die letzten kerzen über rest, ohne pandas
 
-        new_ohlc = pd.DataFrame(myList, columns=['open_time', 'open', 'high', 'low',
-                                                 'close', 'volume', 'close_time', 'quote_assetv', 'trades',
-                                                 'taker_b_asset_v',
-                                                 'taker_b_quote_v', 'datetime'])
+        :return: dict of numpy.ndarray nur geschlossene kerzen
+        """
+        pages = []
+        params = self.history_request(pages)
+        while params is not None:
+            pages.append(self.client.get_klines(**params))
+            params = self.history_request(pages)
+        return self.history_from(pages)
+
+    def history_request(self, pages):
+        """
+        parameter für die nächste seite der historie (HistorySize kerzen), von der neuesten kerze rückwärts.
+        benutzt vom warm up beider laufzeiten
+
+        :param pages: list of list of klines bisher geladene seiten, neueste zuerst
+        :return: dict parameter für get_klines, None wenn alles geladen ist
+        """
+        loaded = sum(len(page) for page in pages)
+        if pages and (loaded >= self.history_size or len(pages[-1]) < self.KLINES_LIMIT):
+            return None
+        params = {"symbol": self.symbol, "interval": self.get_interval(),
+                  "limit": min(self.history_size - loaded, self.KLINES_LIMIT)}
+        if pages:
+            params["endTime"] = pages[-1][0][0] - 1
+        return params
+
+    def history_from(self, pages):
+        """
 
-        return new_ohlc
+        :param pages: list of list of klines neueste seite zuerst
+        :return: dict of numpy.ndarray nur geschlossene kerzen
+        """
+        return self.candles_from_klines([kline for page in reversed(pages) for kline in page])
 
-    def get_historical_candles(self):
-        record = self.client.get_historical_klines(self.config.get("Symbol"), self.get_interval(), "1 week ago UTC")
-        myList = []
+    def candles_from_klines(self, record):
+        """
+        die letzte kline der rest api ist meist noch offen, sie kommt später geschlossen über den websocket
 
+        :param record: list of klines
+        :return: dict of numpy.ndarray nur geschlossene kerzen
+        """
+        now = time.time() * 1000
         try:
-            for item in record:
-                n_item = []
-                int_ts = int(item[0] / 1000)
-                # nur neue timestamps anhängen
-
-                n_item.append(int_ts)  # open time
-                n_item.append(float(item[1]))  # open
-                n_item.append(float(item[2]))  # high
-                n_item.append(float(item[3]))  # low
-                n_item.append(float(item[4]))  # close
-                n_item.append(float(item[5]))  # volume
-                n_item.append(int(item[6] / 1000))  # close_time
-                n_item.append(float(item[7]))  # quote_assetv
-                n_item.append(int(item[8]))  # trades
-                n_item.append(float(item[9]))  # taker_b_asset_v
-                n_item.append(float(item[10]))  # taker_b_quote_v
-                n_item.append(datetime.fromtimestamp(n_item[0]))
-                myList.append(n_item)
+            record = [kline for kline in record if kline[6] < now]
+            return parse_klines(record)
         except Exception as error:
             debug_logger.debug(error)
-
-        new_ohlc = pd.DataFrame(myList, columns=['open_time', 'open', 'high', 'low',
-                                                 'close', 'volume', 'close_time', 'quote_assetv', 'trades',
-                                                 'taker_b_asset_v',
-                                                 'taker_b_quote_v', 'datetime'])
-
-        return new_ohlc
+            return parse_klines([])
@@ -0,0 +1,125 @@
+import numpy
+
+FIELDS = ['open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time', 'quote_assetv', 'trades',
+          'taker_b_asset_v', 'taker_b_quote_v']
+
+# feldnamen der kline aus dem websocket
+KLINE_KEYS = ['t', 'o', 'h', 'l', 'c', 'v', 'T', 'q', 'n', 'V', 'Q']
+
+
+def kline_to_candle(kline):
+    """
+    wandelt eine kline der rest api (liste) in das format des websockets (msg["k"]) um
+
+    :param kline: list
+    :return: dict
+    """
+    candle = dict(zip(KLINE_KEYS, kline))
+    candle['x'] = True
+    return candle
+
+
+class CandleBuffer:
+    """
+    Ringpuffer fester Größe für die letzten Kerzen (alle Kline Felder).
+    Jede Kerze wird an zwei Stellen geschrieben (i und i + capacity), dadurch ist das aktuelle
+    Fenster immer ein zusammenhängender Ausschnitt des Arrays und kann ohne Kopie an talib
+    und numpy übergeben werden.
+    """
+
+    def __init__(self, capacity=500):
+        """
+
+        :param capacity: int maximale anzahl kerzen
+        """
+        self.capacity = capacity
+        self.data = numpy.zeros((len(FIELDS), 2 * capacity), dtype=numpy.float64)
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, row):
+        """
+        hängt eine kerze an, die älteste kerze fällt bei vollem puffer heraus
+
+        :param row: sequence mit den werten in der reihenfolge von FIELDS
+        :return: None
+        """
+        position = self.count % self.capacity
+        self.data[:, position] = row
+        self.data[:, position + self.capacity] = row
+        self.count += 1
+
+    def append_kline(self, candle):
+        """
+        hängt die kline aus einer websocket nachricht an,
+        die zeiten werden wie bei get_candles in sekunden gespeichert
+
+        :param candle: dict msg["k"]
+        :return: None
+        """
+        row = [float(candle[key]) for key in KLINE_KEYS]
+        row[0] = int(candle['t'] / 1000)
+        row[6] = int(candle['T'] / 1000)
+        self.append(row)
+
+    def extend(self, columns):
+        """
+        hängt alle kerzen aus parse_klines oder einem dataframe von get_candles an
+
+        :param columns: dict of numpy.ndarray oder pandas.DataFrame
+        :return: None
+        """
+        rows = numpy.column_stack([numpy.asarray(columns[field], dtype=numpy.float64)
+                                   for field in FIELDS])[-self.capacity:]
+        positions = (self.count + numpy.arange(len(rows))) % self.capacity
+        self.data[:, positions] = rows.T
+        self.data[:, positions + self.capacity] = rows.T
+        self.count += len(rows)
+
+    def view(self, field):
+        """
+        gibt die werte eines feldes von alt nach neu zurück (ohne kopie)
+
+        :param field: string aus FIELDS
+        :return: numpy.ndarray
+        """
+        row = self.data[FIELDS.index(field)]
+        if self.count < self.capacity:
+            return row[:self.count]
+        start = self.count % self.capacity
+        return row[start:start + self.capacity]
+
+    def last(self, field):
+        """
+        gibt den wert des feldes der neuesten kerze zurück
+
+        :param field: string aus FIELDS
+        :return: float
+        """
+        return self.data[FIELDS.index(field), (self.count - 1) % self.capacity]
+
+    @property
+    def open(self):
+        return self.view('open')
+
+    @property
+    def high(self):
+        return self.view('high')
+
+    @property
+    def low(self):
+        return self.view('low')
+
+    @property
+    def close(self):
+        return self.view('close')
+
+    @property
+    def volume(self):
+        return self.view('volume')
+
+    @property
+    def open_time(self):
+        return self.view('open_time')
@@ -9,7 +9,10 @@ class Config:
         self.config.read(os.path.abspath(os.path.curdir + "/config/settings.ini"))
         self.config.sections()
 
-    def get(self, key):
+    def get(self, key, section=None):
+        # ein abschnitt je symbol überschreibt die werte aus DEFAULT
+        if section is not None and self.config.has_section(section):
+            return self.config[section][key]
         return self.config['DEFAULT'][key]
 
     def set(self, key, value):
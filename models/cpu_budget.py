@@ -0,0 +1,73 @@
+import threading
+import time
+
+from models.config import Config
+from models.metrics import metrics
+
+
+class CpuBudget:
+    """
+    Begrenzt den Anteil der Rechenzeit für optionale Arbeit (Auswertung jedes Trades im Intrabar Modus).
+    Token Bucket in Sekunden: je Sekunde Laufzeit kommen `share` Sekunden Rechenzeit dazu, höchstens `burst`.
+    Ist nichts mehr übrig, wird die Arbeit übersprungen, bis genug nachgelaufen ist.
+    """
+
+    def __init__(self, share, burst=0.05, clock=time.perf_counter):
+        """
+
+        :param share: float anteil einer cpu, z.b. 0.25
+        :param burst: float sekunden rechenzeit die sich ansammeln können
+        :param clock: callable
+        """
+        self.share = share
+        self.burst = burst
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.available = burst
+        self.updated = clock()
+        self.spent = 0.0
+        self.allowed = 0
+        self.skipped = 0
+        self.skipped_counter = metrics.counter("cpu_budget_skipped_total")
+
+    def allow(self):
+        """
+
+        :return: bool True wenn noch rechenzeit übrig ist
+        """
+        now = self.clock()
+        with self.lock:
+            self.available = min(self.burst, self.available + (now - self.updated) * self.share)
+            self.updated = now
+            if self.available > 0:
+                self.allowed += 1
+                return True
+            self.skipped += 1
+        self.skipped_counter.increment()
+        return False
+
+    def spend(self, seconds):
+        """
+
+        :param seconds: float verbrauchte rechenzeit
+        :return: None
+        """
+        with self.lock:
+            self.available -= seconds
+            self.spent += seconds
+
+
+# ein budget je prozess, alle symbole teilen sich den anteil
+_shared = None
+
+
+def shared_budget():
+    """
+    budget aus IntrabarBudget der settings.ini, einmal je prozess
+
+    :return: CpuBudget
+    """
+    global _shared
+    if _shared is None:
+        _shared = CpuBudget(float(Config().get("IntrabarBudget")))
+    return _shared
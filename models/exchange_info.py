@@ -0,0 +1,230 @@
+import logging
+import threading
+import time
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR, ROUND_HALF_EVEN
+
+from binance.exceptions import BinanceOrderException
+
+debug_logger = logging.getLogger('debug.log')
+
+# abstand zum nächsten vielfachen von tick oder step (in ticks) der noch als rundungsfehler des floats gilt,
+# 0.1 + 0.2 soll bei tickSize 0.01 ein verkauf zu 0.30 bleiben und nicht auf 0.31 aufgerundet werden
+FLOAT_TOLERANCE = Decimal("1e-9")
+
+
+def to_multiple(value, size, rounding):
+    """
+    ganzzahliges vielfaches von size, float rauschen wird zum nächsten vielfachen gerundet
+
+    :param value: Decimal
+    :param size: Decimal tickSize oder stepSize
+    :param rounding: string ROUND_FLOOR oder ROUND_CEILING
+    :return: Decimal
+    """
+    steps = value / size
+    nearest = steps.to_integral_value(ROUND_HALF_EVEN)
+    if abs(steps - nearest) > FLOAT_TOLERANCE:
+        nearest = steps.to_integral_value(rounding)
+    return nearest * size
+
+
+class OrderFilterError(BinanceOrderException):
+    """
+    order verletzt einen filter des symbols, gleicher code wie die ablehnung der binance api (-1013)
+    """
+
+    def __init__(self, message):
+        BinanceOrderException.__init__(self, -1013, message)
+
+
+class SymbolFilters:
+    """
+    Filter eines Symbols aus der exchangeInfo (PRICE_FILTER, LOT_SIZE, MIN_NOTIONAL bzw. NOTIONAL).
+    Preise und Mengen werden als Decimal auf ganze Vielfache von tickSize und stepSize gebracht, damit die
+    Werte exakt den Strings entsprechen die binance prüft. Kaufpreise werden abgerundet, Verkaufspreise
+    aufgerundet, Mengen immer abgerundet.
+    """
+
+    def __init__(self, symbol_info):
+        """
+
+        :param symbol_info: dict eintrag aus exchangeInfo["symbols"]
+        """
+        self.symbol = symbol_info["symbol"]
+        filters = {item["filterType"]: item for item in symbol_info.get("filters", [])}
+        price_filter = filters.get("PRICE_FILTER", {})
+        lot_size = filters.get("LOT_SIZE", {})
+        # MIN_NOTIONAL bei älteren symbolen, NOTIONAL bei neueren
+        notional = filters.get("MIN_NOTIONAL") or filters.get("NOTIONAL") or {}
+        # normalize: "0.01000000" -> 0.01, damit die preise nur so viele stellen wie nötig haben
+        self.tick_size = Decimal(price_filter.get("tickSize", "0")).normalize()
+        self.min_price = Decimal(price_filter.get("minPrice", "0"))
+        self.max_price = Decimal(price_filter.get("maxPrice", "0"))
+        self.step_size = Decimal(lot_size.get("stepSize", "0")).normalize()
+        self.min_quantity = Decimal(lot_size.get("minQty", "0"))
+        self.max_quantity = Decimal(lot_size.get("maxQty", "0"))
+        self.min_notional = Decimal(notional.get("minNotional", "0"))
+        self.notional_market = notional.get("applyToMarket", notional.get("applyMinToMarket", True))
+
+    def quantize_price(self, price, side):
+        """
+
+        :param price: float
+        :param side: string BUY (abrunden) oder SELL (aufrunden)
+        :return: Decimal
+        """
+        # repr ist die kürzeste dezimaldarstellung des floats, 99.9 wird damit nicht zu 99.8999999...
+        price = Decimal(repr(price))
+        if not self.tick_size:
+            return price
+        return to_multiple(price, self.tick_size, ROUND_FLOOR if side == "BUY" else ROUND_CEILING)
+
+    def quantize_quantity(self, quantity):
+        """
+
+        :param quantity: float
+        :return: Decimal
+        """
+        quantity = Decimal(repr(quantity))
+        if not self.step_size:
+            return quantity
+        return to_multiple(quantity, self.step_size, ROUND_FLOOR)
+
+    def normalize(self, side, price, quantity, market=False):
+        """
+        bringt preis und menge auf tick und step und prüft die filter lokal, vor der rest anfrage
+
+        :param side: string BUY oder SELL
+        :param price: float limit preis, bei market orders der erwartete preis für MIN_NOTIONAL
+        :param quantity: float
+        :param market: bool market order
+        :return: tuple string preis, string menge
+        """
+        price = self.quantize_price(price, side)
+        quantity = self.quantize_quantity(quantity)
+        if not market:
+            if price < self.min_price or (self.max_price and price > self.max_price):
+                raise OrderFilterError("Filter failure: PRICE_FILTER ({0} {1})".format(self.symbol, price))
+        if quantity < self.min_quantity or (self.max_quantity and quantity > self.max_quantity) or quantity <= 0:
+            raise OrderFilterError("Filter failure: LOT_SIZE ({0} {1})".format(self.symbol, quantity))
+        if (not market or self.notional_market) and price * quantity < self.min_notional:
+            raise OrderFilterError("Filter failure: MIN_NOTIONAL ({0} {1} < {2})".format(
+                self.symbol, price * quantity, self.min_notional))
+        return "{0:f}".format(price), "{0:f}".format(quantity)
+
+
+class ExchangeInfo:
+    """
+    Cache der exchangeInfo für alle gehandelten Symbole (eine Anfrage, Gewicht 10). Nach `ttl` Sekunden
+    wird neu geladen, schlägt das fehl bleiben die alten Filter und es wird nach RETRY_DELAY erneut versucht.
+    Die SymbolFilters entstehen je Symbol beim ersten Zugriff.
+    """
+
+    # sekunden bis zum nächsten versuch wenn das laden fehlschlägt
+    RETRY_DELAY = 60
+
+    def __init__(self, client, ttl=3600, clock=time.monotonic):
+        """
+
+        :param client: binance.client.Client
+        :param ttl: float sekunden bis die filter neu geladen werden
+        :param clock: callable
+        """
+        self.client = client
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.loaded_at = None
+        self.symbols = {}
+        self.filters_cache = {}
+        self.refresher = None
+
+    def due(self):
+        """
+
+        :return: bool die filter müssen (neu) geladen werden
+        """
+        return self.loaded_at is None or self.clock() - self.loaded_at >= self.ttl
+
+    def load(self, info):
+        """
+
+        :param info: dict antwort von GET /api/v3/exchangeInfo
+        :return: None
+        """
+        with self.lock:
+            self.symbols = {item["symbol"]: item for item in info["symbols"]}
+            self.filters_cache = {}
+            self.loaded_at = self.clock()
+        debug_logger.debug("exchange info loaded for %s symbols", len(self.symbols))
+
+    def failed(self, error):
+        """
+
+        :param error: Exception
+        :return: None
+        """
+        debug_logger.debug("exchange info failed: %s", error)
+        with self.lock:
+            self.loaded_at = self.clock() - self.ttl + self.RETRY_DELAY
+
+    def refresh(self):
+        """
+        lädt die exchangeInfo über den synchronen client wenn sie fällig ist
+
+        :return: None
+        """
+        if not self.due():
+            return
+        try:
+            self.load(self.client.get_exchange_info())
+        except Exception as error:
+            self.failed(error)
+
+    def start_refresher(self):
+        """
+        lädt die filter ab jetzt im hintergrund neu, einmal je exchange info
+
+        :return: ExchangeInfoRefresher
+        """
+        if self.refresher is None:
+            self.refresher = ExchangeInfoRefresher(self)
+            self.refresher.start()
+        return self.refresher
+
+    def filters(self, symbol):
+        """
+
+        :param symbol: string
+        :return: SymbolFilters oder None wenn das symbol (noch) nicht bekannt ist
+        """
+        filters = self.filters_cache.get(symbol)
+        if filters is None and symbol in self.symbols:
+            filters = self.filters_cache[symbol] = SymbolFilters(self.symbols[symbol])
+        return filters
+
+
+class ExchangeInfoRefresher(threading.Thread):
+    """
+    Lädt die exchangeInfo im Hintergrund neu sobald sie fällig ist (ttl, nach einem Fehler RETRY_DELAY),
+    wie AsyncRuntime.refresh_exchange_info im asyncio Betrieb. Der Order Pfad wartet damit nie auf REST.
+    """
+
+    def __init__(self, exchange_info, interval=None):
+        """
+
+        :param exchange_info: ExchangeInfo
+        :param interval: float sekunden zwischen zwei prüfungen, standard RETRY_DELAY
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.exchange_info = exchange_info
+        self.interval = interval if interval is not None else exchange_info.RETRY_DELAY
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.exchange_info.refresh()
+
+    def stop(self):
+        self.stopped.set()
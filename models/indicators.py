@@ -0,0 +1,435 @@
+import math
+from collections import deque
+
+NAN = float("nan")
+
+
+def is_zero(value):
+    """
+    gleiche toleranz wie TA_IS_ZERO in ta-lib
+
+    :param value: float
+    :return: bool
+    """
+    return -0.00000001 < value < 0.00000001
+
+
+class EMA:
+    """
+    Exponential Moving Average, pro Wert in O(1) berechnet.
+    Startwert ist wie bei talib.EMA der einfache Durchschnitt der ersten `period` Werte,
+    führende NaN Werte werden übersprungen.
+    """
+
+    def __init__(self, period):
+        """
+
+        :param period: int
+        """
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.count = 0
+        self.seed_total = 0.0
+        self.value = NAN
+
+    def update(self, value):
+        """
+        nimmt einen neuen Wert auf und gibt den aktuellen EMA zurück
+
+        :param value: float
+        :return: float
+        """
+        if math.isnan(value):
+            return self.value
+        self.count += 1
+        if self.count < self.period:
+            self.seed_total += value
+            return NAN
+        if self.count == self.period:
+            self.value = (self.seed_total + value) / self.period
+        else:
+            self.value = ((value - self.value) * self.k) + self.value
+        return self.value
+
+    def peek(self, value):
+        """
+        wert den update(value) liefern würde, ohne den zustand zu ändern
+
+        :param value: float
+        :return: float
+        """
+        if math.isnan(value):
+            return self.value
+        count = self.count + 1
+        if count < self.period:
+            return NAN
+        if count == self.period:
+            return (self.seed_total + value) / self.period
+        return ((value - self.value) * self.k) + self.value
+
+
+class SMA:
+    """
+    Simple Moving Average über eine laufende Summe
+    """
+
+    def __init__(self, period):
+        """
+
+        :param period: int
+        """
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self.value = NAN
+
+    def update(self, value):
+        """
+
+        :param value: float
+        :return: float
+        """
+        if math.isnan(value):
+            return self.value
+        self.window.append(value)
+        self.total += value
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        if len(self.window) == self.period:
+            self.value = self.total / self.period
+        return self.value
+
+    def peek(self, value):
+        """
+        wert den update(value) liefern würde, ohne den zustand zu ändern
+
+        :param value: float
+        :return: float
+        """
+        if math.isnan(value):
+            return self.value
+        total = self.total + value
+        size = len(self.window) + 1
+        if size > self.period:
+            total -= self.window[0]
+            size -= 1
+        return total / self.period if size == self.period else self.value
+
+
+class BollingerBands:
+    """
+    Bollinger Bänder über laufende Summe und Quadratsumme (wie talib.BBANDS mit matype=0)
+    """
+
+    def __init__(self, period, nbdevup=2, nbdevdn=2):
+        """
+
+        :param period: int
+        :param nbdevup: float
+        :param nbdevdn: float
+        """
+        self.period = period
+        self.nbdevup = nbdevup
+        self.nbdevdn = nbdevdn
+        self.window = deque()
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.upperband = NAN
+        self.middleband = NAN
+        self.lowerband = NAN
+
+    def update(self, value):
+        """
+
+        :param value: float
+        :return: tuple upperband, middleband, lowerband
+        """
+        self.window.append(value)
+        self.total += value
+        self.total_squares += value * value
+        if len(self.window) > self.period:
+            old_value = self.window.popleft()
+            self.total -= old_value
+            self.total_squares -= old_value * old_value
+        if len(self.window) == self.period:
+            mean = self.total / self.period
+            variance = self.total_squares / self.period - mean * mean
+            deviation = math.sqrt(variance) if variance > 0 else 0.0
+            self.middleband = mean
+            self.upperband = mean + self.nbdevup * deviation
+            self.lowerband = mean - self.nbdevdn * deviation
+        return self.upperband, self.middleband, self.lowerband
+
+    def peek(self, value):
+        """
+        werte die update(value) liefern würde, ohne den zustand zu ändern
+
+        :param value: float
+        :return: tuple upperband, middleband, lowerband
+        """
+        total = self.total + value
+        total_squares = self.total_squares + value * value
+        size = len(self.window) + 1
+        if size > self.period:
+            old_value = self.window[0]
+            total -= old_value
+            total_squares -= old_value * old_value
+            size -= 1
+        if size != self.period:
+            return self.upperband, self.middleband, self.lowerband
+        mean = total / self.period
+        variance = total_squares / self.period - mean * mean
+        deviation = math.sqrt(variance) if variance > 0 else 0.0
+        return mean + self.nbdevup * deviation, mean, mean - self.nbdevdn * deviation
+
+
+class RSI:
+    """
+    Relative Strength Index mit Wilder Glättung (wie talib.RSI)
+    """
+
+    def __init__(self, period):
+        """
+
+        :param period: int
+        """
+        self.period = period
+        self.count = 0
+        self.previous = NAN
+        self.gain = 0.0
+        self.loss = 0.0
+        self.value = NAN
+
+    def update(self, value):
+        """
+
+        :param value: float
+        :return: float
+        """
+        if math.isnan(self.previous):
+            self.previous = value
+            return NAN
+        change = value - self.previous
+        self.previous = value
+        self.count += 1
+
+        if self.count <= self.period:
+            if change < 0:
+                self.loss -= change
+            else:
+                self.gain += change
+            if self.count < self.period:
+                return NAN
+            self.loss /= self.period
+            self.gain /= self.period
+        else:
+            self.loss *= (self.period - 1)
+            self.gain *= (self.period - 1)
+            if change < 0:
+                self.loss -= change
+            else:
+                self.gain += change
+            self.loss /= self.period
+            self.gain /= self.period
+
+        total = self.gain + self.loss
+        self.value = 100 * (self.gain / total) if not is_zero(total) else 0.0
+        return self.value
+
+    def peek(self, value):
+        """
+        wert den update(value) liefern würde, ohne den zustand zu ändern
+
+        :param value: float
+        :return: float
+        """
+        if math.isnan(self.previous):
+            return NAN
+        change = value - self.previous
+        count = self.count + 1
+        gain, loss = self.gain, self.loss
+        if count > self.period:
+            loss *= (self.period - 1)
+            gain *= (self.period - 1)
+        if change < 0:
+            loss -= change
+        else:
+            gain += change
+        if count < self.period:
+            return NAN
+        loss /= self.period
+        gain /= self.period
+        total = gain + loss
+        return 100 * (gain / total) if not is_zero(total) else 0.0
+
+
+class RollingMax:
+    """
+    Maximum über ein gleitendes Fenster mit einer monotonen deque
+    """
+
+    def __init__(self, period):
+        """
+
+        :param period: int
+        """
+        self.period = period
+        self.index = -1
+        self.candidates = deque()
+
+    def update(self, value):
+        """
+
+        :param value: float
+        :return: float
+        """
+        self.index += 1
+        while self.candidates and self.candidates[-1][1] <= value:
+            self.candidates.pop()
+        self.candidates.append((self.index, value))
+        if self.candidates[0][0] <= self.index - self.period:
+            self.candidates.popleft()
+        return self.candidates[0][1]
+
+    def peek(self, value):
+        """
+        wert den update(value) liefern würde, ohne den zustand zu ändern. die kandidaten sind absteigend
+        sortiert, je update fällt höchstens der vorderste aus dem fenster
+
+        :param value: float
+        :return: float
+        """
+        candidates = self.candidates
+        front = 1 if candidates and candidates[0][0] <= self.index + 1 - self.period else 0
+        if len(candidates) > front and candidates[front][1] > value:
+            return candidates[front][1]
+        return value
+
+
+class RollingMin(RollingMax):
+    """
+    Minimum über ein gleitendes Fenster mit einer monotonen deque
+    """
+
+    def update(self, value):
+        """
+
+        :param value: float
+        :return: float
+        """
+        return -super().update(-value)
+
+    def peek(self, value):
+        """
+
+        :param value: float
+        :return: float
+        """
+        return -super().peek(-value)
+
+
+class RollingMean:
+    """
+    Durchschnitt über ein gleitendes Fenster, solange das Fenster nicht voll ist über alle bisherigen Werte
+    """
+
+    def __init__(self, period):
+        """
+
+        :param period: int
+        """
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+
+    def update(self, value):
+        """
+
+        :param value: float
+        :return: float
+        """
+        self.window.append(value)
+        self.total += value
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        return self.total / len(self.window)
+
+    def peek(self, value):
+        """
+        wert den update(value) liefern würde, ohne den zustand zu ändern
+
+        :param value: float
+        :return: float
+        """
+        total = self.total + value
+        size = len(self.window) + 1
+        if size > self.period:
+            total -= self.window[0]
+            size -= 1
+        return total / size
+
+
+class StochRSI:
+    """
+    Stochastik RSI (wie talib.STOCHRSI mit fastd_matype=0)
+    """
+
+    def __init__(self, timeperiod=14, fastk_period=5, fastd_period=3):
+        """
+
+        :param timeperiod: int
+        :param fastk_period: int
+        :param fastd_period: int
+        """
+        self.rsi = RSI(timeperiod)
+        self.rsi_count = 0
+        self.highest = RollingMax(fastk_period)
+        self.lowest = RollingMin(fastk_period)
+        self.fastk_period = fastk_period
+        self.fastd = SMA(fastd_period)
+        self.fastk_value = NAN
+        self.fastd_value = NAN
+
+    def update(self, value):
+        """
+
+        :param value: float
+        :return: tuple fastk, fastd
+        """
+        rsi = self.rsi.update(value)
+        if math.isnan(rsi):
+            return NAN, NAN
+        self.rsi_count += 1
+        highest = self.highest.update(rsi)
+        lowest = self.lowest.update(rsi)
+        if self.rsi_count < self.fastk_period:
+            return NAN, NAN
+        # ein flacher rsi ergibt nur rundungsrauschen, das wird wie bei einer differenz von 0 behandelt
+        diff = (highest - lowest) / 100.0
+        self.fastk_value = (rsi - lowest) / diff if not is_zero(diff) else 0.0
+        self.fastd_value = self.fastd.update(self.fastk_value)
+        # wie bei talib gibt es fastk erst wenn auch fastd berechnet werden kann
+        if math.isnan(self.fastd_value):
+            return NAN, NAN
+        return self.fastk_value, self.fastd_value
+
+    def peek(self, value):
+        """
+        werte die update(value) liefern würde, ohne den zustand zu ändern
+
+        :param value: float
+        :return: tuple fastk, fastd
+        """
+        rsi = self.rsi.peek(value)
+        if math.isnan(rsi):
+            return NAN, NAN
+        highest = self.highest.peek(rsi)
+        lowest = self.lowest.peek(rsi)
+        if self.rsi_count + 1 < self.fastk_period:
+            return NAN, NAN
+        diff = (highest - lowest) / 100.0
+        fastk = (rsi - lowest) / diff if not is_zero(diff) else 0.0
+        fastd = self.fastd.peek(fastk)
+        if math.isnan(fastd):
+            return NAN, NAN
+        return fastk, fastd
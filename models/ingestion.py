@@ -0,0 +1,161 @@
+import collections
+import logging
+import queue
+import threading
+import time
+
+from models.metrics import metrics
+
+debug_logger = logging.getLogger('debug.log')
+
+
+class KlineIngestor(threading.Thread):
+    """
+    Trennt den Websocket von der Strategie. on_message läuft auf dem Websocket Thread und legt
+    die Nachrichten nur in eine Queue, ein eigener Worker Thread ruft damit den handler auf.
+    Geschlossene Kerzen und Events des User Data Streams (Order Updates) werden nie verworfen, die Queue
+    ist dafür unbegrenzt. Verworfen werden nur Marktdaten die sich selbst korrigieren: Updates der noch
+    offenen Kerze werden gar nicht erst eingereiht. Depth Events (alle 100ms) und Trades (aggTrade, intrabar
+    Modus) warten je Stream in einem eigenen Puffer, in der Queue liegt dafür höchstens ein Platzhalter.
+    Beim Platzhalter verarbeitet der Worker alle wartenden depth Events (höchstens `maxsize`, bei mehr fällt
+    das älteste weg) bzw. nur den neuesten Trade.
+    """
+
+    def __init__(self, handler, maxsize=1000, recorder=None):
+        """
+
+        :param handler: callable(msg) z.b. BinanceAPI.process_message
+        :param maxsize: int wartende depth events je stream, darüber wird das älteste verworfen
+        :param recorder: FrameRecorder zeichnet jede empfangene nachricht auf
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.handler = handler
+        self.recorder = recorder
+        self.maxsize = maxsize
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        # noch nicht verarbeitete depth events je stream
+        self.depth = {}
+        # neuester noch nicht verarbeiteter trade je stream
+        self.trades = {}
+        self.received = 0
+        self.processed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.messages = metrics.counter("messages_total")
+        self.error_counter = metrics.counter("errors_total", source="ingestion")
+        self.lag_histogram = metrics.histogram("exchange_lag_seconds")
+        self.queue_histogram = metrics.histogram("stage_seconds", stage="queue")
+        self.process_histogram = metrics.histogram("stage_seconds", stage="process")
+        metrics.gauge("ingestion_queue_depth", self.queue.qsize)
+        metrics.gauge("ingestion_dropped", lambda: self.dropped)
+        metrics.gauge("ingestion_coalesced", lambda: self.coalesced)
+
+    def on_message(self, msg):
+        """
+        callback für den websocket, parst nur und legt die nachricht in die queue
+
+        :param msg: dict einzelner oder kombinierter stream
+        :return: None
+        """
+        self.received += 1
+        self.messages.increment()
+        if self.recorder is not None:
+            self.recorder.record(msg)
+        data = msg.get('data', msg)
+        candle = data.get('k')
+        if candle is not None and not candle['x']:
+            # die strategie wertet nur geschlossene kerzen aus
+            self.coalesced += 1
+            return
+        if data.get('e') == 'depthUpdate':
+            stream = msg.get('stream', data.get('s'))
+            with self.lock:
+                events = self.depth.get(stream)
+                if events is not None:
+                    if len(events) == self.maxsize:
+                        # das order buch bemerkt die lücke und holt einen neuen snapshot
+                        self.dropped += 1
+                    events.append(msg)
+                    return
+                self.depth[stream] = collections.deque([msg], maxlen=self.maxsize)
+            # in der queue steht nur ein platzhalter, die events werden erst im worker geholt
+            msg = ('depthUpdate', stream)
+        elif data.get('e') == 'aggTrade':
+            stream = msg.get('stream', data.get('s'))
+            with self.lock:
+                pending = stream in self.trades
+                self.trades[stream] = msg
+                if pending:
+                    self.coalesced += 1
+                    return
+            msg = ('aggTrade', stream)
+
+        # mit dem zeitpunkt des empfangs, um die wartezeit in der queue zu messen
+        self.queue.put((time.perf_counter(), msg))
+
+    def take(self, item):
+        """
+        die nachrichten zu einem eintrag der queue
+
+        :param item: dict nachricht oder tuple (event, stream) platzhalter
+        :return: list of dict
+        """
+        if not isinstance(item, tuple):
+            return [item]
+        event, stream = item
+        with self.lock:
+            if event == 'depthUpdate':
+                return list(self.depth.pop(stream, ()))
+            msg = self.trades.pop(stream, None)
+        return [msg] if msg is not None else []
+
+    def run(self):
+        while True:
+            received, item = self.queue.get()
+            for msg in self.take(item):
+                self.process(received, msg)
+
+    def process(self, received, msg):
+        """
+
+        :param received: float perf_counter beim empfang
+        :param msg: dict
+        :return: None
+        """
+        started = time.perf_counter()
+        self.queue_histogram.observe(started - received)
+        event_time = msg.get('data', msg).get('E')
+        if event_time is not None:
+            self.last_lag = time.time() * 1000 - event_time
+            self.max_lag = max(self.max_lag, self.last_lag)
+            self.lag_histogram.observe(self.last_lag / 1000)
+        try:
+            self.handler(msg)
+        except Exception as error:
+            self.errors += 1
+            self.error_counter.increment()
+            debug_logger.exception(error)
+        self.process_histogram.observe(time.perf_counter() - started)
+        self.processed += 1
+
+    def stats(self):
+        """
+        kennzahlen der ingestion
+
+        :return: dict
+        """
+        return {
+            "depth": self.queue.qsize(),
+            "received": self.received,
+            "processed": self.processed,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "last_lag_ms": self.last_lag,
+            "max_lag_ms": self.max_lag,
+        }
@@ -0,0 +1,289 @@
+import atexit
+import collections
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from models.config import Config
+from models.metrics import metrics
+
+debug_logger = logging.getLogger('debug.log')
+
+# werte der indikatoren je kerze, ausgänge der Strategy.pipeline
+INDICATOR_COLUMNS = ("close", "macd", "signal", "fastk", "fastd", "upperband", "middleband", "lowerband",
+                     "upperband_crossed", "lowerband_crossed", "max_price", "lowest_price", "average_price")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL, open_time INTEGER NOT NULL, open REAL, high REAL, low REAL, close REAL, volume REAL,
+    close_time INTEGER, trades INTEGER, PRIMARY KEY (symbol, open_time));
+CREATE TABLE IF NOT EXISTS indicators (
+    symbol TEXT NOT NULL, open_time INTEGER NOT NULL, {indicators}, PRIMARY KEY (symbol, open_time));
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY, time INTEGER NOT NULL, symbol TEXT NOT NULL, open_time INTEGER, close REAL,
+    buy INTEGER, sell INTEGER, side TEXT, intrabar INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS decisions_time ON decisions (symbol, time);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY, time INTEGER NOT NULL, symbol TEXT NOT NULL, order_id TEXT, side TEXT,
+    status TEXT NOT NULL, price REAL, quantity REAL, message TEXT);
+CREATE INDEX IF NOT EXISTS orders_time ON orders (symbol, time);
+CREATE INDEX IF NOT EXISTS orders_order_id ON orders (order_id);
+""".format(indicators=", ".join("{} REAL".format(column) for column in INDICATOR_COLUMNS))
+
+INSERTS = {
+    "candles": "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "indicators": "INSERT OR REPLACE INTO indicators VALUES ({})".format(
+        ", ".join("?" * (len(INDICATOR_COLUMNS) + 2))),
+    "decisions": "INSERT INTO decisions (time, symbol, open_time, close, buy, sell, side, intrabar) "
+                 "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+    "orders": "INSERT INTO orders (time, symbol, order_id, side, status, price, quantity, message) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+}
+
+# zeitspalte je tabelle für abfragen über einen zeitraum, alle zeiten in millisekunden
+TIME_COLUMNS = {"candles": "open_time", "indicators": "open_time", "decisions": "time", "orders": "time"}
+
+
+def connect(path):
+    """
+    verbindung im WAL modus: der schreibende thread blockiert keine leser (auswertung, abgleich)
+
+    :param path: string
+    :return: sqlite3.Connection
+    """
+    connection = sqlite3.connect(path, timeout=10, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    # im WAL modus reicht NORMAL gegen korrupte dateien, verloren gehen höchstens die letzten transaktionen
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class Journal(threading.Thread):
+    """
+    Protokoll der kerzen, indikatoren, entscheidungen und orders in einer SQLite Datenbank.
+    Die record methoden legen nur ein tupel in eine deque (kein Lock, keine Umwandlung), ein Hintergrund
+    Thread wandelt die Zeilen um und schreibt alles was seit dem letzten mal angefallen ist in einer
+    Transaktion. Mehrere Symbole teilen sich eine Datei, jede Zeile hat das Symbol.
+    """
+
+    def __init__(self, path, flush_interval=1.0, max_pending=100000):
+        """
+
+        :param path: string
+        :param flush_interval: float sekunden zwischen zwei transaktionen
+        :param max_pending: int einträge die auf den thread warten, weitere werden verworfen
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = collections.deque()
+        self.stopped = threading.Event()
+        self.dropped = 0
+        self.written = 0
+        self.transactions = 0
+        self.rows = metrics.counter("journal_rows_total")
+        metrics.gauge("journal_pending", lambda: len(self.pending))
+        metrics.gauge("journal_dropped", lambda: self.dropped)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # das schema synchron, damit leser die tabellen sofort finden. danach benutzt nur der thread die verbindung
+        self.connection = connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def put(self, item):
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.pending.append(item)
+
+    def candle(self, symbol, candle, indicators):
+        """
+        geschlossene kerze und die indikatoren danach
+
+        :param symbol: string
+        :param candle: dict kline aus dem websocket
+        :param indicators: dict werte der indikatoren, wird nicht mehr verändert
+        :return: None
+        """
+        self.put(("candle", symbol, candle, indicators))
+
+    def decision(self, symbol, open_time, close, buy, sell, side, intrabar=False):
+        """
+
+        :param symbol: string
+        :param open_time: int millisekunden, beginn der kerze
+        :param close: float
+        :param buy: int kauf score
+        :param sell: int verkauf score
+        :param side: string BUY, SELL oder None
+        :param intrabar: bool entscheidung auf einem trade der offenen kerze
+        :return: None
+        """
+        self.put(("decisions", (int(time.time() * 1000), symbol, open_time, close, buy, sell, side, int(intrabar))))
+
+    def order(self, symbol, order_id, side, status, price=None, quantity=None, message=None):
+        """
+        gesendete order, geänderter status oder fehler beim senden
+
+        :param symbol: string
+        :param order_id: string oder int
+        :param side: string BUY oder SELL
+        :param status: string NEW, FILLED, CANCELED, ... oder ERROR
+        :param price: float oder string
+        :param quantity: float oder string
+        :param message: string fehlermeldung
+        :return: None
+        """
+        self.put(("orders", (int(time.time() * 1000), symbol, str(order_id), side, status, price, quantity,
+                             message)))
+
+    def convert(self, items):
+        """
+        wandelt die einträge aus der deque in zeilen je tabelle
+
+        :param items: list
+        :return: dict tabelle -> list of tuple
+        """
+        rows = {table: [] for table in INSERTS}
+        for item in items:
+            if item[0] != "candle":
+                rows[item[0]].append(item[1])
+                continue
+            _, symbol, candle, indicators = item
+            rows["candles"].append((symbol, candle['t'], float(candle['o']), float(candle['h']), float(candle['l']),
+                                    float(candle['c']), float(candle['v']), candle['T'], candle.get('n')))
+            rows["indicators"].append((symbol, candle['t']) + tuple(indicators.get(column)
+                                                                    for column in INDICATOR_COLUMNS))
+        return rows
+
+    def run(self):
+        while True:
+            stopping = self.stopped.wait(self.flush_interval)
+            items = []
+            while self.pending:
+                items.append(self.pending.popleft())
+            if items:
+                try:
+                    self.write(items)
+                except (sqlite3.Error, KeyError, TypeError, ValueError) as error:
+                    debug_logger.debug("journal write failed, %s entries lost: %s", len(items), error)
+                except Exception:
+                    # der thread muss weiterlaufen, sonst füllt sich pending und alles weitere wird verworfen
+                    debug_logger.exception("journal write failed unexpectedly, %s entries lost", len(items))
+            if stopping:
+                return
+
+    def write(self, items):
+        """
+        alle zeilen in einer transaktion
+
+        :param items: list
+        :return: None
+        """
+        rows = self.convert(items)
+        with self.connection:
+            for table, values in rows.items():
+                if values:
+                    self.connection.executemany(INSERTS[table], values)
+        count = sum(len(values) for values in rows.values())
+        self.written += count
+        self.transactions += 1
+        self.rows.increment(count)
+
+    def start(self):
+        threading.Thread.start(self)
+        atexit.register(self.stop)
+
+    def stop(self, timeout=10):
+        """
+        schreibt die restlichen einträge und schließt die datenbank
+
+        :param timeout: float
+        :return: None
+        """
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        if self.is_alive():
+            self.join(timeout)
+        self.connection.close()
+
+
+class JournalReader:
+    """
+    Abfragen über einen Zeitraum, für Auswertung und Abgleich. Liest über eine eigene Verbindung,
+    auch während der Bot schreibt.
+    """
+
+    def __init__(self, path):
+        """
+
+        :param path: string
+        """
+        self.connection = connect(path)
+        self.connection.row_factory = sqlite3.Row
+
+    def query(self, table, symbol=None, start=None, end=None):
+        """
+
+        :param table: string candles, indicators, decisions oder orders
+        :param symbol: string
+        :param start: int millisekunden, inklusive
+        :param end: int millisekunden, inklusive
+        :return: list of dict, nach zeit sortiert
+        """
+        column = TIME_COLUMNS[table]
+        conditions = []
+        params = []
+        if symbol is not None:
+            conditions.append("symbol = ?")
+            params.append(symbol)
+        if start is not None:
+            conditions.append("{} >= ?".format(column))
+            params.append(start)
+        if end is not None:
+            conditions.append("{} <= ?".format(column))
+            params.append(end)
+        sql = "SELECT * FROM {0}{1} ORDER BY {2}".format(
+            table, " WHERE " + " AND ".join(conditions) if conditions else "", column)
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+    def candles(self, symbol=None, start=None, end=None):
+        return self.query("candles", symbol, start, end)
+
+    def indicators(self, symbol=None, start=None, end=None):
+        return self.query("indicators", symbol, start, end)
+
+    def decisions(self, symbol=None, start=None, end=None):
+        return self.query("decisions", symbol, start, end)
+
+    def orders(self, symbol=None, start=None, end=None):
+        return self.query("orders", symbol, start, end)
+
+    def close(self):
+        self.connection.close()
+
+
+_journals = {}
+
+
+def create_journal():
+    """
+    journal nach JournalFile / JournalFlushInterval aus der settings.ini, gestartet und je datei nur einmal
+
+    :return: Journal oder None wenn nicht protokolliert wird
+    """
+    config = Config()
+    path = config.get("JournalFile")
+    if not path:
+        return None
+    if path not in _journals:
+        journal = Journal(path, float(config.get("JournalFlushInterval")))
+        journal.start()
+        _journals[path] = journal
+    return _journals[path]
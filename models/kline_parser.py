@@ -0,0 +1,78 @@
+import itertools
+
+import numpy
+
+from models.candle_buffer import FIELDS
+
+# felder die als ganzzahl gespeichert werden, zeiten in sekunden
+INTEGER_FIELDS = ['open_time', 'close_time', 'trades']
+
+
+def parse_klines(klines):
+    """
+    wandelt klines der rest api spaltenweise in typisierte numpy arrays um.
+    die umwandlung der strings passiert in einem rutsch in numpy statt pro zeile in python
+
+    :param klines: list of list
+    :return: dict of numpy.ndarray in der reihenfolge von FIELDS
+    """
+    if not len(klines):
+        return {field: numpy.empty(0, dtype=numpy.int64 if field in INTEGER_FIELDS else numpy.float64)
+                for field in FIELDS}
+
+    values = numpy.array(klines, dtype=object)[:, :len(FIELDS)].astype(numpy.float64)
+    columns = {}
+    for index, field in enumerate(FIELDS):
+        column = values[:, index]
+        if field in ['open_time', 'close_time']:
+            column = column.astype(numpy.int64) // 1000
+        elif field in INTEGER_FIELDS:
+            column = column.astype(numpy.int64)
+        else:
+            column = numpy.ascontiguousarray(column)
+        columns[field] = column
+    return columns
+
+
+def iter_kline_chunks(klines, chunk_size=10000):
+    """
+    liest klines aus einem iterator (z.b. get_historical_klines_generator) blockweise und wandelt jeden
+    block um, die gesamte historie muss dafür nie als liste im speicher liegen
+
+    :param klines: iterable of list
+    :param chunk_size: int
+    :return: generator of dict of numpy.ndarray
+    """
+    klines = iter(klines)
+    while True:
+        chunk = list(itertools.islice(klines, chunk_size))
+        if not chunk:
+            return
+        yield parse_klines(chunk)
+
+
+def to_rows(columns):
+    """
+    spalten als float array (anzahl, len(FIELDS)), z.b. für CandleBuffer und KlineStore
+
+    :param columns: dict of numpy.ndarray
+    :return: numpy.ndarray
+    """
+    return numpy.column_stack([numpy.asarray(columns[field], dtype=numpy.float64) for field in FIELDS])
+
+
+def to_dataframe(columns):
+    """
+    dataframe wie bisher von get_candles, datetime aus der open time in sekunden
+
+    :param columns: dict of numpy.ndarray
+    :return: pandas.DataFrame
+    """
+    # pandas nur laden wenn wirklich ein dataframe gebraucht wird, der live bot kommt ohne aus
+    import pandas as pd
+
+    dataframe = pd.DataFrame({field: numpy.asarray(columns[field]) for field in FIELDS})
+    for field in INTEGER_FIELDS:
+        dataframe[field] = dataframe[field].astype(numpy.int64)
+    dataframe['datetime'] = pd.to_datetime(dataframe['open_time'], unit='s')
+    return dataframe
@@ -0,0 +1,254 @@
+import json
+import os
+import time
+
+import numpy
+
+from models.candle_buffer import FIELDS
+from models.kline_parser import iter_kline_chunks, to_rows
+
+
+class RestKlineFetcher:
+    """
+    Lädt klines über die Binance REST API
+    """
+
+    def __init__(self, client):
+        """
+
+        :param client: binance.client.Client
+        """
+        self.client = client
+
+    def __call__(self, symbol, interval, start_ms, end_ms=None):
+        """
+
+        :param symbol: string
+        :param interval: string
+        :param start_ms: int
+        :param end_ms: int
+        :return: iterable of klines
+        """
+        return self.client.get_historical_klines_generator(symbol, interval, start_ms, end_ms)
+
+
+class FileKlineFetcher:
+    """
+    Liefert klines aus einer lokalen JSON Datei (Liste von klines wie von der REST API),
+    z.B. als Ersatz für die REST API in Tests
+    """
+
+    def __init__(self, path):
+        """
+
+        :param path: string
+        """
+        with open(path, "r") as file:
+            self.klines = json.load(file)
+
+    def __call__(self, symbol, interval, start_ms, end_ms=None):
+        """
+
+        :param symbol: string
+        :param interval: string
+        :param start_ms: int
+        :param end_ms: int
+        :return: iterable of klines
+        """
+        for kline in self.klines:
+            if kline[0] >= start_ms and (end_ms is None or kline[0] <= end_ms):
+                yield kline
+
+
+class KlineStore:
+    """
+    Lokaler Spaltenspeicher für Klines, je Symbol und Intervall ein Verzeichnis mit einer Datei pro Feld.
+    Gelesen wird per memory map ohne Kopie, beim Aktualisieren wird nur der fehlende Zeitraum geladen.
+    """
+
+    CHUNK_SIZE = 10000
+
+    def __init__(self, directory, fetcher):
+        """
+
+        :param directory: string
+        :param fetcher: callable(symbol, interval, start_ms, end_ms) -> iterable of klines
+        """
+        self.directory = directory
+        self.fetcher = fetcher
+
+    def path(self, symbol, interval, field=None):
+        """
+
+        :param symbol: string
+        :param interval: string
+        :param field: string
+        :return: string
+        """
+        path = os.path.join(self.directory, symbol.upper(), interval)
+        if field is None:
+            return path
+        return os.path.join(path, field + ".f8")
+
+    def count(self, symbol, interval):
+        """
+        anzahl gespeicherter kerzen. nach einem abgebrochenen schreibvorgang werden längere
+        spalten auf die kürzeste gekürzt
+
+        :param symbol: string
+        :param interval: string
+        :return: int
+        """
+        self.recover(symbol, interval)
+        sizes = []
+        for field in FIELDS:
+            path = self.path(symbol, interval, field)
+            sizes.append(os.path.getsize(path) // 8 if os.path.isfile(path) else 0)
+        count = min(sizes)
+        if max(sizes) != count:
+            for field in FIELDS:
+                path = self.path(symbol, interval, field)
+                if os.path.isfile(path):
+                    os.truncate(path, count * 8)
+        return count
+
+    def recover(self, symbol, interval):
+        """
+        schließt ein abgebrochenes prepend ab. sind alle temp dateien fertig geschrieben (commit datei
+        vorhanden) werden sie übernommen, sonst verworfen
+
+        :param symbol: string
+        :param interval: string
+        :return: None
+        """
+        commit = os.path.join(self.path(symbol, interval), "prepend.commit")
+        for field in FIELDS:
+            path = self.path(symbol, interval, field)
+            if os.path.isfile(path + ".tmp"):
+                if os.path.isfile(commit):
+                    os.replace(path + ".tmp", path)
+                else:
+                    os.remove(path + ".tmp")
+        if os.path.isfile(commit):
+            os.remove(commit)
+
+    def columns(self, symbol, interval):
+        """
+        alle gespeicherten spalten als memory map
+
+        :param symbol: string
+        :param interval: string
+        :return: dict of numpy.ndarray
+        """
+        count = self.count(symbol, interval)
+        if not count:
+            return {field: numpy.empty(0) for field in FIELDS}
+        return {field: numpy.memmap(self.path(symbol, interval, field), dtype=numpy.float64, mode='r', shape=(count,))
+                for field in FIELDS}
+
+    def read(self, symbol, interval, start=None, end=None):
+        """
+        gibt die kerzen eines zeitraums zurück (ohne kopie)
+
+        :param symbol: string
+        :param interval: string
+        :param start: int open time in sekunden, inklusive
+        :param end: int open time in sekunden, inklusive
+        :return: dict of numpy.ndarray
+        """
+        columns = self.columns(symbol, interval)
+        open_time = columns["open_time"]
+        first = numpy.searchsorted(open_time, start, side='left') if start is not None else 0
+        last = numpy.searchsorted(open_time, end, side='right') if end is not None else len(open_time)
+        return {field: column[first:last] for field, column in columns.items()}
+
+    def update(self, symbol, interval, start_ms, end_ms=None):
+        """
+        lädt die fehlenden kerzen vor und nach dem gespeicherten zeitraum nach
+
+        :param symbol: string
+        :param interval: string
+        :param start_ms: int ab wann die historie vorhanden sein soll
+        :param end_ms: int bis wann, standard jetzt
+        :return: int anzahl neuer kerzen
+        """
+        os.makedirs(self.path(symbol, interval), exist_ok=True)
+        columns = self.columns(symbol, interval)
+        added = 0
+
+        if len(columns["open_time"]) and start_ms < columns["open_time"][0] * 1000:
+            head = self.fetch(symbol, interval, start_ms, int(columns["open_time"][0] * 1000) - 1)
+            added += self.prepend(symbol, interval, head)
+            columns = self.columns(symbol, interval)
+
+        if len(columns["open_time"]):
+            start_ms = int(columns["open_time"][-1] * 1000) + 1
+        tail = self.fetch(symbol, interval, start_ms, end_ms)
+        added += self.append(symbol, interval, tail)
+        return added
+
+    def fetch(self, symbol, interval, start_ms, end_ms=None):
+        """
+        lädt klines in blöcken, nur geschlossene kerzen werden übernommen
+
+        :return: generator of numpy.ndarray
+        """
+        now = time.time()
+        for columns in iter_kline_chunks(self.fetcher(symbol, interval, start_ms, end_ms), self.CHUNK_SIZE):
+            rows = to_rows(columns)
+            yield rows[rows[:, 6] < now]
+
+    def append(self, symbol, interval, chunks):
+        """
+        hängt kerzen an die spalten an, kerzen die nicht neuer als die letzte sind werden verworfen
+
+        :param chunks: iterable of numpy.ndarray
+        :return: int
+        """
+        count = self.count(symbol, interval)
+        last_open_time = -numpy.inf
+        if count:
+            last_open_time = self.columns(symbol, interval)["open_time"][-1]
+
+        added = 0
+        for rows in chunks:
+            rows = rows[rows[:, 0] > last_open_time]
+            if not len(rows):
+                continue
+            for index, field in enumerate(FIELDS):
+                with open(self.path(symbol, interval, field), "ab") as file:
+                    file.write(numpy.ascontiguousarray(rows[:, index]).tobytes())
+                    file.flush()
+                    os.fsync(file.fileno())
+            last_open_time = rows[-1, 0]
+            added += len(rows)
+        return added
+
+    def prepend(self, symbol, interval, chunks):
+        """
+        setzt ältere kerzen vor die gespeicherten, die spalten werden dafür neu geschrieben
+
+        :param chunks: iterable of numpy.ndarray
+        :return: int
+        """
+        chunks = [rows for rows in chunks if len(rows)]
+        if not chunks:
+            return 0
+        head = numpy.concatenate(chunks)
+        columns = self.columns(symbol, interval)
+        head = head[head[:, 0] < columns["open_time"][0]]
+        for index, field in enumerate(FIELDS):
+            path = self.path(symbol, interval, field)
+            with open(path + ".tmp", "wb") as file:
+                file.write(numpy.ascontiguousarray(head[:, index]).tobytes())
+                file.write(numpy.asarray(columns[field]).tobytes())
+                file.flush()
+                os.fsync(file.fileno())
+        del columns
+
+        # ab hier gelten die temp dateien als vollständig, siehe recover
+        with open(os.path.join(self.path(symbol, interval), "prepend.commit"), "w") as file:
+            file.flush()
+            os.fsync(file.fileno())
+        self.recover(symbol, interval)
+        return len(head)
@@ -0,0 +1,105 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+
+from models.config import Config
+
+TEXT_FORMAT = '%(asctime)s || [%(filename)s:%(lineno)s - %(funcName)20s() ] - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# attribute die jeder LogRecord hat, alles andere kam über extra={...}
+RECORD_ATTRIBUTES = set(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Legt den LogRecord unverändert in die Queue. Der QueueHandler der Standardbibliothek formatiert
+    die Nachricht schon im aufrufenden Thread, hier passiert das erst im Thread des QueueListener.
+    Die Argumente der Lognachricht dürfen danach deshalb nicht mehr verändert werden (Zahlen, Strings).
+    """
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # lieber eine logzeile verlieren als den handel aufhalten
+            pass
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    eine JSON Zeile je Lognachricht, Felder aus extra={...} werden mit ausgegeben
+    """
+
+    def format(self, record):
+        line = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "function": record.funcName,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES:
+                line[key] = value
+        if record.exc_info:
+            line["exception"] = self.formatException(record.exc_info)
+        return json.dumps(line, default=str, separators=(",", ":"))
+
+
+def create_file_handler(filename, max_bytes=0, backup_count=0, when=""):
+    """
+    rotiert nach größe oder, wenn `when` gesetzt ist, nach zeit (z.b. midnight, H)
+
+    :param filename: string
+    :param max_bytes: int
+    :param backup_count: int
+    :param when: string
+    :return: logging.Handler
+    """
+    if when:
+        return logging.handlers.TimedRotatingFileHandler(filename, when=when, backupCount=backup_count,
+                                                         encoding="utf-8")
+    return logging.handlers.RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count,
+                                                encoding="utf-8")
+
+
+_listeners = {}
+
+
+def setup_logging(name='debug.log'):
+    """
+    richtet den logger ein: die aufrufer legen nur in eine queue, geschrieben wird im QueueListener Thread.
+    Einstellungen aus der settings.ini: LogFile, LogLevel, LogFormat (text | json), LogMaxBytes,
+    LogBackupCount, LogRotateWhen. Mehrfache aufrufe richten nichts neu ein.
+
+    :param name: string
+    :return: logging.Logger
+    """
+    logger = logging.getLogger(name)
+    if name in _listeners:
+        return logger
+
+    config = Config()
+    handler = create_file_handler(config.get("LogFile"), int(config.get("LogMaxBytes")),
+                                  int(config.get("LogBackupCount")), config.get("LogRotateWhen"))
+    if config.get("LogFormat") == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+
+    records = queue.Queue(maxsize=int(config.get("LogQueueSize")))
+    listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    # beim beenden noch alle zeilen aus der queue schreiben
+    atexit.register(listener.stop)
+    _listeners[name] = listener
+
+    logger.setLevel(config.get("LogLevel"))
+    logger.addHandler(LazyQueueHandler(records))
+    logger.propagate = False
+    return logger
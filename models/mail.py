@@ -2,7 +2,15 @@ from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
 from models.config import Config
+from models.metrics import metrics
+import atexit
+import logging
+import queue
 import smtplib
+import threading
+import time
+
+debug_logger = logging.getLogger('debug.log')
 
 
 class Mail:
@@ -19,6 +27,14 @@ class Mail:
         self.receiver_address = self.config.get("MailReceiver")
         self.sender_address = self.config.get("MailSender")
         self.password = self.config.get("MailPassword")
+        self.server = None
+
+    def is_enabled(self):
+        """
+
+        :return: bool
+        """
+        return self.config.get("SendMail") == "1"
 
     def send_mail(self, subject, message):
         """
@@ -27,17 +43,182 @@ class Mail:
         :param message:
         :return:
         """
-        if self.config.get("SendMail") == "1":
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.sender_address
-            msg['To'] = self.receiver_address
-            part1 = MIMEText(message, 'plain')
-            part2 = MIMEText(message, 'html')
-
-            msg.attach(part1)
-            msg.attach(part2)
-            server = smtplib.SMTP(self.host, self.port)
-            server.login(self.user, self.password)
-            server.sendmail(self.sender_address, [self.receiver_address], msg.as_string())
-            server.quit()
+        if self.is_enabled():
+            try:
+                self.deliver(subject, message)
+            finally:
+                self.close()
+
+    def connect(self):
+        """
+        öffnet die verbindung zum smtp server
+
+        :return: None
+        """
+        self.server = smtplib.SMTP(self.host, self.port)
+        self.server.login(self.user, self.password)
+
+    def deliver(self, subject, message):
+        """
+        verschickt die mail über die bestehende verbindung, die verbindung wird bei bedarf geöffnet
+
+        :param subject:
+        :param message:
+        :return: None
+        """
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.sender_address
+        msg['To'] = self.receiver_address
+        part1 = MIMEText(message, 'plain')
+        part2 = MIMEText(message, 'html')
+
+        msg.attach(part1)
+        msg.attach(part2)
+        if self.server is None:
+            self.connect()
+        self.server.sendmail(self.sender_address, [self.receiver_address], msg.as_string())
+
+    def close(self):
+        """
+        schließt die verbindung zum smtp server
+
+        :return: None
+        """
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+        self.server = None
+
+
+class MailDispatcher(threading.Thread):
+    """
+    Verschickt Mails im Hintergrund. send_mail legt die Mail nur in eine Queue,
+    ein Worker Thread verschickt sie über eine dauerhafte SMTP Verbindung.
+    Mails die kurz nacheinander kommen werden zu einer Sammelmail zusammengefasst,
+    bei Fehlern wird mit wachsender Wartezeit erneut versucht.
+    """
+
+    STOP = None
+
+    def __init__(self, mail=None, digest_delay=None, max_retries=5, backoff=1.0):
+        """
+
+        :param mail: Mail
+        :param digest_delay: float sekunden die auf weitere mails für eine sammelmail gewartet wird
+        :param max_retries: int
+        :param backoff: float wartezeit in sekunden vor dem ersten neuen versuch
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.mail = mail if mail is not None else Mail()
+        if digest_delay is None:
+            digest_delay = float(self.mail.config.get("MailDigestDelay"))
+        self.digest_delay = digest_delay
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.queue = queue.Queue()
+        self.send_histogram = metrics.histogram("stage_seconds", stage="mail_send")
+        self.error_counter = metrics.counter("errors_total", source="mail")
+        metrics.gauge("mail_queue_depth", self.queue.qsize)
+
+    def start(self):
+        """
+        startet den worker, beim beenden des programms werden offene mails noch verschickt
+
+        :return: None
+        """
+        threading.Thread.start(self)
+        atexit.register(self.stop)
+
+    def send_mail(self, subject, message):
+        """
+        legt eine mail in die queue
+
+        :param subject:
+        :param message:
+        :return: None
+        """
+        if self.mail.is_enabled():
+            self.queue.put((subject, str(message)))
+
+    def stop(self, timeout=30):
+        """
+        verschickt die restlichen mails und beendet den worker
+
+        :param timeout: float
+        :return: None
+        """
+        if self.is_alive():
+            self.queue.put(self.STOP)
+            self.join(timeout)
+
+    def run(self):
+        running = True
+        while running:
+            item = self.queue.get()
+            if item is self.STOP:
+                break
+            mails = [item]
+
+            # weitere mails einsammeln die innerhalb von digest_delay kommen
+            deadline = time.monotonic() + self.digest_delay
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is self.STOP:
+                    running = False
+                    break
+                mails.append(item)
+
+            try:
+                self.send_with_retry(*self.create_digest(mails))
+            except Exception:
+                # ein fehler in einer mail darf den worker nicht beenden, sonst bleiben alle weiteren in der queue
+                self.error_counter.increment()
+                debug_logger.exception("sending mail failed unexpectedly, %s messages lost", len(mails))
+                self.mail.close()
+        self.mail.close()
+
+    def create_digest(self, mails):
+        """
+        fasst mehrere mails zu einer zusammen
+
+        :param mails: list of (subject, message)
+        :return: tuple subject, message
+        """
+        if len(mails) == 1:
+            return mails[0]
+        subject = "Tradingbot: {0} Nachrichten".format(len(mails))
+        message = "</br><hr></br>".join("<b>{0}</b></br>{1}".format(subject, message) for subject, message in mails)
+        return subject, message
+
+    def send_with_retry(self, subject, message):
+        """
+
+        :param subject:
+        :param message:
+        :return: bool
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self.send_histogram.time():
+                    self.mail.deliver(subject, message)
+                return True
+            except (smtplib.SMTPException, OSError) as error:
+                self.error_counter.increment()
+                debug_logger.debug("sending mail failed (attempt %s): %s", attempt + 1, error)
+                # die verbindung ist danach nicht mehr zu gebrauchen
+                self.mail.close()
+                if attempt < self.max_retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+        debug_logger.debug("giving up on mail %s", subject)
+        return False
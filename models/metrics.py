@@ -0,0 +1,365 @@
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from models.config import Config
+
+debug_logger = logging.getLogger('debug.log')
+
+# unterteilungen je zweierpotenz, ergibt einen relativen fehler von höchstens ~6%
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_BUCKETS = SUB_BUCKETS >> 1
+# größter messbarer wert knapp 2^37 mikrosekunden (~38 stunden), größere werte landen im letzten bucket
+MAX_SHIFT = 32
+BUCKETS = SUB_BUCKETS + MAX_SHIFT * HALF_BUCKETS
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def bucket_index(value):
+    """
+    bucket eines wertes in mikrosekunden, log-linear wie bei HdrHistogram
+
+    :param value: int
+    :return: int
+    """
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    if shift > MAX_SHIFT:
+        return BUCKETS - 1
+    return SUB_BUCKETS + (shift - 1) * HALF_BUCKETS + (value >> shift) - HALF_BUCKETS
+
+
+def bucket_value(index):
+    """
+    größter wert eines buckets in mikrosekunden
+
+    :param index: int
+    :return: int
+    """
+    if index < SUB_BUCKETS:
+        return index
+    shift = (index - SUB_BUCKETS) // HALF_BUCKETS + 1
+    sub = (index - SUB_BUCKETS) % HALF_BUCKETS + HALF_BUCKETS
+    return ((sub + 1) << shift) - 1
+
+
+class Timer:
+    """
+    context manager der die dauer eines blocks in ein Histogram schreibt
+    """
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram:
+    """
+    Latenz Histogramm mit festen log-linearen Buckets (HDR Stil), aufzeichnen kostet nur ein paar
+    Ganzzahloperationen, die Quantile werden erst beim Auslesen berechnet. Werte in Sekunden.
+    Jedes Histogramm darf nur von einem Thread geschrieben werden (z.b. dem Ingestion Worker).
+    """
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        """
+
+        :param seconds: float
+        :return: None
+        """
+        # ohne lock: jedes histogramm wird nur von einem thread geschrieben, beim lesen reicht eine kopie
+        value = int(seconds * 1000000)
+        self.counts[bucket_index(value) if value > 0 else 0] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def time(self):
+        """
+        with histogram.time(): ...
+
+        :return: Timer
+        """
+        return Timer(self)
+
+    def quantile(self, quantile):
+        """
+
+        :param quantile: float zwischen 0 und 1
+        :return: float sekunden
+        """
+        counts = list(self.counts)
+        count = sum(counts)
+        maximum = self.max
+        if not count:
+            return 0.0
+        rank = max(int(quantile * count + 0.5), 1)
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(bucket_value(index) / 1000000, maximum)
+        return maximum
+
+
+class Counter:
+    """
+    fortlaufender zähler
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def increment(self, value=1):
+        """
+
+        :param value: int
+        :return: None
+        """
+        with self.lock:
+            self.value += value
+
+
+class Metrics:
+    """
+    Sammelt Histogramme, Zähler und Gauges des Bots. Jede Metrik hat einen Namen und optionale Labels
+    (z.b. stage und symbol). Histogramme und Zähler sollten im Hot Path vorher geholt und gemerkt werden.
+    """
+
+    def __init__(self, prefix="tradingbot"):
+        """
+
+        :param prefix: string vor jedem metrik namen
+        """
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        # (name, labels) -> callable, wird erst beim auslesen aufgerufen
+        self.gauges = {}
+
+    def key(self, name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def histogram(self, name, **labels):
+        """
+
+        :param name: string
+        :return: Histogram
+        """
+        key = self.key(name, labels)
+        with self.lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            return self.histograms[key]
+
+    def counter(self, name, **labels):
+        """
+
+        :param name: string
+        :return: Counter
+        """
+        key = self.key(name, labels)
+        with self.lock:
+            if key not in self.counters:
+                self.counters[key] = Counter()
+            return self.counters[key]
+
+    def gauge(self, name, function, **labels):
+        """
+        registriert einen wert der beim auslesen abgefragt wird (z.b. die tiefe einer queue)
+
+        :param name: string
+        :param function: callable() -> float
+        :return: None
+        """
+        with self.lock:
+            self.gauges[self.key(name, labels)] = function
+
+    def increment(self, name, value=1, **labels):
+        self.counter(name, **labels).increment(value)
+
+    def observe(self, name, seconds, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    def timer(self, name, **labels):
+        return self.histogram(name, **labels).time()
+
+    def format_labels(self, labels, **extra):
+        labels = list(labels) + sorted(extra.items())
+        if not labels:
+            return ""
+        return "{" + ",".join('{0}="{1}"'.format(name, value) for name, value in labels) + "}"
+
+    def render(self):
+        """
+        alle metriken im prometheus text format
+
+        :return: string
+        """
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), histogram in histograms:
+            name = "{0}_{1}".format(self.prefix, name)
+            if name not in typed:
+                typed.add(name)
+                lines.append("# TYPE {0} summary".format(name))
+            for quantile in QUANTILES:
+                lines.append("{0}{1} {2:.9f}".format(name, self.format_labels(labels, quantile=quantile),
+                                                     histogram.quantile(quantile)))
+            lines.append("{0}_sum{1} {2:.9f}".format(name, self.format_labels(labels), histogram.sum))
+            lines.append("{0}_count{1} {2}".format(name, self.format_labels(labels), histogram.count))
+        for kind, metrics in (("counter", counters), ("gauge", gauges)):
+            for (name, labels), metric in metrics:
+                name = "{0}_{1}".format(self.prefix, name)
+                if name not in typed:
+                    typed.add(name)
+                    lines.append("# TYPE {0} {1}".format(name, kind))
+                value = metric.value if kind == "counter" else metric()
+                lines.append("{0}{1} {2}".format(name, self.format_labels(labels), value))
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        eine zeile für das log: zähler und p50/p99/max je histogramm in millisekunden
+
+        :return: string
+        """
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+        parts = []
+        for (name, labels), counter in counters:
+            parts.append("{0}{1}={2}".format(name, self.format_labels(labels), counter.value))
+        for (name, labels), histogram in histograms:
+            if histogram.count:
+                parts.append("{0}{1} n={2} p50={3:.2f}ms p99={4:.2f}ms max={5:.2f}ms".format(
+                    name, self.format_labels(labels), histogram.count, histogram.quantile(0.5) * 1000,
+                    histogram.quantile(0.99) * 1000, histogram.max * 1000))
+        return "metrics " + " | ".join(parts)
+
+
+# gemeinsame metriken des prozesses
+metrics = Metrics()
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer(threading.Thread):
+    """
+    HTTP Endpunkt für Prometheus (GET /metrics)
+    """
+
+    def __init__(self, host="127.0.0.1", port=9108, registry=None):
+        """
+
+        :param host: string
+        :param port: int 0 = freier port
+        :param registry: Metrics standard sind die gemeinsamen metriken
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        self.server.daemon_threads = True
+        self.server.metrics = registry if registry is not None else metrics
+        self.port = self.server.server_address[1]
+
+    def run(self):
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsReporter(threading.Thread):
+    """
+    schreibt in festen Abständen eine Zusammenfassung der Metriken ins Log
+    """
+
+    def __init__(self, interval=60, registry=None):
+        """
+
+        :param interval: float sekunden
+        :param registry: Metrics
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.interval = interval
+        self.metrics = registry if registry is not None else metrics
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            debug_logger.info(self.metrics.summary())
+
+    def stop(self):
+        self.stopped.set()
+
+
+_started = []
+
+
+def start_metrics():
+    """
+    startet endpunkt und log zusammenfassung nach MetricsPort / MetricsInterval aus der settings.ini,
+    mehrfache aufrufe starten nichts neu
+
+    :return: list der gestarteten threads
+    """
+    if _started:
+        return _started
+    config = Config()
+    port = int(config.get("MetricsPort"))
+    interval = float(config.get("MetricsInterval"))
+    if port:
+        try:
+            _started.append(MetricsServer(config.get("MetricsHost"), port))
+        except OSError as error:
+            debug_logger.debug("metrics endpoint not started: %s", error)
+    if interval:
+        _started.append(MetricsReporter(interval))
+    for thread in _started:
+        thread.start()
+    return _started
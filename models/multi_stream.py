@@ -0,0 +1,178 @@
+import atexit
+import json
+import logging
+import os
+import threading
+
+from binance.websockets import BinanceSocketManager
+
+from models.binance_api import BinanceAPI
+from models.config import Config
+from models.exchange_info import ExchangeInfo
+from models.ingestion import KlineIngestor
+from models.mail import MailDispatcher
+from models.metrics import metrics, start_metrics
+from models.recorder import create_recorder
+from models.rest_gateway import GatewayClient
+
+debug_logger = logging.getLogger('debug.log')
+
+
+class MultiStreamBot:
+    """
+    Handelt mehrere Symbole aus einem Prozess über einen kombinierten Websocket.
+    Jedes Symbol hat eine eigene BinanceAPI Instanz mit eigenen Indikatoren und eigenem Zustand
+    (StateDirectory/<Symbol>), Client, Socket Manager und Mail werden geteilt.
+    """
+
+    def __init__(self, symbols=None, client=None, socket_manager=None, mail=None, state_directory=None):
+        """
+
+        :param symbols: list of string standard ist Symbols aus der settings.ini
+        :param client: binance.client.Client
+        :param socket_manager: BinanceSocketManager
+        :param mail: MailDispatcher
+        :param state_directory: string standard ist StateDirectory aus der settings.ini
+        """
+        self.config = Config()
+        if symbols is None:
+            symbols = [symbol.strip() for symbol in self.config.get("Symbols").split(",") if symbol.strip()]
+        if state_directory is None:
+            state_directory = self.config.get("StateDirectory")
+        if client is None:
+            client = GatewayClient.from_config(self.config)
+        if socket_manager is None:
+            socket_manager = BinanceSocketManager(client)
+        if mail is None:
+            mail = MailDispatcher()
+            mail.start()
+        self.client = client
+        self.socket_manager = socket_manager
+        self.mail = mail
+        self.connection_key = None
+        self.user_connection_key = None
+        self.ingestor = KlineIngestor(self.process_message, int(self.config.get("IngestionQueueSize")),
+                                      recorder=create_recorder())
+        self.socket_restarts = metrics.counter("socket_restarts_total")
+        self.reconnect_attempts = 0
+        # eine exchangeInfo anfrage für alle symbole
+        self.exchange_info = ExchangeInfo(client, int(self.config.get("ExchangeInfoTTL")))
+
+        # stream name -> BinanceAPI
+        self.traders = {}
+        for symbol in symbols:
+            trader = BinanceAPI(symbol=symbol, client=client, socket_manager=socket_manager, mail=mail,
+                                state_directory=os.path.join(state_directory, symbol.upper()),
+                                exchange_info=self.exchange_info)
+            self.traders[trader.stream_name()] = trader
+        # symbol -> BinanceAPI für die order updates
+        self.symbols = {trader.symbol: trader for trader in self.traders.values()}
+        # depth und aggTrade stream name -> BinanceAPI, nur für symbole mit order buch bzw. intrabar modus
+        self.market_streams = {trader.depth_stream_name(): trader for trader in self.traders.values()
+                               if trader.order_book is not None}
+        self.market_streams.update((trader.trade_stream_name(), trader) for trader in self.traders.values()
+                                   if trader.intrabar)
+
+    def streams(self):
+        """
+        alle streams des kombinierten websockets
+
+        :return: list of string
+        """
+        return list(self.traders) + list(self.market_streams)
+
+    def start_socket(self):
+        """
+        lädt die historie aller symbole und startet den kombinierten websocket
+
+        :return: None
+        """
+        for trader in self.traders.values():
+            trader.warm_up()
+            atexit.register(trader.save_snapshot)
+        self.exchange_info.refresh()
+        self.exchange_info.start_refresher()
+        start_metrics()
+        self.connection_key = self.socket_manager.start_multiplex_socket(self.streams(), self.ingestor.on_message)
+        self.start_user_socket()
+        self.ingestor.start()
+        self.socket_manager.start()
+        debug_logger.debug("multiplex socket started for %s streams", len(self.traders))
+        self.mail.send_mail("Tradingbot started", "Tradingbot started: {0}".format(
+            ", ".join(trader.symbol for trader in self.traders.values())))
+
+    def restart_socket(self):
+        """
+        öffnet den kombinierten websocket neu, der erste versuch sofort, danach mit wachsender wartezeit
+
+        :return: None
+        """
+        delay = min(2 ** (self.reconnect_attempts - 1), 60) if self.reconnect_attempts else 0
+        self.reconnect_attempts += 1
+        debug_logger.debug("restarting multiplex socket in %ss", delay)
+        self.socket_restarts.increment()
+        threading.Timer(delay, self.reconnect).start()
+
+    def reconnect(self):
+        """
+        öffnet den kombinierten websocket neu, die verpassten kerzen lädt danach der ingestion worker nach
+
+        :return: None
+        """
+        self.socket_manager.stop_socket(self.connection_key)
+        self.connection_key = self.socket_manager.start_multiplex_socket(self.streams(), self.ingestor.on_message)
+        self.ingestor.on_message({'e': 'reconnected'})
+        debug_logger.debug("multiplex socket restarted")
+        self.mail.send_mail("Tradingbot socket restarted", "Tradingbot socket restarted")
+
+    def start_user_socket(self):
+        """
+        startet den user data stream für die order updates aller symbole
+
+        :return: None
+        """
+        if self.user_connection_key is not None:
+            self.socket_manager.stop_socket(self.user_connection_key)
+        self.user_connection_key = self.socket_manager.start_user_socket(self.ingestor.on_message)
+        for trader in self.traders.values():
+            trader.user_connection_key = self.user_connection_key
+
+    def process_message(self, msg):
+        """
+        verteilt die nachrichten des kombinierten websockets an die symbole,
+        format: {"stream": "<symbol>@kline_<interval>", "<symbol>@depth@100ms" oder "<symbol>@aggTrade",
+        "data": {...}}
+
+        :param msg: dict
+        :return: None
+        """
+        if msg.get('e') == 'executionReport':
+            trader = self.symbols.get(msg['s'])
+            if trader is not None:
+                trader.process_order_update(msg)
+            return
+
+        if msg.get('e') == 'listenKeyExpired':
+            self.start_user_socket()
+            return
+
+        if msg.get('e') == 'error':
+            debug_logger.debug(json.dumps(msg))
+            self.restart_socket()
+            return
+
+        if msg.get('e') == 'reconnected':
+            for trader in self.traders.values():
+                trader.backfill()
+            return
+
+        # sonstige events des user data streams (kontostand usw.) werden nicht gebraucht
+        if 'data' not in msg:
+            return
+
+        self.reconnect_attempts = 0
+        trader = self.traders.get(msg['stream']) or self.market_streams.get(msg['stream'])
+        if trader is None:
+            debug_logger.debug("message for unknown stream %s", msg['stream'])
+            return
+        trader.process_message(msg['data'])
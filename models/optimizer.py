@@ -0,0 +1,192 @@
+import itertools
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy
+
+from models.backtest_engine import BacktestEngine
+from models.strategy import Strategy
+
+# standard suchraum, die werte des live bots sind jeweils enthalten
+DEFAULT_SPACE = {
+    "short_ema": [5, 7, 9, 12],
+    "long_ema": [15, 18, 21, 26],
+    "signal_ema": [3, 5, 7, 9],
+    "bbands_period": [14, 18, 20, 24],
+    "stoch_buy": [70, 80, 90],
+    "stoch_sell": [10, 20, 30],
+    "sell_margin": [0, 5, 10],
+}
+
+# reihenfolge nach der die kombinationen sortiert werden, damit kombinationen mit gleichen indikatoren
+# im selben worker landen und aus dessen cache bedient werden
+INDICATOR_KEYS = ["window", "short_ema", "long_ema", "signal_ema", "rsi_period", "fastk_period", "fastd_period",
+                  "bbands_period", "nbdev"]
+
+METRICS = {
+    # name: True wenn größer besser ist
+    "pnl": True,
+    "sharpe": True,
+    "win_rate": True,
+    "max_drawdown": False,
+}
+
+# zustand der worker prozesse, wird im initializer gesetzt
+_worker = {}
+
+
+def parameter_grid(space):
+    """
+    alle kombinationen des suchraums, short_ema muss kleiner als long_ema sein
+
+    :param space: dict name -> liste von werten
+    :return: list of dict
+    """
+    names = sorted(space)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+    return [parameters for parameters in combinations if is_valid(parameters)]
+
+
+def random_parameters(space, count, seed=None):
+    """
+    zufällige kombinationen aus dem suchraum
+
+    :param space: dict name -> liste von werten
+    :param count: int
+    :param seed: int
+    :return: list of dict
+    """
+    generator = random.Random(seed)
+    combinations = []
+    seen = set()
+    attempts = 0
+    while len(combinations) < count and attempts < count * 100:
+        attempts += 1
+        parameters = {name: generator.choice(values) for name, values in space.items()}
+        key = tuple(sorted(parameters.items()))
+        if key in seen or not is_valid(parameters):
+            continue
+        seen.add(key)
+        combinations.append(parameters)
+    return combinations
+
+
+def is_valid(parameters):
+    """
+
+    :param parameters: dict
+    :return: bool
+    """
+    return parameters.get("short_ema", 9) < parameters.get("long_ema", 18)
+
+
+def _init_worker(name, length, quantity, fee, base_parameters):
+    """
+    verbindet den worker mit dem shared memory der kurse, die kurse werden nicht gepickelt
+    """
+    memory = shared_memory.SharedMemory(name=name)
+    _worker["memory"] = memory
+    _worker["closes"] = numpy.ndarray((length,), dtype=numpy.float64, buffer=memory.buf)
+    _worker["quantity"] = quantity
+    _worker["fee"] = fee
+    _worker["base_parameters"] = base_parameters
+    _worker["cache"] = {}
+
+
+def _evaluate(batch):
+    """
+    bewertet einen block von kombinationen im worker
+
+    :param batch: list of dict
+    :return: list of dict
+    """
+    closes = _worker["closes"]
+    cache = _worker["cache"]
+    results = []
+    for parameters in batch:
+        strategy = Strategy(**dict(_worker["base_parameters"], **parameters))
+        engine = BacktestEngine(strategy, quantity=_worker["quantity"], fee=_worker["fee"])
+        result = engine.run(closes, indicators=strategy.indicators(closes, cache))
+        results.append(dict(parameters, pnl=result.pnl, trades=result.trades, win_rate=result.win_rate,
+                            max_drawdown=result.max_drawdown, sharpe=result.sharpe))
+
+    # der cache gilt nur für ähnliche kombinationen im selben block, sonst wächst er unbegrenzt
+    cache.clear()
+    return results
+
+
+class Optimizer:
+    """
+    Sucht Parameter der Strategie über die Historie, verteilt auf mehrere Prozesse.
+    Die Kurse liegen einmal im Shared Memory, gleiche Indikatoren (z.b. dieselbe EMA) werden
+    innerhalb eines Blocks nur einmal berechnet.
+    """
+
+    def __init__(self, closes, quantity=1.0, fee=0.0, workers=None, batch_size=64, **base_parameters):
+        """
+
+        :param closes: numpy.ndarray
+        :param quantity: float
+        :param fee: float
+        :param workers: int standard anzahl cpus
+        :param batch_size: int kombinationen je auftrag an einen worker
+        :param base_parameters: feste parameter der strategie (z.b. window)
+        """
+        self.closes = numpy.asarray(closes, dtype=numpy.float64)
+        self.quantity = quantity
+        self.fee = fee
+        self.workers = workers or os.cpu_count()
+        self.batch_size = batch_size
+        self.base_parameters = base_parameters
+        self.elapsed = 0.0
+
+    def batches(self, combinations):
+        """
+        sortiert die kombinationen nach den indikator parametern und teilt sie in blöcke
+
+        :param combinations: list of dict
+        :return: list of list of dict
+        """
+        def indicator_key(parameters):
+            merged = dict(self.base_parameters, **parameters)
+            return tuple(merged.get(key, 0) for key in INDICATOR_KEYS)
+
+        combinations = sorted(combinations, key=indicator_key)
+        return [combinations[i:i + self.batch_size] for i in range(0, len(combinations), self.batch_size)]
+
+    def run(self, combinations, metric="pnl"):
+        """
+        bewertet alle kombinationen und gibt sie nach der metrik sortiert zurück (beste zuerst)
+
+        :param combinations: list of dict
+        :param metric: string aus METRICS
+        :return: list of dict
+        """
+        start = time.perf_counter()
+        memory = shared_memory.SharedMemory(create=True, size=max(self.closes.nbytes, 1))
+        try:
+            shared = numpy.ndarray(self.closes.shape, dtype=numpy.float64, buffer=memory.buf)
+            shared[:] = self.closes
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                     initargs=(memory.name, len(self.closes), self.quantity, self.fee,
+                                               self.base_parameters)) as executor:
+                results = [result for batch in executor.map(_evaluate, self.batches(combinations))
+                           for result in batch]
+            del shared
+        finally:
+            memory.close()
+            memory.unlink()
+        self.elapsed = time.perf_counter() - start
+        return self.rank(results, metric)
+
+    def rank(self, results, metric="pnl"):
+        """
+
+        :param results: list of dict
+        :param metric: string aus METRICS
+        :return: list of dict
+        """
+        return sorted(results, key=lambda result: result[metric], reverse=METRICS[metric])
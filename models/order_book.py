@@ -0,0 +1,289 @@
+import logging
+import time
+from bisect import bisect_left, bisect_right
+
+from models.metrics import metrics
+
+debug_logger = logging.getLogger('debug.log')
+
+
+class BookSide:
+    """
+    Eine Seite des Order Buchs als zwei parallele, sortierte Listen (Preis, Menge).
+    Bids werden mit negativem Preis gespeichert, damit bei beiden Seiten Index 0 der beste Preis ist.
+    Suchen über bisect in O(log n), einfügen und löschen verschieben nur den Rest der Liste (memmove).
+    """
+
+    def __init__(self, descending):
+        """
+
+        :param descending: bool True für bids (höchster preis zuerst)
+        """
+        self.sign = -1.0 if descending else 1.0
+        self.keys = []
+        self.quantities = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def clear(self):
+        self.keys = []
+        self.quantities = []
+
+    def load(self, levels):
+        """
+        übernimmt die preisstufen eines snapshots
+
+        :param levels: list of [preis, menge] als strings
+        :return: None
+        """
+        pairs = sorted((float(price) * self.sign, float(quantity)) for price, quantity, *_ in levels
+                       if float(quantity) != 0)
+        self.keys = [key for key, _ in pairs]
+        self.quantities = [quantity for _, quantity in pairs]
+
+    def set(self, price, quantity):
+        """
+        setzt die menge einer preisstufe, menge 0 entfernt die stufe
+
+        :param price: float
+        :param quantity: float
+        :return: None
+        """
+        key = price * self.sign
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            if quantity == 0:
+                del self.keys[index]
+                del self.quantities[index]
+            else:
+                self.quantities[index] = quantity
+        elif quantity != 0:
+            self.keys.insert(index, key)
+            self.quantities.insert(index, quantity)
+
+    def best(self):
+        """
+
+        :return: float bester preis oder None
+        """
+        return self.keys[0] * self.sign if self.keys else None
+
+    def quantity_at(self, price):
+        """
+
+        :param price: float
+        :return: float menge genau auf dieser preisstufe
+        """
+        key = price * self.sign
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return self.quantities[index]
+        return 0.0
+
+    def depth(self, price):
+        """
+        summierte menge aller stufen die gleich gut oder besser als price sind
+
+        :param price: float
+        :return: float
+        """
+        return sum(self.quantities[:bisect_right(self.keys, price * self.sign)])
+
+    def levels(self, count):
+        """
+
+        :param count: int
+        :return: list of tuple (preis, menge), beste stufe zuerst
+        """
+        return [(key * self.sign, quantity) for key, quantity in zip(self.keys[:count], self.quantities[:count])]
+
+
+class OrderBook:
+    """
+    Lokales Order Buch aus dem diff depth stream (<symbol>@depth) und einem REST snapshot.
+    Bis der snapshot da ist und nach jeder lücke in den update ids werden die events gepuffert,
+    needs_snapshot() sagt dem besitzer dann, dass er einen snapshot holen und mit apply_snapshot übergeben soll.
+    Ablauf wie in der binance doku: events bis lastUpdateId verwerfen, das erste event muss lastUpdateId + 1
+    enthalten, danach muss jedes U genau das u des vorherigen + 1 sein.
+    Ist ein snapshot veraltet oder schlägt er fehl, wird weiter gepuffert und der nächste erst nach einer
+    wachsenden Wartezeit angefordert, damit wiederholte snapshots (gewicht 10 und mehr) das limit nicht aufbrauchen.
+    """
+
+    # sekunden bis zum nächsten snapshot nach einem veralteten oder fehlgeschlagenen, verdoppelt sich bis zum maximum
+    MIN_RETRY_DELAY = 1.0
+    MAX_RETRY_DELAY = 60.0
+
+    def __init__(self, symbol, max_buffer=1000, clock=time.monotonic):
+        """
+
+        :param symbol: string
+        :param max_buffer: int gepufferte events bis zum snapshot, ältere werden verworfen
+        :param clock: callable sekunden, für die wartezeit zwischen zwei snapshots
+        """
+        self.symbol = symbol
+        self.max_buffer = max_buffer
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.last_update_id = None
+        self.synced = False
+        self.snapshot_pending = False
+        self.buffer = []
+        self.clock = clock
+        self.retry_delay = 0.0
+        self.retry_at = 0.0
+        self.resyncs = metrics.counter("order_book_resyncs_total", symbol=symbol)
+
+    def update(self, event):
+        """
+        übernimmt ein depthUpdate event
+
+        :param event: dict mit U, u, b und a
+        :return: bool True wenn das event ins buch übernommen wurde
+        """
+        if not self.synced:
+            self.buffer.append(event)
+            if len(self.buffer) > self.max_buffer:
+                del self.buffer[0]
+            return False
+        if event['u'] <= self.last_update_id:
+            return False
+        if event['U'] != self.last_update_id + 1:
+            debug_logger.debug("order book %s gap: expected update %s, got %s", self.symbol,
+                               self.last_update_id + 1, event['U'])
+            self.invalidate()
+            self.buffer.append(event)
+            return False
+        self.apply(event)
+        return True
+
+    def apply(self, event):
+        for price, quantity, *_ in event['b']:
+            self.bids.set(float(price), float(quantity))
+        for price, quantity, *_ in event['a']:
+            self.asks.set(float(price), float(quantity))
+        self.last_update_id = event['u']
+
+    def invalidate(self):
+        """
+        verwirft das buch, bis zum nächsten snapshot werden die events gepuffert
+
+        :return: None
+        """
+        self.synced = False
+        self.bids.clear()
+        self.asks.clear()
+        self.buffer = []
+        self.resyncs.increment()
+
+    def needs_snapshot(self):
+        """
+        ein snapshot wird gebraucht wenn events gepuffert sind, noch keiner angefordert ist und die wartezeit
+        nach dem letzten veralteten oder fehlgeschlagenen snapshot vorbei ist
+
+        :return: bool
+        """
+        return (not self.synced and not self.snapshot_pending and len(self.buffer) > 0
+                and self.clock() >= self.retry_at)
+
+    def request_snapshot(self):
+        """
+        merkt sich dass der besitzer einen snapshot holt, bis apply_snapshot oder snapshot_failed
+
+        :return: None
+        """
+        self.snapshot_pending = True
+
+    def snapshot_failed(self):
+        self.snapshot_pending = False
+        self.back_off()
+
+    def back_off(self):
+        """
+        der nächste snapshot frühestens nach MIN_RETRY_DELAY, bei jedem weiteren versuch doppelt so spät
+
+        :return: None
+        """
+        self.retry_delay = min(max(self.retry_delay * 2, self.MIN_RETRY_DELAY), self.MAX_RETRY_DELAY)
+        self.retry_at = self.clock() + self.retry_delay
+
+    def apply_snapshot(self, snapshot):
+        """
+        übernimmt den snapshot der rest api (GET /api/v3/depth) und die seitdem gepufferten events
+
+        :param snapshot: dict mit lastUpdateId, bids und asks
+        :return: bool True wenn das buch danach synchron ist
+        """
+        self.snapshot_pending = False
+        last_update_id = snapshot['lastUpdateId']
+        pending = [event for event in self.buffer if event['u'] > last_update_id]
+        if pending and pending[0]['U'] > last_update_id + 1:
+            # der snapshot ist älter als das erste gepufferte event, es braucht einen neueren
+            debug_logger.debug("order book %s snapshot %s is older than update %s", self.symbol, last_update_id,
+                               pending[0]['U'])
+            self.buffer = pending
+            self.back_off()
+            return False
+        self.retry_delay = 0.0
+        self.bids.load(snapshot['bids'])
+        self.asks.load(snapshot['asks'])
+        self.last_update_id = last_update_id
+        self.synced = True
+        self.buffer = []
+        for index, event in enumerate(pending):
+            # das erste event darf vor lastUpdateId + 1 beginnen, die folgenden müssen lückenlos anschließen
+            if index == 0:
+                self.apply(event)
+            elif not self.update(event):
+                break
+        debug_logger.debug("order book %s synced at update %s", self.symbol, self.last_update_id)
+        return self.synced
+
+    def best_bid(self):
+        """
+
+        :return: float oder None
+        """
+        return self.bids.best() if self.synced else None
+
+    def best_ask(self):
+        """
+
+        :return: float oder None
+        """
+        return self.asks.best() if self.synced else None
+
+    def spread(self):
+        """
+
+        :return: float oder None
+        """
+        bid, ask = self.best_bid(), self.best_ask()
+        return ask - bid if bid is not None and ask is not None else None
+
+    def mid(self):
+        """
+
+        :return: float oder None
+        """
+        bid, ask = self.best_bid(), self.best_ask()
+        return (ask + bid) / 2 if bid is not None and ask is not None else None
+
+    def quantity_at(self, side, price):
+        """
+
+        :param side: string BUY (bids) oder SELL (asks)
+        :param price: float
+        :return: float
+        """
+        return (self.bids if side == "BUY" else self.asks).quantity_at(price)
+
+    def depth(self, side, price):
+        """
+        menge die bis price auf einer seite im buch liegt
+
+        :param side: string BUY (bids) oder SELL (asks)
+        :param price: float
+        :return: float
+        """
+        return (self.bids if side == "BUY" else self.asks).depth(price)
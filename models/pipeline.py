@@ -0,0 +1,421 @@
+import operator
+
+import numpy
+
+from models import indicators
+
+# übersetzte update funktionen je quelltext, gleiche strategien (mehrere symbole, snapshots) übersetzen nur einmal
+COMPILED = {}
+
+
+class Node:
+    """
+    Knoten im Indikator Graph. Eingänge sind andere Knoten oder Konstanten. Zwei Knoten mit gleichem Typ,
+    gleichen Eingängen und gleichen Parametern haben den gleichen Schlüssel und werden in einer Pipeline
+    nur einmal berechnet, egal von wie vielen Signalen sie benutzt werden.
+    Mit den Operatoren (-, +, *, &, >, <, >=, <=) entstehen neue Knoten.
+    """
+
+    # zustandsbehaftete knoten werden im batch modus über den cache geteilt
+    stateful = False
+    # namen der ausgänge bei knoten mit mehreren werten
+    outputs = ()
+
+    def __init__(self, *inputs, **params):
+        """
+
+        :param inputs: Node oder float
+        :param params: parameter des knotens, teil des schlüssels
+        """
+        self.inputs = inputs
+        self.params = params
+        self.key = (type(self).__name__, tuple(item.key if isinstance(item, Node) else item for item in inputs),
+                    tuple(sorted(params.items())))
+
+    def __getattr__(self, name):
+        """
+        einzelner ausgang eines knotens mit mehreren werten, z.b. bbands.upper
+
+        :param name: string
+        :return: Output
+        """
+        outputs = type(self).outputs
+        if name in outputs:
+            return Output(self, index=outputs.index(name))
+        raise AttributeError(name)
+
+    def __sub__(self, other):
+        return Operator(self, other, symbol="-")
+
+    def __add__(self, other):
+        return Operator(self, other, symbol="+")
+
+    def __mul__(self, other):
+        return Operator(self, other, symbol="*")
+
+    def __and__(self, other):
+        return Operator(self, other, symbol="&")
+
+    def __gt__(self, other):
+        return Operator(self, other, symbol=">")
+
+    def __lt__(self, other):
+        return Operator(self, other, symbol="<")
+
+    def __ge__(self, other):
+        return Operator(self, other, symbol=">=")
+
+    def __le__(self, other):
+        return Operator(self, other, symbol="<=")
+
+    def state(self):
+        """
+        fortlaufende berechnung für den streaming modus, None bei knoten ohne zustand
+
+        :return: objekt mit update methode
+        """
+        return None
+
+    def expression(self, *names):
+        """
+        python ausdruck für knoten ohne zustand, wird direkt in die fusionierte update funktion geschrieben
+
+        :param names: string variablennamen der eingänge
+        :return: string
+        """
+        raise NotImplementedError
+
+    def batch(self, *values):
+        """
+        berechnung über eine ganze historie
+
+        :param values: numpy.ndarray oder float je eingang
+        :return: numpy.ndarray oder tuple numpy.ndarray
+        """
+        raise NotImplementedError
+
+
+class Source(Node):
+    """
+    Eingang der Pipeline, im streaming modus ein argument der update funktion
+    """
+
+    def __init__(self, name="close"):
+        super().__init__(name=name)
+
+    def batch(self, *values):
+        raise ValueError("source {} has no value".format(self.params["name"]))
+
+
+class Output(Node):
+    """
+    ein ausgang eines knotens mit mehreren werten
+    """
+
+    def __init__(self, source, index):
+        super().__init__(source, index=index)
+
+    def expression(self, *names):
+        return "{0}[{1}]".format(names[0], self.params["index"])
+
+    def batch(self, *values):
+        return values[0][self.params["index"]]
+
+
+class Operator(Node):
+    """
+    elementweiser operator, im streaming modus ergeben vergleiche 0 oder 1, im batch modus bool arrays
+    """
+
+    FUNCTIONS = {"-": operator.sub, "+": operator.add, "*": operator.mul, "&": operator.and_, ">": operator.gt,
+                 "<": operator.lt, ">=": operator.ge, "<=": operator.le}
+    COMPARISONS = (">", "<", ">=", "<=")
+
+    def __init__(self, left, right, symbol):
+        super().__init__(left, right, symbol=symbol)
+
+    def expression(self, *names):
+        symbol = self.params["symbol"]
+        if symbol in self.COMPARISONS:
+            return "1 if {0} {1} {2} else 0".format(names[0], symbol, names[1])
+        return "{0} {1} {2}".format(names[0], symbol, names[1])
+
+    def batch(self, *values):
+        return self.FUNCTIONS[self.params["symbol"]](values[0], values[1])
+
+
+class EMA(Node):
+    stateful = True
+
+    def __init__(self, source, period):
+        super().__init__(source, period=period)
+
+    def state(self):
+        return indicators.EMA(self.params["period"])
+
+    def batch(self, *values):
+        import talib
+
+        return talib.EMA(values[0], self.params["period"])
+
+
+class BollingerBands(Node):
+    stateful = True
+    outputs = ("upper", "middle", "lower")
+
+    def __init__(self, source, period, nbdev):
+        super().__init__(source, period=period, nbdev=nbdev)
+
+    def state(self):
+        return indicators.BollingerBands(self.params["period"], self.params["nbdev"], self.params["nbdev"])
+
+    def batch(self, *values):
+        import talib
+
+        return talib.BBANDS(values[0], timeperiod=self.params["period"], nbdevup=self.params["nbdev"],
+                            nbdevdn=self.params["nbdev"], matype=0)
+
+
+class StochRSI(Node):
+    stateful = True
+    outputs = ("fastk", "fastd")
+
+    def __init__(self, source, rsi_period, fastk_period, fastd_period):
+        super().__init__(source, rsi_period=rsi_period, fastk_period=fastk_period, fastd_period=fastd_period)
+
+    def state(self):
+        return indicators.StochRSI(self.params["rsi_period"], self.params["fastk_period"],
+                                   self.params["fastd_period"])
+
+    def batch(self, *values):
+        import talib
+
+        return talib.STOCHRSI(values[0], timeperiod=self.params["rsi_period"],
+                              fastk_period=self.params["fastk_period"], fastd_period=self.params["fastd_period"],
+                              fastd_matype=0)
+
+
+class Rolling(Node):
+    """
+    max, min oder durchschnitt über die letzten `window` werte, am anfang über alle bisherigen
+    """
+
+    stateful = True
+    STATES = {"max": indicators.RollingMax, "min": indicators.RollingMin, "mean": indicators.RollingMean}
+
+    def __init__(self, source, window, function):
+        super().__init__(source, window=window, function=function)
+
+    def state(self):
+        return self.STATES[self.params["function"]](self.params["window"])
+
+    def batch(self, *values):
+        import pandas as pd
+
+        rolling = pd.Series(values[0]).rolling(self.params["window"], min_periods=1)
+        return getattr(rolling, self.params["function"])().to_numpy()
+
+
+class LatchState:
+    """
+    hält den zuletzt gebrochenen bandbruch fest
+    """
+
+    def __init__(self):
+        self.upper = 0
+        self.lower = 0
+
+    def update(self, upper, lower):
+        """
+
+        :param upper: int 1 wenn das obere band gebrochen wurde
+        :param lower: int 1 wenn das untere band gebrochen wurde
+        :return: tuple upper, lower
+        """
+        if upper:
+            self.upper, self.lower = 1, 0
+        if lower:
+            self.upper, self.lower = 0, 1
+        return self.upper, self.lower
+
+    def peek(self, upper, lower):
+        if lower:
+            return 0, 1
+        if upper:
+            return 1, 0
+        return self.upper, self.lower
+
+
+class Latch(Node):
+    stateful = True
+    outputs = ("upper", "lower")
+
+    def __init__(self, upper, lower):
+        super().__init__(upper, lower)
+
+    def state(self):
+        return LatchState()
+
+    def batch(self, *values):
+        """
+        ohne schleife über forward fill der indizes
+
+        :param values: numpy.ndarray bool upper, lower
+        :return: tuple numpy.ndarray bool
+        """
+        upper, lower = values
+        state = numpy.where(lower, -1, numpy.where(upper, 1, 0))
+        last_change = numpy.where(state != 0, numpy.arange(len(state)), 0)
+        numpy.maximum.accumulate(last_change, out=last_change)
+        state = state[last_change]
+        return state == 1, state == -1
+
+
+class Pipeline:
+    """
+    Deklarative Definition der Indikatoren als Graph. Die gleiche Definition läuft
+    - im streaming modus (stream): eine einzige generierte update funktion je kerze, O(1) je knoten
+    - im batch modus (batch): talib/numpy über die ganze historie, mit cache über mehrere pipelines
+    """
+
+    def __init__(self, outputs):
+        """
+
+        :param outputs: dict name -> Node, die schlüssel der ergebnisse
+        """
+        self.outputs = outputs
+        self.nodes = []
+        self.sources = []
+        seen = set()
+
+        # tiefensuche, knoten mit gleichem schlüssel kommen nur einmal in die reihenfolge
+        def visit(node):
+            if node.key in seen:
+                return
+            seen.add(node.key)
+            for item in node.inputs:
+                if isinstance(item, Node):
+                    visit(item)
+            if isinstance(node, Source):
+                self.sources.append(node)
+            else:
+                self.nodes.append(node)
+
+        for node in outputs.values():
+            visit(node)
+
+    def stream(self):
+        """
+
+        :return: StreamingPipeline
+        """
+        return StreamingPipeline(self)
+
+    def batch(self, cache=None, **sources):
+        """
+        berechnet alle ausgänge über ganze historien
+
+        :param cache: dict optional, zustandsbehaftete knoten mit gleichem schlüssel werden daraus wiederverwendet
+        :param sources: numpy.ndarray je Source, z.b. close=closes
+        :return: dict of numpy.ndarray
+        """
+        if cache is None:
+            cache = {}
+        values = {source.key: numpy.asarray(sources[source.params["name"]], dtype=numpy.float64)
+                  for source in self.sources}
+        for node in self.nodes:
+            if node.key in cache:
+                values[node.key] = cache[node.key]
+                continue
+            value = node.batch(*[values[item.key] if isinstance(item, Node) else item for item in node.inputs])
+            if node.stateful:
+                cache[node.key] = value
+            values[node.key] = value
+        return {name: values[node.key] for name, node in self.outputs.items()}
+
+
+class StreamingPipeline:
+    """
+    Fortlaufende Auswertung einer Pipeline. Alle Knoten werden in eine einzige python funktion übersetzt:
+    zustandsbehaftete knoten sind gebundene update methoden, alle anderen werden als ausdruck eingesetzt.
+    Je kerze gibt es damit keine schleife über knoten und kein nachschlagen von zwischenwerten.
+    Eine zweite funktion (preview) ruft statt update die peek methoden auf: vorläufige werte für die noch
+    offene kerze, ohne den zustand zu verändern.
+    """
+
+    def __init__(self, pipeline):
+        """
+
+        :param pipeline: Pipeline
+        """
+        self.pipeline = pipeline
+        self.states = {node.key: node.state() for node in pipeline.nodes if node.stateful}
+        self.last = None
+        self.compile()
+
+    def compile(self):
+        """
+        erzeugt die update und die preview funktion aus der reihenfolge der knoten
+
+        :return: None
+        """
+        self.function = self.build("update")
+        self.preview_function = self.build("peek")
+
+    def build(self, method):
+        """
+
+        :param method: string update oder peek, methode der zustandsbehafteten knoten
+        :return: function
+        """
+        names = {}
+        namespace = {}
+        lines = []
+        for source in self.pipeline.sources:
+            names[source.key] = source.params["name"]
+        for index, node in enumerate(self.pipeline.nodes):
+            name = "v{}".format(index)
+            arguments = [names[item.key] if isinstance(item, Node) else repr(item) for item in node.inputs]
+            if node.stateful:
+                namespace["state{}".format(index)] = getattr(self.states[node.key], method)
+                lines.append("    {0} = state{1}({2})".format(name, index, ", ".join(arguments)))
+            else:
+                lines.append("    {0} = {1}".format(name, node.expression(*arguments)))
+            names[node.key] = name
+        result = ", ".join("{0!r}: {1}".format(key, names[node.key]) for key, node in self.pipeline.outputs.items())
+        source = "def evaluate({0}):\n{1}\n    return {{{2}}}\n".format(
+            ", ".join(source.params["name"] for source in self.pipeline.sources), "\n".join(lines), result)
+        if source not in COMPILED:
+            COMPILED[source] = compile(source, "<pipeline>", "exec")
+        exec(COMPILED[source], namespace)
+        return namespace["evaluate"]
+
+    def update(self, close):
+        """
+        nimmt den close einer geschlossenen kerze auf und gibt die aktuellen werte aller ausgänge zurück
+
+        :param close: float
+        :return: dict
+        """
+        self.last = self.function(close)
+        return self.last
+
+    def preview(self, close):
+        """
+        vorläufige werte wenn die offene kerze jetzt mit close schließen würde, ändert keinen zustand
+
+        :param close: float
+        :return: dict
+        """
+        return self.preview_function(close)
+
+    def __getstate__(self):
+        # die generierte funktion lässt sich nicht pickeln, sie wird aus den zuständen neu erzeugt
+        state = dict(self.__dict__)
+        del state["function"]
+        del state["preview_function"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.compile()
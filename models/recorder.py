@@ -0,0 +1,410 @@
+import atexit
+import bisect
+import collections
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from models.config import Config
+from models.metrics import metrics
+
+debug_logger = logging.getLogger('debug.log')
+
+# kopf eines blocks: magic, codec, komprimierte länge, rohe länge, anzahl frames, erster und letzter zeitstempel
+CHUNK_HEADER = struct.Struct("<4sBIIIqq")
+CHUNK_MAGIC = b"TBRF"
+# vor jedem frame im block: empfangszeit in millisekunden und länge
+FRAME_HEADER = struct.Struct("<qI")
+# eintrag der index datei je block: erster und letzter zeitstempel, offset, anzahl frames
+INDEX_ENTRY = struct.Struct("<qqQI")
+INDEX_SUFFIX = ".idx"
+
+CODECS = {"none": 0, "zlib": 1, "zstd": 2}
+
+
+def compress(codec, data):
+    """
+
+    :param codec: int aus CODECS
+    :param data: bytes
+    :return: bytes
+    """
+    if codec == CODECS["zstd"]:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == CODECS["zlib"]:
+        return zlib.compress(data, 6)
+    return data
+
+
+def decompress(codec, data, size):
+    """
+
+    :param codec: int aus CODECS
+    :param data: bytes
+    :param size: int rohe länge
+    :return: bytes
+    """
+    if codec == CODECS["zstd"]:
+        if zstandard is None:
+            raise RuntimeError("recording is zstd compressed, install the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=size)
+    if codec == CODECS["zlib"]:
+        return zlib.decompress(data)
+    return data
+
+
+def scan_chunks(path):
+    """
+    liest die blockköpfe einer aufzeichnung, ein unvollständiger block am ende (abbruch beim schreiben)
+    wird ignoriert
+
+    :param path: string
+    :return: tuple list of (first_ts, last_ts, offset, frames), int länge bis zum ende des letzten vollständigen blocks
+    """
+    chunks = []
+    size = os.path.getsize(path)
+    offset = 0
+    with open(path, "rb") as file:
+        while offset + CHUNK_HEADER.size <= size:
+            magic, codec, compressed_size, raw_size, frames, first_ts, last_ts = \
+                CHUNK_HEADER.unpack(file.read(CHUNK_HEADER.size))
+            if magic != CHUNK_MAGIC or offset + CHUNK_HEADER.size + compressed_size > size:
+                break
+            chunks.append((first_ts, last_ts, offset, frames))
+            offset += CHUNK_HEADER.size + compressed_size
+            file.seek(offset)
+    return chunks, offset
+
+
+class FrameRecorder(threading.Thread):
+    """
+    Hängt jeden empfangenen Websocket Frame mit der Empfangszeit an eine komprimierte Datei an.
+    record() legt den Frame nur in eine deque (kein Lock, keine Serialisierung), ein Hintergrund Thread
+    serialisiert, komprimiert blockweise (zstd wenn installiert, sonst zlib) und schreibt Block und Index.
+    Eine nach einem Absturz unvollständige Datei wird beim Öffnen auf den letzten ganzen Block gekürzt.
+    """
+
+    def __init__(self, path, compression="zstd", chunk_size=262144, flush_interval=1.0, max_pending=100000):
+        """
+
+        :param path: string
+        :param compression: string zstd | zlib | none
+        :param chunk_size: int rohe bytes je block
+        :param flush_interval: float sekunden, danach wird auch ein nicht voller block geschrieben
+        :param max_pending: int frames die auf den thread warten, weitere werden verworfen
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        if compression == "zstd" and zstandard is None:
+            debug_logger.debug("zstandard not installed, recording with zlib")
+            compression = "zlib"
+        self.codec = CODECS[compression]
+        self.path = path
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = collections.deque()
+        self.stopped = threading.Event()
+        self.dropped = 0
+        self.recorded = 0
+        self.frames = metrics.counter("recorder_frames_total")
+        metrics.gauge("recorder_pending", lambda: len(self.pending))
+        metrics.gauge("recorder_dropped", lambda: self.dropped)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.repair()
+        self.file = open(path, "ab")
+        self.index = open(path + INDEX_SUFFIX, "ab")
+
+    def repair(self):
+        """
+        kürzt einen unvollständigen block am ende und schreibt den index neu wenn er nicht passt
+
+        :return: None
+        """
+        if not os.path.isfile(self.path):
+            return
+        chunks, valid_size = scan_chunks(self.path)
+        if valid_size != os.path.getsize(self.path):
+            debug_logger.debug("truncating incomplete chunk at %s of %s", valid_size, self.path)
+            with open(self.path, "r+b") as file:
+                file.truncate(valid_size)
+        index_path = self.path + INDEX_SUFFIX
+        if not os.path.isfile(index_path) or os.path.getsize(index_path) != len(chunks) * INDEX_ENTRY.size:
+            with open(index_path, "wb") as index:
+                for chunk in chunks:
+                    index.write(INDEX_ENTRY.pack(*chunk))
+
+    def record(self, frame, timestamp=None):
+        """
+        nimmt einen frame auf, läuft auf dem websocket thread und blockiert nie
+
+        :param frame: string, bytes oder dict (wird im hintergrund als json geschrieben)
+        :param timestamp: int millisekunden, standard jetzt
+        :return: None
+        """
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self.pending.append((int(time.time() * 1000) if timestamp is None else timestamp, frame))
+
+    def run(self):
+        buffer = []
+        size = 0
+        last_flush = time.monotonic()
+        while True:
+            stopping = self.stopped.wait(min(self.flush_interval, 0.1))
+            while self.pending:
+                timestamp, frame = self.pending.popleft()
+                if isinstance(frame, dict):
+                    frame = json.dumps(frame, separators=(",", ":"))
+                if isinstance(frame, str):
+                    frame = frame.encode("utf-8")
+                buffer.append((timestamp, frame))
+                size += FRAME_HEADER.size + len(frame)
+                if size >= self.chunk_size:
+                    self.write_chunk(buffer)
+                    buffer, size = [], 0
+                    last_flush = time.monotonic()
+            if buffer and (stopping or time.monotonic() - last_flush >= self.flush_interval):
+                self.write_chunk(buffer)
+                buffer, size = [], 0
+                last_flush = time.monotonic()
+            if stopping:
+                return
+
+    def write_chunk(self, frames):
+        """
+        schreibt einen block und seinen index eintrag
+
+        :param frames: list of (timestamp, bytes)
+        :return: None
+        """
+        raw = b"".join(FRAME_HEADER.pack(timestamp, len(frame)) + frame for timestamp, frame in frames)
+        data = compress(self.codec, raw)
+        first_ts = min(timestamp for timestamp, _ in frames)
+        last_ts = max(timestamp for timestamp, _ in frames)
+        offset = self.file.tell()
+        self.file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, self.codec, len(data), len(raw), len(frames), first_ts,
+                                          last_ts) + data)
+        self.file.flush()
+        # der index erst nach dem block, ein index eintrag zeigt damit immer auf einen vollständigen block
+        self.index.write(INDEX_ENTRY.pack(first_ts, last_ts, offset, len(frames)))
+        self.index.flush()
+        self.recorded += len(frames)
+        self.frames.increment(len(frames))
+
+    def start(self):
+        threading.Thread.start(self)
+        atexit.register(self.stop)
+
+    def stop(self, timeout=10):
+        """
+        schreibt die restlichen frames und schließt die datei
+
+        :param timeout: float
+        :return: None
+        """
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        if self.is_alive():
+            self.join(timeout)
+        self.file.close()
+        self.index.close()
+
+
+class FrameReader:
+    """
+    Liest eine Aufzeichnung des FrameRecorder. Über den Index (erster/letzter Zeitstempel je Block)
+    wird direkt zum Block eines Zeitpunkts gesprungen, entpackt werden nur die gelesenen Blöcke.
+    """
+
+    def __init__(self, path):
+        """
+
+        :param path: string
+        """
+        self.path = path
+        self.chunks = self.load_index()
+        # die empfangszeiten steigen, der letzte zeitstempel je block reicht für die suche
+        self.last_timestamps = [chunk[1] for chunk in self.chunks]
+
+    def load_index(self):
+        """
+        index datei, fehlt sie oder passt sie nicht zur datei werden die blockköpfe gelesen
+
+        :return: list of (first_ts, last_ts, offset, frames)
+        """
+        index_path = self.path + INDEX_SUFFIX
+        size = os.path.getsize(self.path)
+        if os.path.isfile(index_path):
+            with open(index_path, "rb") as index:
+                content = index.read()
+            count = len(content) // INDEX_ENTRY.size
+            chunks = [INDEX_ENTRY.unpack_from(content, i * INDEX_ENTRY.size) for i in range(count)]
+            # der index passt nur wenn sein letzter block genau am ende der datei aufhört, ein zu kurzer index
+            # würde sonst die blöcke danach verschweigen
+            end = self.chunk_end(chunks[-1][2]) if chunks else 0
+            if end == size:
+                return chunks
+            debug_logger.debug("index of %s ends at %s of %s bytes, scanning the chunks", self.path, end, size)
+        return scan_chunks(self.path)[0]
+
+    def chunk_end(self, offset):
+        """
+        ende des blocks an einem offset laut seinem kopf
+
+        :param offset: int
+        :return: int oder None wenn dort kein block beginnt
+        """
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            header = file.read(CHUNK_HEADER.size)
+        if len(header) < CHUNK_HEADER.size:
+            return None
+        magic, codec, compressed_size, raw_size, frames, first_ts, last_ts = CHUNK_HEADER.unpack(header)
+        if magic != CHUNK_MAGIC:
+            return None
+        return offset + CHUNK_HEADER.size + compressed_size
+
+    def __len__(self):
+        return sum(chunk[3] for chunk in self.chunks)
+
+    def read_chunk(self, file, offset):
+        """
+
+        :param file: file
+        :param offset: int
+        :return: list of (timestamp, bytes)
+        """
+        file.seek(offset)
+        magic, codec, compressed_size, raw_size, count, first_ts, last_ts = \
+            CHUNK_HEADER.unpack(file.read(CHUNK_HEADER.size))
+        raw = decompress(codec, file.read(compressed_size), raw_size)
+        frames = []
+        position = 0
+        for _ in range(count):
+            timestamp, length = FRAME_HEADER.unpack_from(raw, position)
+            position += FRAME_HEADER.size
+            frames.append((timestamp, raw[position:position + length]))
+            position += length
+        return frames
+
+    def frames(self, start=None, end=None):
+        """
+        frames in der reihenfolge des empfangs
+
+        :param start: int millisekunden, inklusive
+        :param end: int millisekunden, inklusive
+        :return: generator of (timestamp, bytes)
+        """
+        first = bisect.bisect_left(self.last_timestamps, start) if start is not None else 0
+        with open(self.path, "rb") as file:
+            for first_ts, last_ts, offset, count in self.chunks[first:]:
+                if end is not None and first_ts > end:
+                    return
+                for timestamp, frame in self.read_chunk(file, offset):
+                    if start is not None and timestamp < start:
+                        continue
+                    if end is not None and timestamp > end:
+                        return
+                    yield timestamp, frame
+
+    def messages(self, start=None, end=None):
+        """
+
+        :return: generator of (timestamp, dict)
+        """
+        for timestamp, frame in self.frames(start, end):
+            yield timestamp, json.loads(frame)
+
+    def klines(self, symbol, start=None, end=None):
+        """
+        die geschlossenen kerzen eines symbols im format der rest api, z.b. für SimulatedExchange.load
+
+        :param symbol: string
+        :return: list of klines
+        """
+        klines = []
+        for timestamp, message in self.messages(start, end):
+            data = message.get('data', message)
+            candle = data.get('k')
+            if candle is not None and candle['x'] and data.get('s', candle.get('s')) == symbol:
+                if klines and klines[-1][0] >= candle['t']:
+                    # nach einem reconnect doppelt empfangen
+                    continue
+                klines.append([candle['t'], candle['o'], candle['h'], candle['l'], candle['c'], candle['v'],
+                               candle['T'], candle['q'], candle['n'], candle['V'], candle['Q'], "0"])
+        return klines
+
+
+class FrameReplayer:
+    """
+    Spielt eine Aufzeichnung in einen handler (z.b. BinanceAPI.process_message oder ingestor.on_message),
+    in Originalgeschwindigkeit, beschleunigt oder so schnell wie möglich.
+    """
+
+    def __init__(self, reader, handler, speed=1.0):
+        """
+
+        :param reader: FrameReader
+        :param handler: callable(dict)
+        :param speed: float 1 = originalgeschwindigkeit, 0 = ohne warten
+        """
+        self.reader = reader
+        self.handler = handler
+        self.speed = speed
+
+    def run(self, start=None, end=None):
+        """
+
+        :param start: int millisekunden
+        :param end: int millisekunden
+        :return: int anzahl frames
+        """
+        count = 0
+        first_ts = None
+        started = time.monotonic()
+        for timestamp, frame in self.reader.frames(start, end):
+            if self.speed:
+                if first_ts is None:
+                    first_ts = timestamp
+                delay = (timestamp - first_ts) / 1000.0 / self.speed - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            self.handler(json.loads(frame))
+            count += 1
+        return count
+
+
+_recorders = {}
+
+
+def create_recorder():
+    """
+    recorder nach RecordFile / RecordCompression / RecordChunkSize / RecordFlushInterval aus der
+    settings.ini, gestartet und je datei nur einmal
+
+    :return: FrameRecorder oder None wenn nicht aufgezeichnet wird
+    """
+    config = Config()
+    path = config.get("RecordFile")
+    if not path:
+        return None
+    if path not in _recorders:
+        recorder = FrameRecorder(path, config.get("RecordCompression"), int(config.get("RecordChunkSize")),
+                                 float(config.get("RecordFlushInterval")))
+        recorder.start()
+        _recorders[path] = recorder
+    return _recorders[path]
@@ -0,0 +1,273 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+from binance.helpers import date_to_milliseconds, interval_to_milliseconds
+from requests.adapters import HTTPAdapter
+
+from models.config import Config
+from models.metrics import metrics
+
+debug_logger = logging.getLogger('debug.log')
+
+WEIGHT_HEADERS = ("X-MBX-USED-WEIGHT-1M", "X-MBX-USED-WEIGHT")
+
+# gewicht je endpunkt laut binance doku, alles andere zählt 1
+WEIGHTS = {
+    "exchangeInfo": 10,
+    "allOrders": 10,
+    "openOrders": 3,
+    "account": 10,
+    "myTrades": 10,
+}
+
+# Interval aus der settings.ini in sekunden -> kline interval der api
+KLINE_INTERVALS = {
+    60: Client.KLINE_INTERVAL_1MINUTE,
+    180: Client.KLINE_INTERVAL_3MINUTE,
+    300: Client.KLINE_INTERVAL_5MINUTE,
+    900: Client.KLINE_INTERVAL_15MINUTE,
+    1800: Client.KLINE_INTERVAL_30MINUTE,
+    3600: Client.KLINE_INTERVAL_1HOUR,
+    4 * 3600: Client.KLINE_INTERVAL_4HOUR,
+    24 * 3600: Client.KLINE_INTERVAL_1DAY,
+}
+
+
+def request_weight(path, params):
+    """
+    gewicht einer anfrage, bei klines und depth abhängig vom limit
+
+    :param path: string letzter teil der url, z.b. klines
+    :param params: dict
+    :return: int
+    """
+    limit = int(params.get("limit") or 500)
+    if path == "klines":
+        return 1 if limit < 100 else 2 if limit < 500 else 5 if limit <= 1000 else 10
+    if path == "depth":
+        return 1 if limit <= 100 else 5 if limit <= 500 else 10 if limit <= 1000 else 50
+    return WEIGHTS.get(path, 1)
+
+
+class WeightLimiter:
+    """
+    Token Bucket für das Gewichtslimit der Binance REST API (standard 1200 je Minute).
+    Die Tokens laufen gleichmäßig nach, die X-MBX-USED-WEIGHT Header der Antworten korrigieren den
+    Stand, da der Server auch Anfragen anderer Prozesse mit demselben Key/IP zählt.
+    Nach 429/418 wird bis zum Retry-After gar nicht mehr angefragt.
+    """
+
+    def __init__(self, limit=1200, interval=60.0, clock=time.monotonic):
+        """
+
+        :param limit: int gewicht je intervall
+        :param interval: float sekunden
+        :param clock: callable
+        """
+        self.limit = limit
+        self.interval = interval
+        self.clock = clock
+        self.tokens = float(limit)
+        self.updated = clock()
+        self.blocked_until = 0.0
+        self.used_weight = 0
+        self.condition = threading.Condition()
+
+    def refill(self, now):
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.limit / self.interval)
+        self.updated = now
+
+    def reserve(self, weight=1):
+        """
+        zieht das gewicht ab wenn es frei ist, sonst wird nichts abgezogen
+
+        :param weight: int
+        :return: float 0 wenn reserviert, sonst sekunden bis zum nächsten versuch
+        """
+        with self.condition:
+            now = self.clock()
+            self.refill(now)
+            wait = self.blocked_until - now
+            if wait > 0:
+                return wait
+            if self.tokens >= min(weight, self.limit):
+                self.tokens -= weight
+                return 0.0
+            return (min(weight, self.limit) - self.tokens) * self.interval / self.limit
+
+    def acquire(self, weight=1):
+        """
+        wartet bis genug gewicht frei ist und zieht es ab
+
+        :param weight: int
+        :return: float gewartete sekunden
+        """
+        waited = 0.0
+        with self.condition:
+            while True:
+                wait = self.reserve(weight)
+                if not wait:
+                    return waited
+                self.condition.wait(wait)
+                waited += wait
+
+    def update(self, used_weight):
+        """
+        übernimmt das vom server gemeldete verbrauchte gewicht
+
+        :param used_weight: int
+        :return: None
+        """
+        with self.condition:
+            self.refill(self.clock())
+            self.used_weight = used_weight
+            self.tokens = min(self.tokens, self.limit - used_weight)
+
+    def block(self, seconds):
+        """
+        keine anfragen mehr für `seconds` sekunden (429/418)
+
+        :param seconds: float
+        :return: None
+        """
+        with self.condition:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+            self.tokens = min(self.tokens, 0.0)
+            self.condition.notify_all()
+
+
+class GatewayClient(Client):
+    """
+    binance Client mit einem Pool dauerhafter Verbindungen, Gewichtslimit über WeightLimiter,
+    Wiederholung nach 429/418 und parallelem Laden langer Historien.
+    Kann von mehreren Threads gleichzeitig benutzt werden.
+    """
+
+    def __init__(self, api_key=None, api_secret=None, requests_params=None, api_url=None, pool_size=10,
+                 limiter=None, max_retries=5, workers=4):
+        """
+
+        :param api_url: string z.b. http://127.0.0.1:8080/api für einen lokalen ersatz der api
+        :param pool_size: int verbindungen im pool
+        :param limiter: WeightLimiter
+        :param max_retries: int wiederholungen nach 429/418
+        :param workers: int parallele anfragen beim laden der historie
+        """
+        self.pool_size = pool_size
+        self.limiter = limiter if limiter is not None else WeightLimiter()
+        self.max_retries = max_retries
+        self.workers = workers
+        self.local = threading.local()
+        self.throttled = metrics.counter("rest_throttled_total")
+        metrics.gauge("rest_used_weight", lambda: self.limiter.used_weight)
+        if api_url is not None:
+            self.API_URL = api_url
+        Client.__init__(self, api_key, api_secret, requests_params)
+
+    @classmethod
+    def from_config(cls, config=None):
+        """
+
+        :param config: Config
+        :return: GatewayClient
+        """
+        config = config if config is not None else Config()
+        return cls(config.get("Binance_api_key"), config.get("Binance_api_secret"),
+                   pool_size=int(config.get("RestPoolSize")),
+                   limiter=WeightLimiter(int(config.get("RestWeightLimit"))),
+                   max_retries=int(config.get("RestMaxRetries")), workers=int(config.get("RestWorkers")))
+
+    @property
+    def response(self):
+        # Client merkt sich die letzte antwort am objekt, je thread getrennt damit parallele anfragen gehen
+        return getattr(self.local, "response", None)
+
+    @response.setter
+    def response(self, response):
+        self.local.response = response
+
+    def _init_session(self):
+        session = Client._init_session(self)
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+        path = uri.rsplit("/", 1)[-1]
+        weight = request_weight(path, kwargs.get("data") or {})
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(weight)
+            # Client verändert data (signatur, sortierung), deshalb bei jedem versuch eine kopie
+            attempt_kwargs = dict(kwargs)
+            if isinstance(kwargs.get("data"), dict):
+                attempt_kwargs["data"] = dict(kwargs["data"])
+            try:
+                result = Client._request(self, method, uri, signed, force_params, **attempt_kwargs)
+                self.update_weight(self.response)
+                return result
+            except BinanceAPIException as error:
+                self.update_weight(error.response)
+                if error.status_code not in (429, 418) or attempt == self.max_retries:
+                    raise
+                retry_after = float(error.response.headers.get("Retry-After") or 2 ** attempt)
+                self.throttled.increment()
+                debug_logger.debug("rate limited (%s) on %s, retry in %ss", error.status_code, path, retry_after)
+                self.limiter.block(retry_after)
+
+    def update_weight(self, response):
+        """
+
+        :param response: requests.Response
+        :return: None
+        """
+        if response is None:
+            return
+        for header in WEIGHT_HEADERS:
+            if header in response.headers:
+                self.limiter.update(int(response.headers[header]))
+                return
+
+    def get_historical_klines_generator(self, symbol, interval, start_str, end_str=None):
+        """
+        wie Client.get_historical_klines_generator, die seiten werden aber parallel mit `workers` threads
+        geladen (innerhalb des gewichtslimits) und in der richtigen reihenfolge geliefert
+
+        :param symbol: string
+        :param interval: string
+        :param start_str: string oder timestamp in millisekunden
+        :param end_str: string oder timestamp in millisekunden, standard jetzt
+        :return: generator of klines
+        """
+        limit = 1000
+        timeframe = interval_to_milliseconds(interval)
+        start_ts = start_str if type(start_str) == int else date_to_milliseconds(start_str)
+        start_ts = max(start_ts, self._get_earliest_valid_timestamp(symbol, interval))
+        if end_str:
+            end_ts = end_str if type(end_str) == int else date_to_milliseconds(end_str)
+        else:
+            end_ts = int(time.time() * 1000)
+
+        def fetch(page_start):
+            return self.get_klines(symbol=symbol, interval=interval, limit=limit, startTime=page_start,
+                                   endTime=min(page_start + limit * timeframe - 1, end_ts))
+
+        pages = iter(range(start_ts, end_ts + 1, limit * timeframe))
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # nur ein paar seiten im voraus laden, damit der speicher bei langen historien begrenzt bleibt
+            pending = deque()
+            for page_start in pages:
+                pending.append(executor.submit(fetch, page_start))
+                if len(pending) >= self.workers * 2:
+                    break
+            while pending:
+                for kline in pending.popleft().result():
+                    yield kline
+                page_start = next(pages, None)
+                if page_start is not None:
+                    pending.append(executor.submit(fetch, page_start))
@@ -0,0 +1,516 @@
+import logging
+import time
+
+import numpy
+from binance.client import Client
+from binance.exceptions import BinanceAPIException, BinanceOrderException
+
+from models.candle_buffer import FIELDS
+
+debug_logger = logging.getLogger('debug.log')
+
+# quote assets in der reihenfolge in der sie vom ende des symbols abgetrennt werden
+QUOTE_ASSETS = ("USDT", "BUSD", "USDC", "EUR", "BTC", "ETH", "BNB")
+
+
+def split_symbol(symbol):
+    """
+    z.b. ETHEUR -> ETH, EUR
+
+    :param symbol: string
+    :return: tuple base asset, quote asset
+    """
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    raise ValueError("unknown quote asset in {0}".format(symbol))
+
+
+class SimulatedOrderError(BinanceAPIException):
+    """
+    fehler wie von der binance api (z.b. order unbekannt), ohne http antwort
+    """
+
+    def __init__(self, code, message):
+        Exception.__init__(self, message)
+        self.code = code
+        self.message = message
+        self.status_code = 400
+        self.response = None
+        self.request = None
+
+    def __str__(self):
+        return "APIError(code={0}): {1}".format(self.code, self.message)
+
+
+class SimulatedMail:
+    """
+    merkt sich die mails statt sie zu verschicken
+    """
+
+    def __init__(self):
+        self.mails = []
+
+    def send_mail(self, subject, message):
+        self.mails.append((subject, message))
+
+
+class SimulatedExchange(Client):
+    """
+    Lokale Börse mit der Schnittstelle von binance.client.Client (get_klines, create_order, get_order,
+    cancel_order, ...) und dem Teil des BinanceSocketManager den BinanceAPI braucht (user data stream).
+    Gehandelt wird gegen aufgezeichnete Kerzen oder Trades: eine Limit Order wird ausgeführt sobald der
+    Markt ihren Preis erreicht, je Kerze (oder Trade) höchstens fill_ratio des gehandelten Volumens,
+    größere Orders werden dadurch teilweise ausgeführt. Die Gebühr geht wie bei Binance vom
+    erhaltenen Asset ab. Execution Reports werden gesammelt und erst mit dispatch() zugestellt, also nach der
+    Antwort auf create_order. Bei Binance kommt der Report einer sofort ausgeführten Order oft vor der
+    REST Antwort, mit reports_first werden die Reports deshalb schon in create_order zugestellt.
+    """
+
+    # filter aller symbole für get_exchange_info, wie bei den großen EUR paaren
+    FILTERS = [
+        {"filterType": "PRICE_FILTER", "minPrice": "0.01000000", "maxPrice": "1000000.00000000",
+         "tickSize": "0.01000000"},
+        {"filterType": "LOT_SIZE", "minQty": "0.00001000", "maxQty": "9000.00000000", "stepSize": "0.00001000"},
+        {"filterType": "MIN_NOTIONAL", "minNotional": "5.00000000", "applyToMarket": True, "avgPriceMins": 5},
+    ]
+
+    def __init__(self, fee=0.001, fill_ratio=1.0, balances=None, reports_first=False):
+        """
+
+        :param fee: float gebühr je ausführung, 0.001 = 0.1%
+        :param fill_ratio: float anteil des volumens einer kerze oder eines trades der ausgeführt werden kann
+        :param balances: dict asset -> menge, None = unbegrenzt (kein prüfen des guthabens)
+        :param reports_first: bool execution reports einer neuen order vor der antwort auf create_order zustellen
+        """
+        self.fee = fee
+        self.reports_first = reports_first
+        self.fill_ratio = fill_ratio
+        self.balances = dict(balances) if balances is not None else None
+        # symbol -> spalten der aufgezeichneten kerzen (wie KlineStore.read) und index der nächsten kerze
+        self.klines = {}
+        self.cursor = {}
+        self.prices = {}
+        self.time = 0
+        self.order_id = 0
+        self.orders = {}
+        # symbol -> offene orders in der reihenfolge des eingangs
+        self.open_orders = {}
+        # symbol -> [position im base asset, zahlungsstrom im quote asset]
+        self.accounts = {}
+        self.fees_paid = {}
+        self.fills = 0
+        self.partial_fills = 0
+        self.events = []
+        self.listeners = {}
+
+    def load(self, symbol, columns, start=0):
+        """
+        aufgezeichnete kerzen eines symbols, die ersten `start` kerzen gelten als schon geschlossen
+        (z.b. für das warm up über get_klines)
+
+        :param symbol: string
+        :param columns: dict of numpy.ndarray wie von KlineStore.read oder parse_klines
+        :param start: int
+        :return: None
+        """
+        self.klines[symbol] = {field: numpy.asarray(columns[field], dtype=numpy.float64) for field in FIELDS}
+        self.cursor[symbol] = start
+        self.open_orders.setdefault(symbol, [])
+        self.accounts.setdefault(symbol, [0.0, 0.0])
+        if start:
+            self.prices[symbol] = float(self.klines[symbol]["close"][start - 1])
+            self.time = int(self.klines[symbol]["close_time"][start - 1]) * 1000 + 999
+
+    def remaining(self, symbol):
+        return len(self.klines[symbol]["close"]) - self.cursor[symbol]
+
+    def kline(self, symbol, index):
+        """
+        kerze im format der rest api
+
+        :param symbol: string
+        :param index: int
+        :return: list
+        """
+        columns = self.klines[symbol]
+        row = [columns[field][index] for field in FIELDS]
+        return [int(row[0]) * 1000, row[1], row[2], row[3], row[4], row[5], int(row[6]) * 1000 + 999, row[7],
+                int(row[8]), row[9], row[10], "0"]
+
+    def get_klines(self, **params):
+        """
+        geschlossene kerzen bis zum aktuellen stand der wiedergabe
+
+        :return: list of klines
+        """
+        symbol = params["symbol"]
+        limit = int(params.get("limit") or 500)
+        open_time = self.klines[symbol]["open_time"][:self.cursor[symbol]]
+        last = len(open_time)
+        if params.get("endTime") is not None:
+            last = int(numpy.searchsorted(open_time, params["endTime"] / 1000.0, side='right'))
+        if params.get("startTime") is not None:
+            first = int(numpy.searchsorted(open_time, params["startTime"] / 1000.0, side='left'))
+            last = min(first + limit, last)
+        else:
+            # ohne startTime die letzten `limit` kerzen bis endTime
+            first = max(last - limit, 0)
+        return [self.kline(symbol, index) for index in range(first, last)]
+
+    def get_avg_price(self, **params):
+        return {"mins": 5, "price": str(self.prices[params["symbol"]])}
+
+    def get_exchange_info(self):
+        return {"timezone": "UTC", "serverTime": self.time, "symbols": [
+            {"symbol": symbol, "status": "TRADING", "baseAsset": split_symbol(symbol)[0],
+             "quoteAsset": split_symbol(symbol)[1], "filters": self.FILTERS} for symbol in self.klines]}
+
+    def get_symbol_ticker(self, **params):
+        return {"symbol": params["symbol"], "price": str(self.prices[params["symbol"]])}
+
+    def get_asset_balance(self, asset, **params):
+        free = self.balances.get(asset, 0.0) if self.balances is not None else 0.0
+        return {"asset": asset, "free": str(free), "locked": "0.0"}
+
+    def create_order(self, **params):
+        """
+        nimmt eine market oder limit order an. market orders und limit orders die den letzten preis
+        kreuzen werden sofort zum letzten preis ausgeführt
+
+        :return: dict wie die antwort der binance api
+        """
+        symbol = params["symbol"]
+        if symbol not in self.klines:
+            raise BinanceOrderException(-1121, "Invalid symbol.")
+        side = params["side"]
+        order_type = params["type"]
+        quantity = float(params["quantity"])
+        price = float(params.get("price") or 0.0) if order_type != self.ORDER_TYPE_MARKET else 0.0
+        if quantity <= 0 or (order_type == self.ORDER_TYPE_LIMIT and price <= 0):
+            raise BinanceOrderException(-1013, "Invalid quantity or price.")
+        self.check_balance(symbol, side, quantity, price or self.prices[symbol])
+
+        self.order_id += 1
+        order = {
+            "symbol": symbol,
+            "orderId": self.order_id,
+            "clientOrderId": params.get("newClientOrderId", "simulated{0}".format(self.order_id)),
+            "transactTime": self.time,
+            "price": "{0:.8f}".format(price),
+            "origQty": "{0:.8f}".format(quantity),
+            "executedQty": "0.00000000",
+            "cummulativeQuoteQty": "0.00000000",
+            "status": self.ORDER_STATUS_NEW,
+            "timeInForce": params.get("timeInForce", self.TIME_IN_FORCE_GTC),
+            "type": order_type,
+            "side": side,
+            "fills": [],
+        }
+        self.orders[self.order_id] = order
+        self.report(order, 0.0, 0.0, 0.0, "")
+
+        last_price = self.prices[symbol]
+        if order_type == self.ORDER_TYPE_MARKET or self.crosses(order, last_price, last_price):
+            # als taker zum letzten preis, das volumen der letzten kerze begrenzt hier nicht
+            self.fill(order, quantity, last_price)
+        else:
+            self.open_orders[symbol].append(order)
+        if self.reports_first:
+            self.dispatch()
+        return dict(order, fills=list(order["fills"]))
+
+    def check_balance(self, symbol, side, quantity, price):
+        if self.balances is None:
+            return
+        base, quote = split_symbol(symbol)
+        if (side == self.SIDE_BUY and self.balances.get(quote, 0.0) < quantity * price) or \
+                (side == self.SIDE_SELL and self.balances.get(base, 0.0) < quantity):
+            debug_logger.debug("simulated %s order of %s %s rejected, balances %s", side, quantity, symbol,
+                               self.balances)
+            raise BinanceOrderException(-2010, "Account has insufficient balance for requested action.")
+
+    def get_order(self, **params):
+        order = self.orders.get(int(params["orderId"]))
+        if order is None or order["symbol"] != params["symbol"]:
+            raise SimulatedOrderError(-2013, "Order does not exist.")
+        return dict(order, fills=list(order["fills"]))
+
+    def get_open_orders(self, **params):
+        symbols = [params["symbol"]] if params.get("symbol") else list(self.open_orders)
+        return [dict(order) for symbol in symbols for order in self.open_orders[symbol]]
+
+    def cancel_order(self, **params):
+        order = self.orders.get(int(params["orderId"]))
+        if order is None or order not in self.open_orders.get(params["symbol"], []):
+            raise SimulatedOrderError(-2011, "Unknown order sent.")
+        self.open_orders[order["symbol"]].remove(order)
+        order["status"] = self.ORDER_STATUS_CANCELED
+        self.report(order, 0.0, 0.0, 0.0, "")
+        return dict(order)
+
+    def crosses(self, order, low, high):
+        """
+        erreicht der markt den limit preis
+
+        :param order: dict
+        :param low: float
+        :param high: float
+        :return: bool
+        """
+        price = float(order["price"])
+        return low <= price if order["side"] == self.SIDE_BUY else high >= price
+
+    def match(self, symbol, low, high, volume):
+        """
+        führt offene limit orders gegen eine kerze oder einen trade aus, zum limit preis
+
+        :param symbol: string
+        :param low: float
+        :param high: float
+        :param volume: float gehandelte menge im base asset
+        :return: None
+        """
+        available = volume * self.fill_ratio
+        for order in list(self.open_orders[symbol]):
+            if available <= 0:
+                break
+            if not self.crosses(order, low, high):
+                continue
+            quantity = min(float(order["origQty"]) - float(order["executedQty"]), available)
+            available -= quantity
+            self.fill(order, quantity, float(order["price"]))
+
+    def fill(self, order, quantity, price):
+        """
+        (teil)ausführung einer order: guthaben, gebühr, status und execution report
+
+        :param order: dict
+        :param quantity: float
+        :param price: float
+        :return: None
+        """
+        symbol = order["symbol"]
+        base, quote = split_symbol(symbol)
+        quote_quantity = quantity * price
+        account = self.accounts[symbol]
+        if order["side"] == self.SIDE_BUY:
+            commission, commission_asset = quantity * self.fee, base
+            account[0] += quantity - commission
+            account[1] -= quote_quantity
+            self.transfer(quote, -quote_quantity)
+            self.transfer(base, quantity - commission)
+        else:
+            commission, commission_asset = quote_quantity * self.fee, quote
+            account[0] -= quantity
+            account[1] += quote_quantity - commission
+            self.transfer(base, -quantity)
+            self.transfer(quote, quote_quantity - commission)
+        self.fees_paid[commission_asset] = self.fees_paid.get(commission_asset, 0.0) + commission
+
+        executed = float(order["executedQty"]) + quantity
+        order["executedQty"] = "{0:.8f}".format(executed)
+        order["cummulativeQuoteQty"] = "{0:.8f}".format(float(order["cummulativeQuoteQty"]) + quote_quantity)
+        order["fills"].append({"price": "{0:.8f}".format(price), "qty": "{0:.8f}".format(quantity),
+                               "commission": "{0:.8f}".format(commission), "commissionAsset": commission_asset})
+        self.fills += 1
+        if executed < float(order["origQty"]) - 1e-12:
+            order["status"] = self.ORDER_STATUS_PARTIALLY_FILLED
+            self.partial_fills += 1
+        else:
+            order["status"] = self.ORDER_STATUS_FILLED
+            if order in self.open_orders[symbol]:
+                self.open_orders[symbol].remove(order)
+        self.report(order, quantity, price, commission, commission_asset)
+
+    def transfer(self, asset, amount):
+        if self.balances is not None:
+            self.balances[asset] = self.balances.get(asset, 0.0) + amount
+
+    def report(self, order, last_quantity, last_price, commission, commission_asset):
+        """
+        execution report wie im user data stream, zugestellt wird mit dispatch()
+
+        :return: None
+        """
+        self.events.append({
+            "e": "executionReport", "E": self.time, "s": order["symbol"], "c": order["clientOrderId"],
+            "S": order["side"], "o": order["type"], "f": order["timeInForce"], "q": order["origQty"],
+            "p": order["price"], "x": "TRADE" if last_quantity else order["status"], "X": order["status"],
+            "i": order["orderId"], "l": "{0:.8f}".format(last_quantity), "z": order["executedQty"],
+            "L": "{0:.8f}".format(last_price), "n": "{0:.8f}".format(commission), "N": commission_asset or None,
+            "T": self.time, "Z": order["cummulativeQuoteQty"],
+        })
+
+    def advance(self, symbol):
+        """
+        spielt die nächste kerze ab: offene orders werden gegen sie ausgeführt, danach ist sie geschlossen
+
+        :param symbol: string
+        :return: dict kline nachricht wie vom websocket
+        """
+        index = self.cursor[symbol]
+        columns = self.klines[symbol]
+        close = float(columns["close"][index])
+        self.time = int(columns["close_time"][index]) * 1000 + 999
+        if self.open_orders[symbol]:
+            self.match(symbol, float(columns["low"][index]), float(columns["high"][index]),
+                       float(columns["volume"][index]))
+        self.prices[symbol] = close
+        self.cursor[symbol] = index + 1
+        open_ms = int(columns["open_time"][index]) * 1000
+        return {"e": "kline", "E": self.time + 1, "s": symbol, "k": {
+            "t": open_ms, "T": self.time, "s": symbol, "o": columns["open"][index], "c": close,
+            "h": columns["high"][index], "l": columns["low"][index], "v": columns["volume"][index],
+            "n": int(columns["trades"][index]), "x": True, "q": columns["quote_assetv"][index],
+            "V": columns["taker_b_asset_v"][index], "Q": columns["taker_b_quote_v"][index]}}
+
+    def trade(self, symbol, price, quantity, trade_time):
+        """
+        ein aufgezeichneter trade, offene orders werden gegen ihn ausgeführt
+
+        :param symbol: string
+        :param price: float
+        :param quantity: float
+        :param trade_time: int millisekunden
+        :return: None
+        """
+        self.time = trade_time
+        if self.open_orders[symbol]:
+            self.match(symbol, price, price, quantity)
+        self.prices[symbol] = price
+
+    def start_user_socket(self, callback):
+        """
+        wie BinanceSocketManager.start_user_socket
+
+        :param callback: callable(msg)
+        :return: string key für stop_socket
+        """
+        key = "simulated{0}".format(len(self.listeners) + 1)
+        self.listeners[key] = callback
+        return key
+
+    def stop_socket(self, key):
+        self.listeners.pop(key, None)
+
+    def dispatch(self):
+        """
+        stellt die gesammelten execution reports zu
+
+        :return: int anzahl nachrichten
+        """
+        count = 0
+        while self.events:
+            events, self.events = self.events, []
+            for event in events:
+                for callback in list(self.listeners.values()):
+                    callback(event)
+            count += len(events)
+        return count
+
+    def equity(self, symbol):
+        """
+        gewinn/verlust des symbols im quote asset, offene position zum letzten preis
+
+        :param symbol: string
+        :return: float
+        """
+        position, cash = self.accounts[symbol]
+        return cash + position * self.prices.get(symbol, 0.0)
+
+
+class Replay:
+    """
+    Spielt aufgezeichnete Kerzen durch den echten Live Code (process_message, buy, sell,
+    check_last_order_status, process_order_update) gegen eine SimulatedExchange, ohne Websocket
+    und ohne Queue, so schnell wie die Strategie rechnen kann.
+    """
+
+    def __init__(self, bot, exchange, user_stream=True):
+        """
+
+        :param bot: BinanceAPI mit der SimulatedExchange als client
+        :param exchange: SimulatedExchange
+        :param user_stream: bool order updates über execution reports, sonst nur über get_order
+        """
+        self.bot = bot
+        self.exchange = exchange
+        if user_stream:
+            bot.user_connection_key = exchange.start_user_socket(bot.process_message)
+        self.candles = 0
+        self.messages = 0
+        self.elapsed = 0.0
+
+    @classmethod
+    def create(cls, symbol, columns, state_directory, warmup=None, fee=0.001, fill_ratio=1.0, balances=None,
+               user_stream=True):
+        """
+        exchange und bot für eine wiedergabe, der bot lädt die ersten `warmup` kerzen über get_klines
+
+        :param symbol: string
+        :param columns: dict of numpy.ndarray
+        :param state_directory: string zustandsdateien des bots, nicht die des live bots benutzen
+        :param warmup: int standard HistorySize
+        :return: Replay
+        """
+        from models.binance_api import BinanceAPI
+
+        exchange = SimulatedExchange(fee=fee, fill_ratio=fill_ratio, balances=balances)
+        bot = BinanceAPI(symbol=symbol, client=exchange, socket_manager=exchange, mail=SimulatedMail(),
+                         state_directory=state_directory)
+        warmup = bot.history_size if warmup is None else warmup
+        exchange.load(symbol, columns, start=min(warmup, len(columns["close"])))
+        bot.warm_up(snapshot=False)
+        return cls(bot, exchange, user_stream)
+
+    def run(self, count=None, speed=0):
+        """
+
+        :param count: int anzahl kerzen, standard alle übrigen
+        :param speed: float 1 = im abstand der aufgezeichneten kerzen, 60 = 60 mal schneller, 0 = ohne warten
+        :return: Replay
+        """
+        symbol = self.bot.symbol
+        count = self.exchange.remaining(symbol) if count is None else min(count, self.exchange.remaining(symbol))
+        start = time.perf_counter()
+        first_close = None
+        for _ in range(count):
+            message = self.exchange.advance(symbol)
+            if speed:
+                first_close = message["k"]["T"] if first_close is None else first_close
+                delay = (message["k"]["T"] - first_close) / 1000.0 / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            self.messages += self.exchange.dispatch()
+            self.bot.process_message(message)
+            self.messages += self.exchange.dispatch() + 1
+        self.candles += count
+        self.elapsed += time.perf_counter() - start
+        return self
+
+    def speedup(self):
+        """
+        wie viel schneller als in echtzeit
+
+        :return: float
+        """
+        # dauer einer kerze aus den aufgezeichneten daten, sie muss nicht zum Interval der settings.ini passen
+        open_time = self.exchange.klines[self.bot.symbol]["open_time"]
+        interval = open_time[1] - open_time[0] if len(open_time) > 1 else 0
+        return self.candles * interval / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        """
+
+        :return: string
+        """
+        exchange = self.exchange
+        orders = [order for order in exchange.orders.values() if order["symbol"] == self.bot.symbol]
+        filled = sum(1 for order in orders if order["status"] == exchange.ORDER_STATUS_FILLED)
+        return ("{0} candles in {1:.2f}s ({2:.0f} candles/s, {3:.0f}x real time), orders {4} filled {5} "
+                "fills {6} partial {7}, fees {8}, pnl {9:.4f}, in position {10}").format(
+            self.candles, self.elapsed, self.candles / self.elapsed if self.elapsed else 0.0, self.speedup(),
+            len(orders), filled, exchange.fills, exchange.partial_fills,
+            {asset: round(amount, 8) for asset, amount in exchange.fees_paid.items()},
+            exchange.equity(self.bot.symbol), self.bot.get_in_position())
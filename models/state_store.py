@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+debug_logger = logging.getLogger('debug.log')
+
+
+class StateStore:
+    """
+    Hält den Handelszustand (Position, letzter Kaufpreis, letzte Order) im Speicher.
+    Änderungen werden sofort atomar auf die Platte geschrieben (temp Datei + fsync + rename),
+    gelesen wird nur beim Start.
+    """
+
+    FILES = {
+        "in_position": "position.txt",
+        "last_bought": "last_bought.txt",
+        "last_order_id": "last_order_id.txt",
+    }
+
+    DEFAULTS = {
+        "in_position": False,
+        "last_bought": 0.0,
+        "last_order_id": "",
+    }
+
+    TEMP_SUFFIX = ".tmp"
+
+    def __init__(self, directory="."):
+        """
+
+        :param directory: string verzeichnis der zustandsdateien
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.values = dict(self.DEFAULTS)
+        self.load()
+
+    def path(self, key):
+        """
+
+        :param key: string
+        :return: string
+        """
+        return os.path.join(self.directory, self.FILES[key])
+
+    def load(self):
+        """
+        lädt den zustand von der platte. übrig gebliebene temp dateien stammen von einem
+        abgebrochenen schreibvorgang und werden verworfen, die eigentliche datei ist dann noch unverändert.
+
+        :return: None
+        """
+        for key in self.FILES:
+            path = self.path(key)
+            if os.path.isfile(path + self.TEMP_SUFFIX):
+                debug_logger.debug("discarding incomplete state file %s", path + self.TEMP_SUFFIX)
+                os.remove(path + self.TEMP_SUFFIX)
+
+            content = ""
+            if os.path.isfile(path):
+                with open(path, "r") as file:
+                    content = file.read().strip()
+
+            try:
+                self.values[key] = self.parse(key, content)
+            except ValueError:
+                debug_logger.debug("invalid state in %s: %r, using default", path, content)
+                self.values[key] = self.DEFAULTS[key]
+
+    def parse(self, key, content):
+        """
+
+        :param key: string
+        :param content: string
+        :return: mixed
+        """
+        if content == "":
+            return self.DEFAULTS[key]
+        if key == "in_position":
+            return bool(int(content))
+        if key == "last_bought":
+            return float(content)
+        return content
+
+    def serialize(self, key, value):
+        """
+
+        :param key: string
+        :param value: mixed
+        :return: string
+        """
+        if key == "in_position":
+            return str(int(value))
+        if key == "last_bought":
+            return str(float(value))
+        return str(value)
+
+    def get(self, key):
+        """
+
+        :param key: string
+        :return: mixed
+        """
+        return self.values[key]
+
+    def set(self, key, value):
+        """
+        setzt einen wert, auf die platte geschrieben wird nur bei einer änderung
+
+        :param key: string
+        :param value: mixed
+        :return: None
+        """
+        value = self.parse(key, self.serialize(key, value))
+        if self.values[key] == value:
+            return
+        self.values[key] = value
+        self.write(self.path(key), self.serialize(key, value))
+
+    def write(self, path, content):
+        """
+        schreibt eine datei atomar, ein abbruch hinterlässt entweder den alten oder den neuen inhalt
+
+        :param path: string
+        :param content: string oder bytes
+        :return: None
+        """
+        temp_path = path + self.TEMP_SUFFIX
+        with open(temp_path, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+
+        # das rename selbst dauerhaft machen
+        if hasattr(os, "O_DIRECTORY"):
+            directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+
+
+class AsyncStateStore(StateStore):
+    """
+    StateStore für den asyncio Betrieb: das Schreiben (fsync) läuft über run_in_executor in einem eigenen
+    Thread, der Event Loop wartet nicht auf die Platte. Ein einzelner Thread hält die Reihenfolge ein.
+    """
+
+    def __init__(self, directory="."):
+        """
+
+        :param directory: string verzeichnis der zustandsdateien
+        """
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        StateStore.__init__(self, directory)
+
+    def write(self, path, content):
+        """
+        im event loop ohne zu warten, außerhalb (warm up, beenden) nach den noch ausstehenden dateien
+
+        :param path: string
+        :param content: string oder bytes
+        :return: None
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.executor.submit(StateStore.write, self, path, content).result()
+            return
+        loop.run_in_executor(self.executor, StateStore.write, self, path, content).add_done_callback(self.written)
+
+    def written(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            debug_logger.debug("state write failed: %s", future.exception())
+
+    def close(self):
+        """
+        wartet bis alle dateien geschrieben sind
+
+        :return: None
+        """
+        self.executor.shutdown(wait=True)
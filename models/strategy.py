@@ -0,0 +1,134 @@
+from models import pipeline
+
+
+class Strategy:
+    """
+    Definition der Handelsstrategie (MACD, Bollinger Bänder, Stochastik RSI).
+    Wird vom Live Bot (process_message, einzelne Kerze) und vom Backtest (ganze Arrays)
+    gemeinsam benutzt, die Bedingungen funktionieren mit Skalaren und mit numpy Arrays.
+    """
+
+    def __init__(self, window=500, short_ema=9, long_ema=18, signal_ema=5, bbands_period=18, nbdev=2,
+                 rsi_period=14, fastk_period=5, fastd_period=3, stoch_buy=90, stoch_sell=20, sell_margin=5,
+                 latch_band_crossings=False):
+        """
+
+        :param window: int anzahl kerzen für max/min/durchschnitt
+        :param stoch_buy: float fastk und fastd darüber zählen für einen kauf
+        :param stoch_sell: float fastk und fastd darunter zählen für einen verkauf
+        :param sell_margin: float um so viel muss der close über dem letzten kaufpreis liegen
+        :param latch_band_crossings: bool ein bandbruch gilt bis das andere band gebrochen wird
+        """
+        self.window = window
+        self.short_ema = short_ema
+        self.long_ema = long_ema
+        self.signal_ema = signal_ema
+        self.bbands_period = bbands_period
+        self.nbdev = nbdev
+        self.rsi_period = rsi_period
+        self.fastk_period = fastk_period
+        self.fastd_period = fastd_period
+        self.stoch_buy = stoch_buy
+        self.stoch_sell = stoch_sell
+        self.sell_margin = sell_margin
+        self.latch_band_crossings = latch_band_crossings
+
+    def pipeline(self):
+        """
+        indikatoren der strategie als graph, die gleiche definition für live bot und backtest.
+        die kauf- und verkaufsbedingungen bleiben in scores, damit schwellwerte ohne neue indikatoren
+        geändert werden können (optimizer)
+
+        :return: Pipeline
+        """
+        close = pipeline.Source("close")
+        macd = pipeline.EMA(close, self.short_ema) - pipeline.EMA(close, self.long_ema)
+        bbands = pipeline.BollingerBands(close, self.bbands_period, self.nbdev)
+        stoch_rsi = pipeline.StochRSI(close, self.rsi_period, self.fastk_period, self.fastd_period)
+        upperband_crossed = close > bbands.upper
+        lowerband_crossed = close < bbands.lower
+        if self.latch_band_crossings:
+            latch = pipeline.Latch(upperband_crossed, lowerband_crossed)
+            upperband_crossed, lowerband_crossed = latch.upper, latch.lower
+        return pipeline.Pipeline({
+            "close": close,
+            "macd": macd,
+            "signal": pipeline.EMA(macd, self.signal_ema),
+            "fastk": stoch_rsi.fastk,
+            "fastd": stoch_rsi.fastd,
+            "upperband": bbands.upper,
+            "middleband": bbands.middle,
+            "lowerband": bbands.lower,
+            "upperband_crossed": upperband_crossed,
+            "lowerband_crossed": lowerband_crossed,
+            "max_price": pipeline.Rolling(close, self.window, "max"),
+            "lowest_price": pipeline.Rolling(close, self.window, "min"),
+            "average_price": pipeline.Rolling(close, self.window, "mean"),
+        })
+
+    def indicator_engine(self):
+        """
+        erstellt die fortlaufende indikatorberechnung für den live bot
+
+        :return: StreamingPipeline
+        """
+        return self.pipeline().stream()
+
+    def indicators(self, closes, cache=None):
+        """
+        berechnet alle indikatoren für eine ganze historie, gleiche schlüssel wie indicator_engine().update
+
+        :param closes: numpy.ndarray
+        :param cache: dict optional, indikatoren mit gleichen parametern werden daraus wiederverwendet
+        :return: dict of numpy.ndarray
+        """
+        return self.pipeline().batch(cache, close=closes)
+
+    def scores(self, indicators):
+        """
+        zählt die kauf- und verkaufssignale
+
+        :param indicators: dict (skalare oder arrays)
+        :return: tuple should_buy, should_sell
+        """
+        macd = indicators["macd"]
+        signal = indicators["signal"]
+        fastk = indicators["fastk"]
+        fastd = indicators["fastd"]
+        should_buy = (macd > signal) * 1 + indicators["lowerband_crossed"] * 1 \
+            + ((fastd > self.stoch_buy) & (fastk > self.stoch_buy)) * 1
+        should_sell = (macd < signal) * 1 + indicators["upperband_crossed"] * 1 \
+            + ((fastd <= self.stoch_sell) & (fastk <= self.stoch_sell)) * 1
+        return should_buy, should_sell
+
+    def buy_signal(self, indicators, should_buy):
+        """
+        alle kaufsignale und der preis liegt im unteren preisbereich
+
+        :param indicators: dict
+        :param should_buy: int oder numpy.ndarray
+        :return: bool oder numpy.ndarray
+        """
+        close = indicators["close"]
+        return (should_buy == 3) & (indicators["lowest_price"] < close) & (close < indicators["average_price"])
+
+    def sell_signal(self, indicators, should_sell):
+        """
+        alle verkaufssignale und der preis liegt im oberen preisbereich
+
+        :param indicators: dict
+        :param should_sell: int oder numpy.ndarray
+        :return: bool oder numpy.ndarray
+        """
+        close = indicators["close"]
+        return (should_sell == 3) & (indicators["max_price"] > close) & (close > indicators["average_price"])
+
+    def sell_allowed(self, last_bought, close):
+        """
+        verkauft wird erst wenn der close genug über dem letzten kaufpreis liegt
+
+        :param last_bought: float
+        :param close: float
+        :return: bool
+        """
+        return last_bought + self.sell_margin < close
@@ -0,0 +1,192 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy
+
+from models.backtest_engine import BacktestEngine
+from models.kline_store import KlineStore
+from models.optimizer import METRICS
+from models.strategy import Strategy
+
+
+def walk_forward_windows(count, train_size, test_size, step=None):
+    """
+    rollierende trainings- und testfenster über `count` kerzen
+
+    :param count: int
+    :param train_size: int kerzen zum trainieren (0 = ohne training)
+    :param test_size: int kerzen zum testen
+    :param step: int abstand der fenster, standard test_size
+    :return: list of tuple (train_start, test_start, test_end)
+    """
+    step = step or test_size
+    windows = []
+    test_start = train_size
+    while test_start + test_size <= count:
+        windows.append((test_start - train_size, test_start, test_start + test_size))
+        test_start += step
+    return windows
+
+
+def evaluate(strategy, closes, warmup, quantity, fee, cache=None):
+    """
+    backtest über closes, die ersten `warmup` kerzen dienen nur zum einschwingen der indikatoren
+
+    :return: BacktestResult
+    """
+    indicators = strategy.indicators(closes, cache)
+    indicators = {key: values[warmup:] for key, values in indicators.items()}
+    return BacktestEngine(strategy, quantity=quantity, fee=fee).run(indicators["close"], indicators=indicators)
+
+
+def _run_window(task):
+    """
+    ein fenster eines symbols im worker prozess, die kerzen werden per memory map nur für
+    dieses fenster gelesen
+
+    :param task: dict
+    :return: dict
+    """
+    store = KlineStore(task["directory"], None)
+    columns = store.columns(task["symbol"], task["interval"])
+    train_start, test_start, test_end = task["window"]
+    warmup = task["warmup"]
+    base_parameters = task["base_parameters"]
+
+    best = {}
+    train_score = None
+    if task["combinations"] and test_start > train_start:
+        first = max(train_start - warmup, 0)
+        closes = numpy.array(columns["close"][first:test_start])
+        cache = {}
+        results = []
+        for parameters in task["combinations"]:
+            strategy = Strategy(**dict(base_parameters, **parameters))
+            result = evaluate(strategy, closes, train_start - first, task["quantity"], task["fee"], cache)
+            results.append((getattr(result, task["metric"]), parameters))
+        results.sort(key=lambda item: item[0], reverse=METRICS[task["metric"]])
+        train_score, best = results[0]
+
+    first = max(test_start - warmup, 0)
+    closes = numpy.array(columns["close"][first:test_end])
+    result = evaluate(Strategy(**dict(base_parameters, **best)), closes, test_start - first, task["quantity"],
+                      task["fee"])
+    return {
+        "symbol": task["symbol"],
+        "window": task["index"],
+        "test_from": int(columns["open_time"][test_start]),
+        "test_to": int(columns["open_time"][test_end - 1]),
+        "parameters": best,
+        "train_score": train_score,
+        "pnl": result.pnl,
+        "trades": result.trades,
+        "win_rate": result.win_rate,
+        "max_drawdown": result.max_drawdown,
+        "sharpe": result.sharpe,
+    }
+
+
+class WalkForward:
+    """
+    Walk Forward Auswertung über die Historie im KlineStore: je Fenster werden die besten Parameter
+    auf dem Trainingsteil gesucht und auf dem folgenden Testteil geprüft. Fenster und Symbole laufen
+    parallel in mehreren Prozessen, jeder Prozess liest nur die Kerzen seines Fensters von der Platte.
+    """
+
+    def __init__(self, directory, interval, train_size, test_size, step=None, combinations=None, metric="pnl",
+                 quantity=1.0, fee=0.0, workers=None, **base_parameters):
+        """
+
+        :param directory: string verzeichnis des KlineStore
+        :param interval: string
+        :param train_size: int kerzen je trainingsfenster (0 = feste parameter, nur testen)
+        :param test_size: int kerzen je testfenster
+        :param step: int abstand der fenster
+        :param combinations: list of dict kandidaten für das training, None = feste parameter
+        :param metric: string aus METRICS
+        :param base_parameters: feste parameter der strategie
+        """
+        self.directory = directory
+        self.interval = interval
+        self.train_size = train_size
+        self.test_size = test_size
+        self.step = step
+        self.combinations = combinations or []
+        self.metric = metric
+        self.quantity = quantity
+        self.fee = fee
+        self.workers = workers
+        self.base_parameters = base_parameters
+        strategy = Strategy(**base_parameters)
+        # genug kerzen damit alle indikatoren eingeschwungen sind
+        self.warmup = max(strategy.window, 100)
+        self.elapsed = 0.0
+
+    def tasks(self, symbols, start=None):
+        """
+        ein auftrag je symbol und fenster, die kerzen selbst werden erst im worker gelesen
+
+        :param symbols: list of string
+        :param start: int open time in sekunden ab der die fenster beginnen, kerzen davor dienen nur zum einschwingen
+        :return: list of dict
+        """
+        store = KlineStore(self.directory, None)
+        tasks = []
+        for symbol in symbols:
+            open_time = store.columns(symbol, self.interval)["open_time"]
+            offset = int(numpy.searchsorted(open_time, start)) if start is not None else 0
+            windows = walk_forward_windows(len(open_time) - offset, self.train_size, self.test_size, self.step)
+            for index, window in enumerate(windows):
+                window = tuple(position + offset for position in window)
+                tasks.append({
+                    "directory": self.directory,
+                    "symbol": symbol,
+                    "interval": self.interval,
+                    "index": index,
+                    "window": window,
+                    "warmup": self.warmup,
+                    "combinations": self.combinations,
+                    "metric": self.metric,
+                    "quantity": self.quantity,
+                    "fee": self.fee,
+                    "base_parameters": self.base_parameters,
+                })
+        return tasks
+
+    def run(self, symbols, start=None):
+        """
+
+        :param symbols: list of string
+        :param start: int open time in sekunden
+        :return: list of dict ergebnis je symbol und fenster
+        """
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(_run_window, self.tasks(symbols, start)))
+        self.elapsed = time.perf_counter() - started
+        return results
+
+    def report(self, results):
+        """
+        fasst die ergebnisse je symbol und gesamt zusammen
+
+        :param results: list of dict
+        :return: string
+        """
+        lines = []
+        for result in results:
+            lines.append("{symbol} #{window} {test_from}-{test_to} pnl {pnl:.2f} trades {trades} "
+                         "drawdown {max_drawdown:.2f} {parameters}".format(**result))
+
+        symbols = sorted(set(result["symbol"] for result in results))
+        for symbol in symbols + [None]:
+            selected = [result for result in results if symbol is None or result["symbol"] == symbol]
+            if not selected:
+                continue
+            pnl = numpy.array([result["pnl"] for result in selected])
+            lines.append("{0}: windows {1} pnl {2:.2f} (mean {3:.2f}, positive {4:.0%}) trades {5} "
+                         "max drawdown {6:.2f}".format(symbol or "TOTAL", len(selected), pnl.sum(), pnl.mean(),
+                                                       numpy.mean(pnl > 0), sum(r["trades"] for r in selected),
+                                                       max(r["max_drawdown"] for r in selected)))
+        lines.append("time {0:.1f}s".format(self.elapsed))
+        return "\n".join(lines)
@@ -0,0 +1,28 @@
+import argparse
+
+from models.backtester import Backtester
+from models.optimizer import DEFAULT_SPACE, METRICS, Optimizer, parameter_grid, random_parameters
+
+parser = argparse.ArgumentParser(description="Parametersuche der Strategie auf der Binance Historie")
+parser.add_argument("--start", default="1 month ago UTC", help="Startzeitpunkt der Historie")
+parser.add_argument("--random", type=int, default=0, help="Anzahl zufälliger Kombinationen statt des ganzen Rasters")
+parser.add_argument("--metric", default="pnl", choices=sorted(METRICS))
+parser.add_argument("--workers", type=int, default=None)
+parser.add_argument("--fee", type=float, default=0.001)
+parser.add_argument("--top", type=int, default=20)
+args = parser.parse_args()
+
+if __name__ == '__main__':
+    backtester = Backtester()
+    closes = backtester.load_history(args.start)["close"]
+    if args.random:
+        combinations = random_parameters(DEFAULT_SPACE, args.random)
+    else:
+        combinations = parameter_grid(DEFAULT_SPACE)
+
+    optimizer = Optimizer(closes, quantity=float(backtester.config.get("Quantity", backtester.symbol)),
+                          fee=args.fee, workers=args.workers, window=backtester.history_size)
+    results = optimizer.run(combinations, args.metric)
+    print("{0} combinations over {1} bars in {2:.1f}s".format(len(results), len(closes), optimizer.elapsed))
+    for result in results[:args.top]:
+        print(result)
@@ -0,0 +1,44 @@
+import argparse
+import logging
+import tempfile
+
+from models.backtester import Backtester
+from models.kline_parser import parse_klines
+from models.logger import setup_logging
+from models.recorder import FrameReader
+from models.simulated_exchange import Replay, split_symbol
+
+parser = argparse.ArgumentParser(description="Paper Trading: die Historie durch den Live Code gegen eine simulierte Börse")
+parser.add_argument("--start", default="1 month ago UTC", help="Startzeitpunkt der Historie")
+parser.add_argument("--symbol", default=None, help="standard Symbol aus der settings.ini")
+parser.add_argument("--fee", type=float, default=0.001)
+parser.add_argument("--fill-ratio", type=float, default=1.0, help="Anteil des Kerzenvolumens der ausgeführt wird")
+parser.add_argument("--balance", type=float, default=None, help="Startguthaben im Quote Asset, standard unbegrenzt")
+parser.add_argument("--no-user-stream", action="store_true", help="Orders nur über get_order abgleichen")
+parser.add_argument("--compare", action="store_true", help="Zusätzlich den vektorisierten Backtest ausgeben")
+parser.add_argument("--log", action="store_true", help="Debug Log jeder Kerze schreiben")
+parser.add_argument("--frames", default=None, help="Kerzen aus einer Aufzeichnung (RecordFile) statt der Historie")
+parser.add_argument("--speed", type=float, default=0, help="1 = Originalgeschwindigkeit, 0 = ohne Warten")
+args = parser.parse_args()
+
+if __name__ == '__main__':
+    debug_logger = setup_logging('debug.log')
+    if not args.log:
+        debug_logger.setLevel(logging.INFO)
+    backtester = Backtester(args.symbol)
+    if args.frames:
+        history = parse_klines(FrameReader(args.frames).klines(backtester.symbol))
+    else:
+        history = backtester.load_history(args.start)
+    balances = None
+    if args.balance is not None:
+        balances = {split_symbol(backtester.symbol)[1]: args.balance}
+
+    # eigene zustandsdateien, die des live bots bleiben unberührt
+    with tempfile.TemporaryDirectory() as state_directory:
+        replay = Replay.create(backtester.symbol, history, state_directory, fee=args.fee,
+                               fill_ratio=args.fill_ratio, balances=balances, user_stream=not args.no_user_stream)
+        print(replay.run(speed=args.speed).summary())
+
+    if args.compare and not args.frames:
+        backtester.backtest(args.start, plot=False)
@@ -0,0 +1,40 @@
+import numpy
+
+from models.kline_parser import parse_klines
+
+START_MS = 1600000000000
+
+
+def create_klines(count, start_ms=START_MS, interval_ms=60000, seed=1):
+    """
+    klines im format der rest api, zufälliger verlauf
+
+    :param count: int
+    :return: list of list
+    """
+    closes = 100 + numpy.cumsum(numpy.random.default_rng(seed).normal(0, 0.1, count))
+    return [[start_ms + i * interval_ms, "%.8f" % close, "%.8f" % (close + 0.5), "%.8f" % (close - 0.5),
+             "%.8f" % close, "10.00000000", start_ms + (i + 1) * interval_ms - 1, "1000.00000000", 42,
+             "5.00000000", "500.00000000", "0"] for i, close in enumerate(closes)]
+
+
+def create_columns(count):
+    """
+    schwingender kurs in der größenordnung von ETHEUR wie im replay benchmark, die strategie kauft und
+    verkauft damit regelmäßig (mit erzwungenen signalen, siehe force_signals)
+
+    :param count: int kerzen
+    :return: dict of numpy.ndarray
+    """
+    columns = parse_klines(create_klines(count))
+    columns["close"] = 20 * columns["close"] + 100 * numpy.sin(numpy.arange(count) / 40.0)
+    columns["open"] = numpy.concatenate(([columns["close"][0]], columns["close"][:-1]))
+    columns["high"] = numpy.maximum(columns["open"], columns["close"]) + 6
+    columns["low"] = numpy.minimum(columns["open"], columns["close"]) - 6
+    return columns
+
+
+def force_signals(strategy):
+    strategy.stoch_buy = -1
+    strategy.stoch_sell = 101
+    strategy.sell_margin = 0
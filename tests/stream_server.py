@@ -0,0 +1,93 @@
+import asyncio
+import json
+import threading
+
+from aiohttp import web
+
+
+class LocalStreamServer(threading.Thread):
+    """
+    Lokaler Ersatz für stream.binance.com (aiohttp) in einem eigenen Thread, für Last- und Fehlertests
+    mit dem echten Websocket Client (BinanceSocketManager oder AsyncRuntime).
+    Kombinierte Streams unter /stream?streams=a/b, einzelne unter /ws/<stream>. Jede Verbindung bekommt die
+    Frames die `frames` für ihre Streams liefert und bleibt danach offen, bis der Client sie schließt.
+    """
+
+    def __init__(self, frames, host="127.0.0.1"):
+        """
+
+        :param frames: callable(streams, connection) -> iterable of dict oder string, connection zählt ab 1
+        :param host: string
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.frames = frames
+        self.host = host
+        self.port = None
+        self.loop = None
+        self.runner = None
+        self.ready = threading.Event()
+        self.connections = 0
+        self.sent = 0
+
+    @property
+    def url(self):
+        """
+        basis url im format von BinanceSocketManager.STREAM_URL bzw. AsyncRuntime stream_url
+
+        :return: string
+        """
+        return "ws://{0}:{1}/".format(self.host, self.port)
+
+    async def stream(self, request):
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        self.connections += 1
+        if "path" in request.match_info:
+            streams = [request.match_info["path"]]
+        else:
+            streams = request.query.get("streams", "").split("/")
+        for frame in self.frames(streams, self.connections):
+            await socket.send_str(frame if isinstance(frame, str) else json.dumps(frame))
+            self.sent += 1
+        # offen halten bis der client schließt
+        async for _ in socket:
+            pass
+        return socket
+
+    async def serve(self):
+        app = web.Application()
+        app.router.add_get("/stream", self.stream)
+        app.router.add_get("/ws/{path}", self.stream)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.serve())
+        self.ready.set()
+        self.loop.run_forever()
+
+    def start(self):
+        """
+        startet den server und wartet bis der port feststeht
+
+        :return: None
+        """
+        threading.Thread.start(self)
+        self.ready.wait()
+
+    def stop(self, timeout=5):
+        """
+
+        :param timeout: float
+        :return: None
+        """
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join(timeout)
@@ -0,0 +1,206 @@
+import asyncio
+import threading
+
+import numpy
+import pytest
+
+from market import create_columns, force_signals
+from models.async_runtime import AsyncRuntime
+from models.simulated_exchange import SimulatedExchange, SimulatedMail
+from models.state_store import AsyncStateStore, StateStore
+
+SYMBOL = "ETHEUR"
+
+
+class AsyncExchange:
+    """
+    SimulatedExchange mit der schnittstelle von AsyncRestClient, die rest aufrufe werden zu coroutinen
+    """
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+
+    def __getattr__(self, name):
+        value = getattr(self.exchange, name)
+        if not callable(value):
+            return value
+
+        async def call(*args, **kwargs):
+            return value(*args, **kwargs)
+        return call
+
+
+async def settle():
+    # order und abgleich laufen als eigene tasks
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def replay(exchange, state_directory, count):
+    runtime = AsyncRuntime([SYMBOL], client=AsyncExchange(exchange), stream_url="ws://unused",
+                           mail=SimulatedMail(), state_directory=str(state_directory))
+    trader = runtime.symbols[SYMBOL]
+    force_signals(trader.strategy)
+    await runtime.load_exchange_info()
+    await trader.warm_up_async(snapshot=False)
+    task = asyncio.ensure_future(trader.run_strategy())
+    await settle()
+    for _ in range(count):
+        trader.put_candle(exchange.advance(SYMBOL)["k"])
+        await settle()
+    task.cancel()
+    return trader
+
+
+def test_filled_orders_are_reconciled_without_user_stream(tmp_path):
+    exchange = SimulatedExchange()
+    exchange.load(SYMBOL, create_columns(3500), start=500)
+    trader = asyncio.run(replay(exchange, tmp_path, 3000))
+
+    orders = list(exchange.orders.values())
+    # ohne user data stream erfährt der bot nur über get_order von den fills, sonst bliebe es bei einer order
+    assert len(orders) > 2
+    assert [order["side"] for order in orders[:2]] == ["BUY", "SELL"]
+    assert all(order["status"] == exchange.ORDER_STATUS_FILLED for order in orders[:-1])
+    assert trader.get_last_order_id() in ("", str(orders[-1]["orderId"]))
+
+
+class FlakyExchange(AsyncExchange):
+    """
+    die ersten `failures` abfragen der kerzen schlagen fehl
+    """
+
+    def __init__(self, exchange, failures):
+        AsyncExchange.__init__(self, exchange)
+        self.failures = failures
+
+    async def get_klines(self, **params):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("klines unavailable")
+        return self.exchange.get_klines(**params)
+
+
+async def reconnect(exchange, state_directory, missed, failures):
+    runtime = AsyncRuntime([SYMBOL], client=AsyncExchange(exchange), stream_url="ws://unused",
+                           mail=SimulatedMail(), state_directory=str(state_directory))
+    trader = runtime.symbols[SYMBOL]
+    trader.BACKFILL_MAX_DELAY = 0
+    await runtime.load_exchange_info()
+    await trader.warm_up_async(snapshot=False)
+    task = asyncio.ensure_future(trader.run_strategy())
+    await settle()
+    for _ in range(10):
+        trader.put_candle(exchange.advance(SYMBOL)["k"])
+        await settle()
+    # verbindung weg, diese kerzen kommen nie über den websocket
+    for _ in range(missed):
+        exchange.advance(SYMBOL)
+    trader.client = FlakyExchange(exchange, failures)
+    backfill = trader.start_backfill()
+    # neue kerzen nach dem reconnect warten bis die lücke gefüllt ist
+    for _ in range(3):
+        trader.put_candle(exchange.advance(SYMBOL)["k"])
+    await backfill
+    await settle()
+    task.cancel()
+    return trader
+
+
+def test_backfill_retries_until_the_gap_is_filled(tmp_path):
+    exchange = SimulatedExchange()
+    exchange.load(SYMBOL, create_columns(600), start=500)
+    trader = asyncio.run(reconnect(exchange, tmp_path, missed=20, failures=3))
+
+    assert trader.client.failures == 0
+    open_time = trader.candles.view("open_time")
+    assert numpy.array_equal(open_time, exchange.klines[SYMBOL]["open_time"][533 - len(open_time):533])
+
+
+def test_state_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    write = StateStore.write
+
+    def record(store, path, content):
+        threads.append(threading.current_thread())
+        write(store, path, content)
+    monkeypatch.setattr(StateStore, "write", record)
+
+    async def trade():
+        store = AsyncStateStore(str(tmp_path))
+        store.set("last_order_id", "42")
+        store.set("in_position", True)
+        return store
+
+    store = asyncio.run(trade())
+    store.close()
+    assert threads and threading.main_thread() not in threads
+    assert StateStore(str(tmp_path)).values == {"in_position": True, "last_bought": 0.0, "last_order_id": "42"}
+
+
+class OrderJournal:
+    """
+    merkt sich die order zeilen statt sie zu schreiben
+    """
+
+    def __init__(self):
+        self.orders = []
+
+    def order(self, symbol, order_id, side, status, price=None, quantity=None, message=None):
+        self.orders.append((str(order_id), side, status))
+
+
+async def market_order(exchange, state_directory):
+    runtime = AsyncRuntime([SYMBOL], client=AsyncExchange(exchange), stream_url="ws://unused",
+                           mail=SimulatedMail(), state_directory=str(state_directory))
+    trader = runtime.symbols[SYMBOL]
+    trader.journal = OrderJournal()
+    trader.get_order_type = lambda: exchange.ORDER_TYPE_MARKET
+    exchange.start_user_socket(runtime.on_message)
+    await runtime.load_exchange_info()
+    await trader.warm_up_async(snapshot=False)
+    await trader.submit_order("BUY", float(exchange.prices[SYMBOL]))
+    # reports nach der antwort
+    exchange.dispatch()
+    return trader
+
+
+@pytest.mark.parametrize("reports_first", [False, True])
+def test_market_order_fill_is_applied_in_any_report_order(tmp_path, reports_first):
+    exchange = SimulatedExchange(reports_first=reports_first)
+    exchange.load(SYMBOL, create_columns(600), start=500)
+    trader = asyncio.run(market_order(exchange, tmp_path))
+
+    assert exchange.orders[1]["status"] == exchange.ORDER_STATUS_FILLED
+    assert trader.get_last_order_id() == ""
+    assert trader.get_in_position()
+    assert trader.get_last_bought() == pytest.approx(float(exchange.orders[1]["cummulativeQuoteQty"]) /
+                                                     float(exchange.orders[1]["executedQty"]))
+    assert trader.early_reports is None
+    assert trader.journal.orders == [("1", "BUY", "FILLED")]
+
+
+async def burst(exchange, state_directory, count):
+    runtime = AsyncRuntime([SYMBOL], client=AsyncExchange(exchange), stream_url="ws://unused",
+                           mail=SimulatedMail(), state_directory=str(state_directory))
+    trader = runtime.symbols[SYMBOL]
+    await runtime.load_exchange_info()
+    await trader.warm_up_async(snapshot=False)
+    task = asyncio.ensure_future(trader.run_strategy())
+    await settle()
+    # mehr kerzen auf einmal als IngestionQueueSize, ohne dem event loop abzugeben (wie beim nachladen)
+    for _ in range(count):
+        trader.put_candle(exchange.advance(SYMBOL)["k"])
+    while trader.candle_queue.qsize():
+        await asyncio.sleep(0)
+    task.cancel()
+    return trader
+
+
+def test_candle_burst_is_never_dropped(tmp_path):
+    exchange = SimulatedExchange()
+    exchange.load(SYMBOL, create_columns(2000), start=500)
+    trader = asyncio.run(burst(exchange, tmp_path, 1500))
+
+    assert trader.processed == 1500
+    assert numpy.array_equal(trader.candles.view("open_time"), exchange.klines[SYMBOL]["open_time"][-500:])
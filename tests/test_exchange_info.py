@@ -0,0 +1,141 @@
+import time
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR
+
+import pytest
+
+from market import create_columns
+from models.binance_api import BinanceAPI
+from models.exchange_info import ExchangeInfo, ExchangeInfoRefresher, OrderFilterError, SymbolFilters, to_multiple
+from models.simulated_exchange import SimulatedExchange, SimulatedMail
+
+SYMBOL = "ETHEUR"
+
+
+class CountingExchange(SimulatedExchange):
+
+    def __init__(self, filters=None):
+        SimulatedExchange.__init__(self)
+        self.info_requests = 0
+        self.order_requests = 0
+        if filters is not None:
+            self.FILTERS = filters
+
+    def get_exchange_info(self):
+        self.info_requests += 1
+        return SimulatedExchange.get_exchange_info(self)
+
+    def create_order(self, **params):
+        self.order_requests += 1
+        return SimulatedExchange.create_order(self, **params)
+
+
+def create_filters(**changes):
+    """
+    filter der SimulatedExchange, einzelne werte je filterType ersetzt
+    """
+    return [dict(item, **changes.get(item["filterType"], {})) for item in SimulatedExchange.FILTERS]
+
+
+def create_bot(tmp_path, clock, filters=None):
+    exchange = CountingExchange(filters)
+    exchange.load(SYMBOL, create_columns(600), start=500)
+    bot = BinanceAPI(symbol=SYMBOL, client=exchange, socket_manager=exchange, mail=SimulatedMail(),
+                     state_directory=str(tmp_path), exchange_info=ExchangeInfo(exchange, ttl=3600, clock=clock))
+    return exchange, bot
+
+
+def test_expired_filters_are_refreshed_in_the_background(tmp_path):
+    now = [0.0]
+    exchange, bot = create_bot(tmp_path, lambda: now[0])
+    bot.exchange_info.refresh()
+    now[0] = 7200.0
+
+    bot.buy(2000.0)
+    # die order geht mit den alten filtern raus, ohne rest anfrage
+    assert exchange.info_requests == 1
+    assert len(exchange.orders) == 1
+
+    refresher = ExchangeInfoRefresher(bot.exchange_info, interval=0.01)
+    refresher.start()
+    deadline = time.monotonic() + 5
+    while exchange.info_requests == 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    refresher.stop()
+    assert exchange.info_requests == 2
+    assert not bot.exchange_info.due()
+
+
+def test_mail_shows_the_quantized_order(tmp_path):
+    exchange, bot = create_bot(tmp_path, time.monotonic)
+    results = []
+    quantize = bot.quantize
+
+    def record(side, price, quantity):
+        results.append(quantize(side, price, quantity))
+        return results[-1]
+    bot.quantize = record
+
+    bot.buy(2000.123456)
+    # einmal quantisiert, die mail zeigt die werte der gesendeten order
+    assert len(results) == 1
+    price, quantity = results[0]
+    order = exchange.orders[1]
+    assert (float(order["price"]), float(order["origQty"])) == (float(price), float(quantity))
+    subject, message = bot.mail.mails[-1]
+    assert subject == "Tradingbot: Kaufe"
+    assert "Preis: {0}</br>Menge: {1}</br>".format(price, quantity) in message
+
+
+def test_to_multiple_rounds_in_the_given_direction():
+    assert to_multiple(Decimal("2000.123"), Decimal("0.01"), ROUND_FLOOR) == Decimal("2000.12")
+    assert to_multiple(Decimal("2000.123"), Decimal("0.01"), ROUND_CEILING) == Decimal("2000.13")
+    assert to_multiple(Decimal("2000.12"), Decimal("0.01"), ROUND_CEILING) == Decimal("2000.12")
+    assert to_multiple(Decimal("0.123456789"), Decimal("0.00001"), ROUND_FLOOR) == Decimal("0.12345")
+    # float rauschen ist kein ganzer tick: 0.1 + 0.2 bleibt 0.30, auch beim aufrunden
+    assert to_multiple(Decimal(repr(0.1 + 0.2)), Decimal("0.01"), ROUND_CEILING) == Decimal("0.30")
+    assert to_multiple(Decimal(repr(0.7 - 0.1)), Decimal("0.1"), ROUND_FLOOR) == Decimal("0.6")
+
+
+def test_normalize_rounds_buys_down_sells_up_and_quantities_down():
+    filters = SymbolFilters({"symbol": SYMBOL, "filters": SimulatedExchange.FILTERS})
+    assert filters.normalize("BUY", 2000.129, 0.040049) == ("2000.12", "0.04004")
+    assert filters.normalize("SELL", 2000.121, 0.040049) == ("2000.13", "0.04004")
+    assert filters.normalize("SELL", 0.1 + 0.2, 100.0) == ("0.30", "100.0")
+    assert filters.normalize("BUY", 100.0, 0.1 + 0.2) == ("100.0", "0.30000")
+
+
+@pytest.mark.parametrize("changes, failure", [
+    ({"PRICE_FILTER": {"minPrice": "100000.00000000"}}, "PRICE_FILTER"),
+    ({"LOT_SIZE": {"minQty": "1.00000000"}}, "LOT_SIZE"),
+    ({"MIN_NOTIONAL": {"minNotional": "1000.00000000"}}, "MIN_NOTIONAL"),
+])
+def test_filter_failures_are_rejected_before_create_order(tmp_path, changes, failure):
+    exchange, bot = create_bot(tmp_path, time.monotonic, create_filters(**changes))
+
+    assert bot.buy(2000.0) is False
+    assert exchange.order_requests == 0
+    assert exchange.orders == {}
+    assert bot.get_last_order_id() == ""
+    subject, message = bot.mail.mails[-1]
+    assert isinstance(message, OrderFilterError)
+    assert "Filter failure: {0}".format(failure) in str(message)
+
+
+def test_notional_apply_min_to_market(tmp_path):
+    notional = {"filterType": "NOTIONAL", "minNotional": "1000.00000000", "applyMinToMarket": False,
+                "maxNotional": "9000000.00000000", "applyMaxToMarket": False, "avgPriceMins": 5}
+    filters = [item for item in SimulatedExchange.FILTERS if item["filterType"] != "MIN_NOTIONAL"] + [notional]
+    symbol_filters = SymbolFilters({"symbol": SYMBOL, "filters": filters})
+    with pytest.raises(OrderFilterError, match="MIN_NOTIONAL"):
+        symbol_filters.normalize("BUY", 2000.0, 0.04)
+    assert symbol_filters.normalize("BUY", 2000.0, 0.04, market=True) == ("2000.0", "0.04")
+    applied = SymbolFilters({"symbol": SYMBOL, "filters": filters[:-1] + [dict(notional, applyMinToMarket=True)]})
+    with pytest.raises(OrderFilterError, match="MIN_NOTIONAL"):
+        applied.normalize("BUY", 2000.0, 0.04, market=True)
+
+    # market order über den bot: der minNotional gilt nicht, die order geht raus
+    exchange, bot = create_bot(tmp_path, time.monotonic, filters)
+    bot.get_order_type = lambda: exchange.ORDER_TYPE_MARKET
+    bot.buy(2000.0)
+    assert exchange.order_requests == 1
+    assert exchange.orders[1]["type"] == exchange.ORDER_TYPE_MARKET
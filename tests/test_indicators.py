@@ -0,0 +1,98 @@
+import numpy
+import pytest
+import talib
+
+from models import indicators
+from models.backtest_engine import BacktestEngine
+from models.kline_parser import parse_klines
+from models.strategy import Strategy
+
+
+def create_closes(count=1500, start_ms=1600000000000, interval_ms=60000):
+    """
+    close einer synthetischen kline reihe im format der rest api, über parse_klines wie im backtest
+
+    :param count: int
+    :return: numpy.ndarray
+    """
+    rng = numpy.random.default_rng(7)
+    closes = 100 + numpy.cumsum(rng.normal(0, 0.5, count))
+    klines = [[start_ms + i * interval_ms, "%.8f" % close, "%.8f" % (close + 0.5), "%.8f" % (close - 0.5),
+               "%.8f" % close, "10.00000000", start_ms + (i + 1) * interval_ms - 1, "1000.00000000", 42,
+               "5.00000000", "500.00000000", "0"] for i, close in enumerate(closes)]
+    return parse_klines(klines)["close"]
+
+
+def stream(state, values):
+    """
+    wert für wert durch einen streaming indikator
+
+    :return: numpy.ndarray oder tuple numpy.ndarray bei mehreren ausgängen
+    """
+    results = [state.update(float(value)) for value in values]
+    if isinstance(results[0], tuple):
+        return tuple(numpy.array(column) for column in zip(*results))
+    return numpy.array(results)
+
+
+def assert_same(streamed, batch):
+    # gleiche NaN bereiche (einschwingphase) und danach gleiche werte
+    streamed = numpy.asarray(streamed, dtype=numpy.float64)
+    batch = numpy.asarray(batch, dtype=numpy.float64)
+    numpy.testing.assert_array_equal(numpy.isnan(streamed), numpy.isnan(batch))
+    assert numpy.allclose(streamed, batch, equal_nan=True, rtol=1e-9, atol=1e-9)
+
+
+@pytest.fixture(scope="module")
+def closes():
+    return create_closes()
+
+
+@pytest.mark.parametrize("period", [5, 9, 18])
+def test_ema(closes, period):
+    assert_same(stream(indicators.EMA(period), closes), talib.EMA(closes, period))
+
+
+def test_bollinger_bands(closes):
+    streamed = stream(indicators.BollingerBands(18, 2, 2), closes)
+    batch = talib.BBANDS(closes, timeperiod=18, nbdevup=2, nbdevdn=2, matype=0)
+    for streamed_band, batch_band in zip(streamed, batch):
+        assert_same(streamed_band, batch_band)
+
+
+def test_rsi(closes):
+    assert_same(stream(indicators.RSI(14), closes), talib.RSI(closes, 14))
+
+
+def test_stoch_rsi(closes):
+    streamed = stream(indicators.StochRSI(14, 5, 3), closes)
+    batch = talib.STOCHRSI(closes, timeperiod=14, fastk_period=5, fastd_period=3, fastd_matype=0)
+    for streamed_line, batch_line in zip(streamed, batch):
+        assert_same(streamed_line, batch_line)
+
+
+@pytest.mark.parametrize("latch", [False, True])
+def test_engine_matches_backtest(closes, latch):
+    strategy = Strategy(window=500, latch_band_crossings=latch)
+    engine = strategy.indicator_engine()
+    steps = [engine.update(float(close)) for close in closes]
+    batch = strategy.indicators(closes)
+    backtest = BacktestEngine(strategy).run(closes).indicators
+    # die einschwingphase muss im test liegen
+    assert numpy.isnan(batch["fastd"][:20]).all()
+    for key in batch:
+        streamed = [step[key] for step in steps]
+        assert_same(streamed, batch[key])
+        assert_same(streamed, backtest[key])
+
+
+def test_preview_matches_update(closes):
+    """
+    intrabar: die vorläufigen indikatoren eines preises sind die, die update mit diesem close festschreibt
+    """
+    strategy = Strategy(window=500)
+    engine = strategy.indicator_engine()
+    for close in closes[:600]:
+        preview = engine.preview(float(close))
+        committed = engine.update(float(close))
+        assert_same([preview[key] for key in committed], [committed[key] for key in committed])
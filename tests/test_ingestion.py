@@ -0,0 +1,97 @@
+import time
+
+from models.ingestion import KlineIngestor
+
+
+def kline(symbol, open_ms, closed):
+    return {"stream": "{0}@kline_1m".format(symbol.lower()),
+            "data": {"e": "kline", "E": open_ms, "s": symbol,
+                     "k": {"t": open_ms, "T": open_ms + 59999, "s": symbol, "c": "100.0", "x": closed}}}
+
+
+def execution_report(order_id):
+    return {"e": "executionReport", "E": 0, "s": "ETHEUR", "i": order_id, "X": "FILLED"}
+
+
+def drain(ingestor, timeout=10):
+    ingestor.start()
+    deadline = time.monotonic() + timeout
+    while ingestor.queue.qsize() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    # die letzte nachricht ist aus der queue, aber eventuell noch im handler
+    time.sleep(0.05)
+
+
+def test_burst_keeps_closed_klines_and_order_updates():
+    handled = []
+    ingestor = KlineIngestor(handled.append, maxsize=10)
+    expected = []
+    # der worker läuft noch nicht, alles staut sich in der queue
+    for index in range(200):
+        for update in range(20):
+            ingestor.on_message(kline("ETHEUR", index * 60000, closed=False))
+        message = kline("ETHEUR", index * 60000, closed=True)
+        ingestor.on_message(message)
+        expected.append(message)
+        if index % 10 == 0:
+            report = execution_report(index)
+            ingestor.on_message(report)
+            expected.append(report)
+    drain(ingestor)
+    assert handled == expected
+    assert ingestor.dropped == 0
+    assert ingestor.coalesced == 200 * 20
+
+
+def depth_update(update_id):
+    return {"stream": "etheur@depth@100ms",
+            "data": {"e": "depthUpdate", "E": 0, "s": "ETHEUR", "U": update_id, "u": update_id, "b": [], "a": []}}
+
+
+def test_depth_burst_waits_in_its_own_buffer():
+    handled = []
+    ingestor = KlineIngestor(handled.append, maxsize=10)
+    expected = []
+    for index in range(100):
+        for update in range(50):
+            ingestor.on_message(depth_update(index * 50 + update))
+        message = kline("ETHEUR", index * 60000, closed=True)
+        ingestor.on_message(message)
+        expected.append(message)
+        report = execution_report(index)
+        ingestor.on_message(report)
+        expected.append(report)
+    # ein platzhalter für alle depth events, die kerzen und order updates stehen nicht dahinter
+    assert ingestor.queue.qsize() == 1 + len(expected)
+    drain(ingestor)
+
+    assert [msg for msg in handled if msg.get('data', msg)['e'] != 'depthUpdate'] == expected
+    # die neuesten depth events in ihrer reihenfolge, die älteren sind verworfen
+    assert [msg['data']['u'] for msg in handled[:10]] == list(range(4990, 5000))
+    assert ingestor.dropped == 5000 - 10
+
+
+def agg_trade(trade_id, trade_ms):
+    return {"stream": "etheur@aggTrade",
+            "data": {"e": "aggTrade", "E": trade_ms, "s": "ETHEUR", "a": trade_id, "p": "100.0", "q": "0.1",
+                     "T": trade_ms}}
+
+
+def test_trade_burst_keeps_closed_klines():
+    handled = []
+    ingestor = KlineIngestor(handled.append, maxsize=10)
+    expected = []
+    for index in range(100):
+        for trade in range(200):
+            ingestor.on_message(agg_trade(index * 200 + trade, index * 60000 + trade))
+        message = kline("ETHEUR", index * 60000, closed=True)
+        ingestor.on_message(message)
+        expected.append(message)
+    drain(ingestor)
+
+    assert [msg for msg in handled if msg['data']['e'] == 'kline'] == expected
+    # die trades werden zusammengefasst, ausgewertet wird nur der neueste
+    trades = [msg['data']['a'] for msg in handled if msg['data']['e'] == 'aggTrade']
+    assert trades == [100 * 200 - 1]
+    assert ingestor.coalesced == 100 * 200 - 1
+    assert ingestor.dropped == 0
@@ -0,0 +1,77 @@
+import time
+
+from market import create_columns, force_signals
+from models.journal import Journal, JournalReader
+from models.simulated_exchange import Replay
+
+SYMBOL = "ETHEUR"
+
+
+class BrokenCandle(dict):
+    """
+    kerze bei der die umwandlung mit einem unerwarteten fehler abbricht
+    """
+
+    def __getitem__(self, key):
+        raise RuntimeError("broken candle")
+
+
+def test_journal_records_candles_decisions_and_orders(tmp_path):
+    path = str(tmp_path / "journal.db")
+    replay = Replay.create(SYMBOL, create_columns(3500), str(tmp_path), warmup=500)
+    force_signals(replay.bot.strategy)
+    journal = Journal(path, flush_interval=0.05)
+    journal.start()
+    replay.bot.journal = journal
+
+    before = int(time.time() * 1000)
+    replay.run()
+    after = int(time.time() * 1000)
+    journal.stop()
+    assert journal.dropped == 0
+
+    reader = JournalReader(path)
+    try:
+        open_time = replay.exchange.klines[SYMBOL]["open_time"]
+        candles = reader.candles(SYMBOL)
+        assert [row["open_time"] for row in candles] == [int(value) * 1000 for value in open_time[500:]]
+        assert len(reader.indicators(SYMBOL)) == len(candles)
+
+        # zeitraum über die open time, beide grenzen inklusive
+        start, end = int(open_time[600]) * 1000, int(open_time[609]) * 1000
+        window = reader.candles(SYMBOL, start, end)
+        assert [row["open_time"] for row in window] == [int(value) * 1000 for value in open_time[600:610]]
+
+        decisions = reader.decisions(SYMBOL, before, after)
+        assert len(decisions) == len(candles)
+        assert reader.decisions(SYMBOL, after + 1) == []
+
+        orders = reader.orders(SYMBOL, before, after)
+        filled = {row["order_id"] for row in orders if row["status"] == replay.exchange.ORDER_STATUS_FILLED}
+        expected = {str(order_id) for order_id, order in replay.exchange.orders.items()
+                    if order["status"] == replay.exchange.ORDER_STATUS_FILLED}
+        assert expected and filled == expected
+        assert {row["side"] for row in orders} == {"BUY", "SELL"}
+        assert reader.orders("BTCEUR") == []
+    finally:
+        reader.close()
+
+
+def test_journal_thread_survives_unexpected_errors(tmp_path):
+    path = str(tmp_path / "journal.db")
+    journal = Journal(path, flush_interval=0.01)
+    journal.start()
+    journal.candle(SYMBOL, BrokenCandle(), {})
+    deadline = time.time() + 5
+    while journal.pending and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert journal.is_alive()
+
+    journal.order(SYMBOL, 1, "BUY", "FILLED", 100.0, 0.5)
+    journal.stop()
+    reader = JournalReader(path)
+    try:
+        assert [(row["order_id"], row["status"]) for row in reader.orders(SYMBOL)] == [("1", "FILLED")]
+    finally:
+        reader.close()
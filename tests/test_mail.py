@@ -0,0 +1,111 @@
+import socket
+import time
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from models.mail import Mail, MailDispatcher
+
+
+class SmtpHandler:
+    """
+    lokaler smtp server: merkt sich die mails und logins, die ersten `failures` mails werden abgelehnt
+    """
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.messages = []
+        self.logins = 0
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        self.logins += 1
+        return AuthResult(success=True)
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.failures:
+            self.failures -= 1
+            return "451 try again later"
+        self.messages.append(envelope.content.decode("utf-8", "replace"))
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_mail(port):
+    mail = Mail()
+    mail.host, mail.port = "127.0.0.1", port
+    mail.user, mail.password = "bot", "secret"
+    mail.sender_address, mail.receiver_address = "bot@example.com", "me@example.com"
+    mail.is_enabled = lambda: True
+    return mail
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_dispatcher_batches_retries_and_keeps_the_connection():
+    handler = SmtpHandler(failures=1)
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port, authenticator=handler.authenticate,
+                            auth_require_tls=False)
+    controller.start()
+    dispatcher = MailDispatcher(create_mail(port), digest_delay=0.2, max_retries=3, backoff=0.01)
+    dispatcher.start()
+    try:
+        for number in range(3):
+            dispatcher.send_mail("order {0}".format(number), "filled {0}".format(number))
+        # die erste sammelmail wird abgelehnt, der neue versuch öffnet eine neue verbindung
+        assert wait_for(lambda: len(handler.messages) == 1)
+        assert "Subject: Tradingbot: 3 Nachrichten" in handler.messages[0]
+        assert handler.logins == 2
+
+        # spätere mails gehen über die bestehende verbindung
+        dispatcher.send_mail("order 3", "filled 3")
+        assert wait_for(lambda: len(handler.messages) == 2)
+        assert "Subject: order 3" in handler.messages[1]
+        assert handler.logins == 2
+    finally:
+        dispatcher.stop()
+        controller.stop()
+    assert not dispatcher.is_alive()
+
+
+class BrokenMail:
+    """
+    der erste versand scheitert mit einem unerwarteten fehler
+    """
+
+    def __init__(self):
+        self.delivered = []
+        self.closed = 0
+
+    def is_enabled(self):
+        return True
+
+    def deliver(self, subject, message):
+        if not self.delivered and not self.closed:
+            raise UnicodeEncodeError("ascii", subject, 0, 1, "broken")
+        self.delivered.append(subject)
+
+    def close(self):
+        self.closed += 1
+
+
+def test_dispatcher_survives_unexpected_errors():
+    mail = BrokenMail()
+    dispatcher = MailDispatcher(mail, digest_delay=0, backoff=0)
+    dispatcher.start()
+    dispatcher.send_mail("lost", "message")
+    assert wait_for(lambda: mail.closed == 1)
+    dispatcher.send_mail("second", "message")
+    assert wait_for(lambda: mail.delivered == ["second"])
+    assert dispatcher.is_alive()
+    dispatcher.stop()
@@ -0,0 +1,87 @@
+import time
+
+from binance.client import Client
+from binance.websockets import BinanceSocketManager
+from twisted.internet import reactor
+
+from models.multi_stream import MultiStreamBot
+from models.simulated_exchange import SimulatedMail
+from stream_server import LocalStreamServer
+
+FIRST_OPEN = 1700000000000
+
+
+class FakeClient(Client):
+    """
+    client ohne netzwerk, die historie zum aufwärmen endet vor FIRST_OPEN
+    """
+
+    def __init__(self):
+        pass
+
+    def get_klines(self, **params):
+        start = FIRST_OPEN - 500 * 60000
+        return [[start + i * 60000, "100.0", "100.5", "99.5", "100.0", "10.0", start + (i + 1) * 60000 - 1,
+                 "1000.0", 42, "5.0", "500.0", "0"] for i in range(500)]
+
+
+def kline_message(symbol, open_ms, close):
+    return {"e": "kline", "E": open_ms + 60000, "s": symbol,
+            "k": {"t": open_ms, "T": open_ms + 59999, "s": symbol, "i": "1m", "o": str(close), "c": str(close),
+                  "h": str(close + 0.5), "l": str(close - 0.5), "v": "10.0", "n": 42, "x": True, "q": "1000.0",
+                  "V": "5.0", "Q": "500.0"}}
+
+
+def test_combined_websocket_routes_every_candle_to_its_symbol(tmp_path):
+    """
+    geschlossene kerzen von 20 symbolen abwechselnd über einen lokalen kombinierten websocket, empfangen vom
+    echten BinanceSocketManager: jedes symbol bekommt genau seine kerzen, in der reihenfolge des streams
+    """
+    names = ["SYM{0}EUR".format(i) for i in range(20)]
+    rows = 50
+
+    def frames(streams, connection):
+        for row in range(rows):
+            for column, stream in enumerate(streams):
+                yield {"stream": stream, "data": kline_message(names[column], FIRST_OPEN + row * 60000,
+                                                               100 + row + column)}
+
+    client = FakeClient()
+    socket_manager = BinanceSocketManager(client)
+    bot = MultiStreamBot(names, client=client, socket_manager=socket_manager, mail=SimulatedMail(),
+                         state_directory=str(tmp_path))
+    received = {name: [] for name in names}
+    for trader in bot.traders.values():
+        trader.warm_up(snapshot=False)
+        process = trader.process_message
+
+        def record(msg, process=process, messages=received[trader.symbol]):
+            messages.append(msg)
+            process(msg)
+
+        trader.process_message = record
+
+    server = LocalStreamServer(frames)
+    server.start()
+    socket_manager.STREAM_URL = server.url
+    try:
+        bot.connection_key = socket_manager.start_multiplex_socket(bot.streams(), bot.ingestor.on_message)
+        bot.ingestor.start()
+        socket_manager.start()
+        deadline = time.monotonic() + 30
+        while bot.ingestor.processed < rows * len(names) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        socket_manager.close()
+        reactor.callFromThread(reactor.stop)
+        socket_manager.join(5)
+        server.stop()
+
+    assert server.connections == 1
+    for column, name in enumerate(names):
+        messages = received[name]
+        assert [msg["s"] for msg in messages] == [name] * rows
+        assert [msg["k"]["t"] for msg in messages] == [FIRST_OPEN + row * 60000 for row in range(rows)]
+        trader = bot.symbols[name]
+        assert trader.candles.last("close") == 100 + rows - 1 + column
+        assert trader.candles.last("open_time") == (FIRST_OPEN + (rows - 1) * 60000) // 1000
@@ -0,0 +1,203 @@
+import numpy
+import pytest
+
+from models.order_book import OrderBook
+
+
+def depth_event(update_id):
+    return {"e": "depthUpdate", "U": update_id, "u": update_id, "b": [["100.0", "1.0"]], "a": [["101.0", "1.0"]]}
+
+
+def snapshot(last_update_id):
+    return {"lastUpdateId": last_update_id, "bids": [["99.0", "2.0"]], "asks": [["102.0", "2.0"]]}
+
+
+def replay_depth(book, now, count, latest_snapshot):
+    """
+    ein depth event alle 100ms, jeder angeforderte snapshot kommt sofort
+
+    :return: list of float zeitpunkte der snapshots
+    """
+    requests = []
+    for index in range(count):
+        now[0] = index / 10.0
+        book.update(depth_event(1000 + index))
+        if book.needs_snapshot():
+            book.request_snapshot()
+            requests.append(now[0])
+            book.apply_snapshot(snapshot(latest_snapshot(index)))
+    return requests
+
+
+def test_stale_snapshots_back_off():
+    now = [0.0]
+    book = OrderBook("ETHEUR", clock=lambda: now[0])
+    # der snapshot hängt immer hinter den events, ohne wartezeit wäre das ein snapshot je event
+    requests = replay_depth(book, now, 1000, lambda index: 10)
+    assert requests == [0.0, 1.0, 3.0, 7.0, 15.0, 31.0, 63.0]
+    assert not book.synced
+
+
+def test_snapshot_syncs_after_back_off():
+    now = [0.0]
+    book = OrderBook("ETHEUR", clock=lambda: now[0])
+    # erst ab 5s ist der snapshot aktuell genug
+    requests = replay_depth(book, now, 100, lambda index: 10 if index < 50 else 1000 + index - 20)
+    assert requests == [0.0, 1.0, 3.0, 7.0]
+    assert book.synced
+    assert book.last_update_id == 1099
+    assert book.retry_delay == 0.0
+
+
+def test_failed_snapshot_backs_off():
+    now = [0.0]
+    book = OrderBook("ETHEUR", clock=lambda: now[0])
+    book.update(depth_event(1000))
+    book.request_snapshot()
+    book.snapshot_failed()
+    assert not book.needs_snapshot()
+    now[0] = 1.0
+    assert book.needs_snapshot()
+
+
+def create_event(first, last, bids=(), asks=()):
+    return {"e": "depthUpdate", "U": first, "u": last, "b": [list(level) for level in bids],
+            "a": [list(level) for level in asks]}
+
+
+def test_events_up_to_the_snapshot_are_dropped():
+    book = OrderBook("ETHEUR")
+    for update_id in range(1000, 1011):
+        # jedes event setzt die menge auf 100.0 auf seine id, 1003 legt eine stufe an die der snapshot nicht kennt
+        bids = [("100.0", str(update_id))] + ([("98.0", "5.0")] if update_id == 1003 else [])
+        assert not book.update(create_event(update_id, update_id, bids))
+    assert book.best_bid() is None
+
+    assert book.apply_snapshot(snapshot(1005))
+    assert book.last_update_id == 1010
+    assert book.quantity_at("BUY", 100.0) == 1010.0
+    assert book.quantity_at("BUY", 98.0) == 0.0
+    assert book.quantity_at("BUY", 99.0) == 2.0
+
+    # verspätete events aus der zeit vor dem buch ändern nichts
+    assert not book.update(create_event(1009, 1010, [("100.0", "1.0")]))
+    assert book.quantity_at("BUY", 100.0) == 1010.0
+
+
+def test_first_event_must_cover_the_snapshot():
+    book = OrderBook("ETHEUR")
+    # das erste event beginnt vor lastUpdateId + 1 und endet danach
+    book.update(create_event(1003, 1008, [("100.0", "3.0")]))
+    book.update(create_event(1009, 1012, [("100.5", "1.0")]))
+    assert book.apply_snapshot(snapshot(1005))
+    assert book.last_update_id == 1012
+    assert book.best_bid() == 100.5
+
+    book = OrderBook("ETHEUR")
+    # 1006 fehlt, der snapshot ist zu alt für das erste gepufferte event
+    book.update(create_event(1007, 1008, [("100.0", "3.0")]))
+    assert not book.apply_snapshot(snapshot(1005))
+    assert not book.synced
+    assert book.best_bid() is None
+    assert book.buffer == [create_event(1007, 1008, [("100.0", "3.0")])]
+
+
+def test_gap_invalidates_the_book_and_requests_a_snapshot():
+    book = OrderBook("ETHEUR")
+    book.update(create_event(1001, 1001))
+    assert book.apply_snapshot(snapshot(1000))
+    assert book.update(create_event(1002, 1004, [("99.5", "1.0")]))
+    resyncs = book.resyncs.value
+
+    # 1005 ist verloren
+    gap = create_event(1006, 1007, [("99.6", "1.0")])
+    assert not book.update(gap)
+    assert not book.synced
+    assert book.best_bid() is None and book.best_ask() is None and book.spread() is None
+    assert len(book.bids) == len(book.asks) == 0
+    assert book.resyncs.value == resyncs + 1
+    assert book.buffer == [gap]
+    assert book.needs_snapshot()
+
+    book.request_snapshot()
+    assert not book.needs_snapshot()
+    assert book.apply_snapshot(snapshot(1006))
+    assert book.last_update_id == 1007
+    assert book.best_bid() == 99.6
+
+
+def test_zero_quantity_removes_the_level():
+    book = OrderBook("ETHEUR")
+    book.update(depth_event(1001))
+    book.apply_snapshot({"lastUpdateId": 1000, "bids": [["99.0", "2.0"], ["98.0", "0.00000000"]],
+                         "asks": [["102.0", "2.0"], ["103.0", "1.0"]]})
+    assert book.bids.levels(10) == [(100.0, 1.0), (99.0, 2.0)]
+
+    book.update(create_event(1002, 1002, [("100.0", "0.00000000"), ("97.0", "0.00000000")],
+                             [("101.0", "0.00000000"), ("102.0", "0.00000000")]))
+    assert book.bids.levels(10) == [(99.0, 2.0)]
+    assert book.asks.levels(10) == [(103.0, 1.0)]
+    assert book.best_bid() == 99.0
+    assert book.best_ask() == 103.0
+    assert book.quantity_at("SELL", 102.0) == 0.0
+
+
+def test_book_matches_a_dict_reference():
+    rng = numpy.random.default_rng(3)
+    reference = {"b": {}, "a": {}}
+    for level in range(200):
+        reference["b"]["{0:.2f}".format(99.99 - level * 0.01)] = "{0:.3f}".format(rng.uniform(0.1, 10))
+        reference["a"]["{0:.2f}".format(100.01 + level * 0.01)] = "{0:.3f}".format(rng.uniform(0.1, 10))
+    state = {"update_id": 1000}
+
+    def current_snapshot():
+        return {"lastUpdateId": state["update_id"], "bids": [list(level) for level in reference["b"].items()],
+                "asks": [list(level) for level in reference["a"].items()]}
+
+    def random_event():
+        changes = {"b": [], "a": []}
+        for _ in range(int(rng.integers(1, 10))):
+            side = "b" if rng.random() < 0.5 else "a"
+            offset = int(rng.integers(0, 60))
+            price = "{0:.2f}".format(99.99 - offset * 0.01 if side == "b" else 100.01 + offset * 0.01)
+            quantity = "0.000" if rng.random() < 0.3 else "{0:.3f}".format(rng.uniform(0.1, 10))
+            changes[side].append((price, quantity))
+            if quantity == "0.000":
+                reference[side].pop(price, None)
+            else:
+                reference[side][price] = quantity
+        first = state["update_id"] + 1
+        state["update_id"] += int(rng.integers(1, 4))
+        return create_event(first, state["update_id"], changes["b"], changes["a"])
+
+    book = OrderBook("ETHEUR")
+    resyncs = book.resyncs.value
+    early = [random_event() for _ in range(5)]
+    initial = current_snapshot()
+    early += [random_event() for _ in range(5)]
+    for event in early:
+        book.update(event)
+    assert book.apply_snapshot(initial)
+
+    for index in range(2000):
+        event = random_event()
+        if index == 1000:
+            # verlorene nachricht, der nächste snapshot zeigt den stand danach
+            continue
+        book.update(event)
+        if book.needs_snapshot():
+            book.request_snapshot()
+            book.apply_snapshot(current_snapshot())
+    assert book.synced
+    assert book.resyncs.value == resyncs + 1
+
+    bids = {float(price): float(quantity) for price, quantity in reference["b"].items()}
+    asks = {float(price): float(quantity) for price, quantity in reference["a"].items()}
+    assert book.best_bid() == max(bids)
+    assert book.best_ask() == min(asks)
+    assert book.bids.levels(len(bids)) == sorted(bids.items(), reverse=True)
+    assert book.asks.levels(len(asks)) == sorted(asks.items())
+    for price in (99.0, 99.5, 99.9, 99.99, 100.0, 100.01, 100.3, 101.0):
+        assert book.depth("BUY", price) == pytest.approx(sum(q for p, q in bids.items() if p >= price))
+        assert book.depth("SELL", price) == pytest.approx(sum(q for p, q in asks.items() if p <= price))
+        assert book.quantity_at("BUY", price) == bids.get(price, 0.0)
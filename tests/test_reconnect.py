@@ -0,0 +1,188 @@
+import asyncio
+import json
+
+import numpy
+from aiohttp import web
+
+from market import create_columns, create_klines, force_signals
+from models.async_runtime import AsyncRestClient, AsyncRuntime
+from models.binance_api import BinanceAPI
+from models.candle_buffer import KLINE_KEYS
+from models.simulated_exchange import Replay, SimulatedExchange, SimulatedMail
+
+SYMBOL = "ETHEUR"
+INDICATORS = ("macd", "signal", "fastk", "fastd", "upperband", "lowerband")
+
+
+class TimerRecorder:
+    """
+    ersetzt threading.Timer, merkt sich nur die wartezeiten
+    """
+    delays = []
+
+    def __init__(self, delay, function):
+        self.delays.append(delay)
+
+    def start(self):
+        pass
+
+
+def create_bot(tmp_path, count=1800, warmup=500):
+    exchange = SimulatedExchange()
+    exchange.load(SYMBOL, create_columns(count), start=warmup)
+    bot = BinanceAPI(symbol=SYMBOL, client=exchange, socket_manager=exchange, mail=SimulatedMail(),
+                     state_directory=str(tmp_path))
+    bot.warm_up(snapshot=False)
+    return exchange, bot
+
+
+def assert_undisturbed(bot, closes):
+    """
+    kerzen ohne lücken und doppelte, indikatoren wie bei einem lauf ohne unterbrechung
+    """
+    assert numpy.all(numpy.diff(bot.candles.view("open_time")) == 60)
+    expected = bot.strategy.indicator_engine()
+    for close in closes:
+        expected.update(float(close))
+    for key in INDICATORS:
+        assert numpy.isclose(bot.indicators.last[key], expected.last[key], equal_nan=True)
+
+
+def test_restart_waits_longer_after_each_failed_attempt(tmp_path, monkeypatch):
+    monkeypatch.setattr("models.binance_api.threading.Timer", TimerRecorder)
+    TimerRecorder.delays = []
+    exchange, bot = create_bot(tmp_path)
+    for _ in range(9):
+        bot.process_message({'e': 'error', 'm': 'connection lost'})
+    assert TimerRecorder.delays == [0, 1, 2, 4, 8, 16, 32, 60, 60]
+
+    # sobald wieder kerzen kommen, geht es von vorne los
+    bot.process_message(exchange.advance(SYMBOL))
+    bot.process_message({'e': 'error', 'm': 'connection lost'})
+    assert TimerRecorder.delays[-1] == 0
+
+
+def test_backfill_fills_the_gap_and_skips_duplicates(tmp_path):
+    exchange, bot = create_bot(tmp_path)
+    messages = [exchange.advance(SYMBOL) for _ in range(100)]
+    for message in messages[:50]:
+        bot.process_message(message)
+    # messages[50:80] schließen während der trennung und kommen nur über rest
+    bot.process_message({'e': 'reconnected'})
+    # nach dem reconnect kommen zwei schon verarbeitete kerzen doppelt
+    for message in messages[78:]:
+        bot.process_message(message)
+
+    assert bot.candles.last("open_time") == messages[-1]["k"]["t"] // 1000
+    assert_undisturbed(bot, exchange.klines[SYMBOL]["close"][:600])
+
+
+def test_gap_above_the_backfill_limit_warms_up_again(tmp_path):
+    exchange, bot = create_bot(tmp_path, count=2000)
+    for _ in range(10):
+        bot.process_message(exchange.advance(SYMBOL))
+    for _ in range(bot.BACKFILL_LIMIT + 100):
+        exchange.advance(SYMBOL)
+    bot.process_message({'e': 'reconnected'})
+
+    open_time = bot.candles.view("open_time")
+    assert len(open_time) == bot.history_size
+    assert numpy.array_equal(open_time, exchange.klines[SYMBOL]["open_time"][1610 - bot.history_size:1610])
+
+
+def test_orders_are_reconciled_over_rest_without_user_stream(tmp_path):
+    columns = create_columns(3500)
+    replay = Replay.create(SYMBOL, columns, str(tmp_path), warmup=500, user_stream=False)
+    force_signals(replay.bot.strategy)
+    replay.run()
+
+    orders = list(replay.exchange.orders.values())
+    assert len(orders) > 2
+    assert [order["side"] for order in orders] == ["BUY", "SELL"] * (len(orders) // 2) + ["BUY"] * (len(orders) % 2)
+    assert all(order["status"] == replay.exchange.ORDER_STATUS_FILLED for order in orders[:-1])
+
+
+class FakeNotifier:
+
+    def send_mail(self, subject, message):
+        pass
+
+    async def run(self):
+        await asyncio.Event().wait()
+
+
+async def reconnect_async(state_directory, warm=500, count=200, gap=120):
+    """
+    lokaler websocket und rest server: die erste verbindung bricht nach der hälfte der kerzen ab, während der
+    trennung schließen `gap` kerzen, die zweite verbindung schickt zwei schon verarbeitete kerzen doppelt
+    """
+    series = create_klines(warm + count + gap)
+    # kerzen [0, available) sind geschlossen und über rest abrufbar
+    state = {"available": warm, "connections": 0}
+
+    async def klines(request):
+        limit = int(request.query.get("limit", 500))
+        if "startTime" in request.query:
+            first = -(-(int(request.query["startTime"]) - series[0][0]) // 60000)
+        else:
+            first = max(state["available"] - limit, 0)
+        return web.json_response(series[first:min(first + limit, state["available"])])
+
+    async def listen_key(request):
+        return web.json_response({"listenKey": "test"})
+
+    async def stream(request):
+        socket = web.WebSocketResponse()
+        await socket.prepare(request)
+        state["connections"] += 1
+        if state["connections"] == 1:
+            first, last = warm, warm + count // 2
+        else:
+            first, last = state["available"] - 2, len(series)
+        for index in range(first, last):
+            candle = dict(zip(KLINE_KEYS, series[index]), x=True)
+            data = {"e": "kline", "E": series[index][6], "s": SYMBOL, "k": candle}
+            await socket.send_str(json.dumps({"stream": names[0], "data": data}))
+            state["available"] = max(state["available"], index + 1)
+        if state["connections"] == 1:
+            state["available"] += gap
+            await socket.close()
+            return socket
+        async for _ in socket:
+            pass
+        return socket
+
+    app = web.Application()
+    app.router.add_get("/api/v3/klines", klines)
+    app.router.add_route("*", "/api/v3/userDataStream", listen_key)
+    app.router.add_get("/stream", stream)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    client = AsyncRestClient("key", "secret", api_url="http://127.0.0.1:{0}/api".format(port))
+    runtime = AsyncRuntime([SYMBOL], client=client, stream_url="ws://127.0.0.1:{0}".format(port),
+                           mail=FakeNotifier(), state_directory=str(state_directory))
+    names = list(runtime.traders)
+    trader = runtime.traders[names[0]]
+    task = asyncio.ensure_future(runtime.run())
+    try:
+        await asyncio.wait_for(caught_up(trader, series[-1][0] // 1000), 10)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await runner.cleanup()
+    return state, trader, numpy.array([float(kline[4]) for kline in series])
+
+
+async def caught_up(trader, last_open):
+    while not len(trader.candles) or trader.candles.last("open_time") < last_open:
+        await asyncio.sleep(0.001)
+
+
+def test_async_runtime_reconnects_and_backfills(tmp_path):
+    state, trader, closes = asyncio.run(reconnect_async(tmp_path))
+    assert state["connections"] == 2
+    assert_undisturbed(trader, closes)
@@ -0,0 +1,102 @@
+import json
+import os
+import time
+
+import pytest
+
+from models.recorder import CHUNK_HEADER, INDEX_ENTRY, INDEX_SUFFIX, FrameReader, FrameRecorder, FrameReplayer
+
+# eine stunde zwischen zwei frames, ein replay in originalgeschwindigkeit würde tage dauern
+STEP = 3600 * 1000
+START = 1600000000000
+
+
+def create_message(index):
+    return {"stream": "ethbtc@kline_1m", "data": {"e": "kline", "E": START + index * STEP, "i": index}}
+
+
+def record(path, count, compression="zlib", chunk_size=512):
+    """
+    nimmt abwechselnd dicts und fertige json strings auf, schreibt mit kleinen blöcken
+    """
+    recorder = FrameRecorder(path, compression=compression, chunk_size=chunk_size, flush_interval=0.01)
+    for index in range(count):
+        message = create_message(index)
+        recorder.record(message if index % 2 else json.dumps(message), START + index * STEP)
+    recorder.start()
+    recorder.stop()
+    return recorder
+
+
+@pytest.mark.parametrize("compression", ["zlib", "none"])
+def test_dict_and_string_frames_round_trip(tmp_path, compression):
+    path = str(tmp_path / "frames.rec")
+    recorder = record(path, 200, compression)
+    assert recorder.recorded == 200
+
+    reader = FrameReader(path)
+    assert len(reader.chunks) > 1
+    assert len(reader) == 200
+    assert list(reader.messages()) == [(START + index * STEP, create_message(index)) for index in range(200)]
+
+
+def test_frames_seek_to_the_chunk_of_the_start(tmp_path, monkeypatch):
+    path = str(tmp_path / "frames.rec")
+    record(path, 300)
+    reader = FrameReader(path)
+    read = []
+    read_chunk = reader.read_chunk
+    monkeypatch.setattr(reader, "read_chunk", lambda file, offset: read.append(offset) or read_chunk(file, offset))
+
+    start, end = START + 150 * STEP, START + 160 * STEP
+    frames = list(reader.messages(start, end))
+    assert [message["data"]["i"] for _, message in frames] == list(range(150, 161))
+    # nur die blöcke die den zeitraum enthalten werden entpackt
+    expected = [offset for first_ts, last_ts, offset, _ in reader.chunks if last_ts >= start and first_ts <= end]
+    assert read == expected
+    assert len(read) < len(reader.chunks) // 4
+
+    assert list(reader.frames(START + 300 * STEP)) == []
+    assert [message["data"]["i"] for _, message in reader.messages(end=START + 2 * STEP)] == [0, 1, 2]
+
+
+def test_repair_truncates_a_partial_chunk_and_rebuilds_the_index(tmp_path):
+    path = str(tmp_path / "frames.rec")
+    record(path, 100)
+    size = os.path.getsize(path)
+    chunks = FrameReader(path).chunks
+    # absturz mitten im schreiben des nächsten blocks, der index ist verloren
+    with open(path, "ab") as file:
+        file.write(CHUNK_HEADER.pack(b"TBRF", 1, 1000, 2000, 10, 0, 0) + b"partial")
+    os.remove(path + INDEX_SUFFIX)
+
+    FrameRecorder(path, compression="zlib").stop()
+    assert os.path.getsize(path) == size
+    with open(path + INDEX_SUFFIX, "rb") as index:
+        content = index.read()
+    assert [INDEX_ENTRY.unpack_from(content, i * INDEX_ENTRY.size)
+            for i in range(len(content) // INDEX_ENTRY.size)] == [tuple(chunk) for chunk in chunks]
+    assert len(FrameReader(path)) == 100
+
+
+def test_short_index_falls_back_to_the_chunk_headers(tmp_path):
+    path = str(tmp_path / "frames.rec")
+    record(path, 100)
+    # der letzte index eintrag fehlt, z.b. abbruch zwischen block und index
+    with open(path + INDEX_SUFFIX, "r+b") as index:
+        index.truncate(os.path.getsize(path + INDEX_SUFFIX) - INDEX_ENTRY.size)
+
+    reader = FrameReader(path)
+    assert len(reader) == 100
+    assert [message["data"]["i"] for _, message in reader.messages()] == list(range(100))
+
+
+def test_replayer_without_waiting(tmp_path):
+    path = str(tmp_path / "frames.rec")
+    record(path, 50)
+    messages = []
+    started = time.monotonic()
+    count = FrameReplayer(FrameReader(path), messages.append, speed=0).run(START + 10 * STEP)
+    assert time.monotonic() - started < 5
+    assert count == 40
+    assert messages == [create_message(index) for index in range(10, 50)]
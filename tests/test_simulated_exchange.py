@@ -0,0 +1,24 @@
+import pytest
+
+from market import create_columns
+from models.simulated_exchange import SimulatedExchange
+
+SYMBOL = "ETHEUR"
+
+
+@pytest.mark.parametrize("reports_first", [False, True])
+def test_report_order(reports_first):
+    exchange = SimulatedExchange(reports_first=reports_first)
+    exchange.load(SYMBOL, create_columns(600), start=500)
+    events = []
+    exchange.start_user_socket(lambda msg: events.append(msg["X"]))
+
+    order = exchange.create_order(symbol=SYMBOL, side=exchange.SIDE_BUY, type=exchange.ORDER_TYPE_MARKET,
+                                  quantity=0.04)
+    delivered = list(events)
+    exchange.dispatch()
+
+    assert order["status"] == exchange.ORDER_STATUS_FILLED
+    # erst NEW, dann die ausführung
+    assert events == ["NEW", "FILLED"]
+    assert delivered == (events if reports_first else [])
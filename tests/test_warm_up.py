@@ -0,0 +1,68 @@
+import asyncio
+
+import numpy
+
+from market import create_columns
+from models.async_runtime import AsyncRuntime
+from models.binance_api import BinanceAPI
+from models.candle_buffer import FIELDS
+from models.simulated_exchange import SimulatedExchange, SimulatedMail
+from test_async_runtime import AsyncExchange
+
+SYMBOL = "ETHEUR"
+HISTORY_SIZE = 2500
+
+
+class PagedExchange(SimulatedExchange):
+    """
+    lehnt wie binance mehr als 1000 kerzen je anfrage ab
+    """
+
+    def __init__(self):
+        SimulatedExchange.__init__(self)
+        self.limits = []
+
+    def get_klines(self, **params):
+        self.limits.append(params.get("limit"))
+        assert params.get("limit", 500) <= 1000
+        return SimulatedExchange.get_klines(self, **params)
+
+
+def create_exchange():
+    exchange = PagedExchange()
+    exchange.load(SYMBOL, create_columns(3000), start=3000)
+    return exchange
+
+
+def large_history(bot):
+    bot.history_size = HISTORY_SIZE
+    bot.reset_candles()
+    return bot
+
+
+def test_warm_up_pages_above_the_kline_limit(tmp_path):
+    exchange = create_exchange()
+    bot = large_history(BinanceAPI(symbol=SYMBOL, client=exchange, socket_manager=exchange,
+                                   mail=SimulatedMail(), state_directory=str(tmp_path)))
+    bot.warm_up(snapshot=False)
+
+    assert exchange.limits == [1000, 1000, 500]
+    open_time = bot.candles.view("open_time")
+    assert len(open_time) == HISTORY_SIZE
+    assert numpy.array_equal(open_time, exchange.klines[SYMBOL]["open_time"][-HISTORY_SIZE:])
+
+
+def test_both_runtimes_warm_up_on_the_same_history(tmp_path):
+    exchange = create_exchange()
+    bot = large_history(BinanceAPI(symbol=SYMBOL, client=exchange, socket_manager=exchange,
+                                   mail=SimulatedMail(), state_directory=str(tmp_path / "threaded")))
+    bot.warm_up(snapshot=False)
+
+    runtime = AsyncRuntime([SYMBOL], client=AsyncExchange(exchange), stream_url="ws://unused",
+                           mail=SimulatedMail(), state_directory=str(tmp_path / "async"))
+    trader = large_history(runtime.symbols[SYMBOL])
+    asyncio.run(trader.warm_up_async(snapshot=False))
+
+    assert len(trader.candles) == HISTORY_SIZE
+    for field in FIELDS:
+        assert numpy.array_equal(bot.candles.view(field), trader.candles.view(field))
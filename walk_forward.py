@@ -0,0 +1,37 @@
+import argparse
+
+from binance.helpers import date_to_milliseconds
+
+from models.backtester import Backtester
+from models.optimizer import DEFAULT_SPACE, METRICS, random_parameters
+from models.walk_forward import WalkForward
+
+parser = argparse.ArgumentParser(description="Walk Forward Auswertung der Strategie über ein oder mehrere Symbole")
+parser.add_argument("--start", default="3 months ago UTC", help="Startzeitpunkt der Historie")
+parser.add_argument("--symbols", default=None, help="Kommagetrennte Symbole, standard Symbols oder Symbol")
+parser.add_argument("--train", type=int, default=10000, help="Kerzen je Trainingsfenster, 0 = feste Parameter")
+parser.add_argument("--test", type=int, default=2000, help="Kerzen je Testfenster")
+parser.add_argument("--step", type=int, default=None, help="Abstand der Fenster, standard --test")
+parser.add_argument("--random", type=int, default=50, help="Anzahl zufälliger Kombinationen je Trainingsfenster")
+parser.add_argument("--metric", default="pnl", choices=sorted(METRICS))
+parser.add_argument("--workers", type=int, default=None)
+parser.add_argument("--fee", type=float, default=0.001)
+parser.add_argument("--no-update", action="store_true", help="Nur den lokalen Kline Speicher benutzen")
+args = parser.parse_args()
+
+if __name__ == '__main__':
+    backtester = Backtester()
+    symbols = args.symbols or backtester.config.get("Symbols") or backtester.symbol
+    symbols = [symbol.strip().upper() for symbol in symbols.split(",") if symbol.strip()]
+    interval = backtester.get_interval()
+    start_ms = date_to_milliseconds(args.start)
+    if not args.no_update:
+        for symbol in symbols:
+            backtester.kline_store.update(symbol, interval, start_ms)
+
+    combinations = random_parameters(DEFAULT_SPACE, args.random, seed=0) if args.train else None
+    walk_forward = WalkForward(backtester.kline_store.directory, interval, args.train, args.test, step=args.step,
+                               combinations=combinations, metric=args.metric,
+                               quantity=float(backtester.config.get("Quantity", backtester.symbol)), fee=args.fee,
+                               workers=args.workers, window=backtester.history_size)
+    print(walk_forward.report(walk_forward.run(symbols, start=start_ms // 1000)))